@@ -1,26 +1,33 @@
 #!/usr/bin/env python3
 """
 Generate permission set additions for Booking__c, BookingEvent__c, EventItem__c
+
+Usage:
+    python3 scripts/add_permissions.py [--profile timings.jsonl]
 """
 
-import os
+import argparse
 from pathlib import Path
 
+from instrumentation import add_profile_arguments, profiling, recorder
+from metadata_catalog import load_catalog
+
 # Base path for field metadata
 BASE_PATH = Path('/Users/rreboucas/Documents/SFDX Projects/fdesdo/Fdesdo/force-app/main/default/objects')
 
-def get_custom_fields(object_name):
-    """Get list of custom fields for an object from metadata files."""
-    fields_dir = BASE_PATH / object_name / 'fields'
-    if not fields_dir.exists():
-        return []
+_catalog = None
 
-    fields = []
-    for field_file in fields_dir.glob('*.field-meta.xml'):
-        field_name = field_file.stem.replace('.field-meta', '')
-        if field_name.endswith('__c'):
-            fields.append(field_name)
-    return sorted(fields)
+def get_catalog():
+    """Metadata catalog for the source tree holding BASE_PATH, loaded once through the on-disk cache."""
+    global _catalog
+    if _catalog is None:
+        with recorder().phase('read'):
+            _catalog = load_catalog(BASE_PATH.parent)
+    return _catalog
+
+def get_custom_fields(object_name):
+    """Get list of custom fields for an object from the metadata catalog."""
+    return get_catalog().custom_fields(object_name)
 
 def generate_field_permissions_xml(object_name, fields):
     """Generate fieldPermissions XML for all fields."""
@@ -65,7 +72,10 @@ def main():
     for obj in objects:
         fields = get_custom_fields(obj)
         print(f"<!-- {obj}: {len(fields)} fields -->")
-        print(generate_field_permissions_xml(obj, fields))
+        with recorder().phase('render'):
+            xml = generate_field_permissions_xml(obj, fields)
+        recorder().count('fields', len(fields))
+        print(xml)
         print()
 
     print("\n<!-- Tab Settings -->")
@@ -74,4 +84,8 @@ def main():
         print()
 
 if __name__ == '__main__':
-    main()
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_profile_arguments(parser)
+    with profiling(parser.parse_args(), 'add_permissions'):
+        main()
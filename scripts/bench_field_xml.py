@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for get_field_xml.
+
+Rebuilds describe-style field dicts from the checked-in BookingEvent__c and
+EventItem__c field metadata, checks that the template emitters render exactly
+what the previous list-append implementation rendered, and reports fields per
+second for both.
+
+Usage:
+    python3 scripts/bench_field_xml.py [--repeat 100] [--objects BookingEvent__c EventItem__c]
+"""
+
+from typing import Optional, List
+import argparse
+import contextlib
+import io
+import time
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+from generate_object_metadata import (
+    EXCLUDED_FIELDS, FIELD_TYPE_MAP, OBJECTS_BEING_CREATED, STANDARD_FIELDS, get_field_xml,
+)
+
+OBJECTS_DIR = Path(__file__).resolve().parent.parent / 'force-app' / 'main' / 'default' / 'objects'
+METADATA_NS = '{http://soap.sforce.com/2006/04/metadata}'
+
+# Metadata type -> describe type, the inverse of FIELD_TYPE_MAP
+DESCRIBE_TYPES = {
+    'Text': 'string', 'LongTextArea': 'textarea', 'Checkbox': 'boolean', 'Number': 'double',
+    'Currency': 'currency', 'Percent': 'percent', 'Phone': 'phone', 'Email': 'email', 'Url': 'url',
+    'Date': 'date', 'DateTime': 'datetime', 'Time': 'time', 'Picklist': 'picklist',
+    'MultiselectPicklist': 'multipicklist', 'Lookup': 'reference',
+}
+
+
+def _text(element, tag: str) -> Optional[str]:
+    child = element.find(METADATA_NS + tag)
+    return child.text if child is not None else None
+
+
+def describe_from_field_xml(path: Path) -> dict:
+    """Rebuild the describe entry a *.field-meta.xml file was generated from."""
+    root = ET.parse(path).getroot()
+    metadata_type = _text(root, 'type')
+    field = {
+        'name': _text(root, 'fullName'),
+        'label': _text(root, 'label'),
+        'type': DESCRIBE_TYPES.get(metadata_type, 'anytype'),
+        'nillable': _text(root, 'required') != 'true',
+    }
+    for key in ('length', 'precision', 'scale'):
+        if _text(root, key) is not None:
+            field[key] = int(_text(root, key))
+    if _text(root, 'description'):
+        field['inlineHelpText'] = _text(root, 'description')
+    if metadata_type == 'Checkbox':
+        field['defaultValue'] = _text(root, 'defaultValue') == 'true'
+    if metadata_type == 'Lookup':
+        field['referenceTo'] = [_text(root, 'referenceTo')]
+        field['relationshipName'] = _text(root, 'relationshipName')
+    values = root.findall(f'{METADATA_NS}valueSet/{METADATA_NS}valueSetDefinition/{METADATA_NS}value')
+    if values:
+        field['picklistValues'] = [{
+            'active': True,
+            'value': _text(value, 'fullName'),
+            'label': _text(value, 'label'),
+            'defaultValue': _text(value, 'default') == 'true',
+        } for value in values]
+    return field
+
+
+def load_fields(object_names: List[str]) -> List[tuple]:
+    """Return (field, object_name) pairs for every checked-in field of the given objects."""
+    fields = []
+    for object_name in object_names:
+        for path in sorted((OBJECTS_DIR / object_name / 'fields').glob('*.field-meta.xml')):
+            fields.append((describe_from_field_xml(path), object_name))
+    return fields
+
+
+def legacy_escape_xml(text: str) -> str:
+    """escape_xml as it was before the translate table (five chained replace passes)."""
+    if not text:
+        return ''
+    return (text
+            .replace('&', '&amp;')
+            .replace('<', '&lt;')
+            .replace('>', '&gt;')
+            .replace('"', '&quot;')
+            .replace("'", '&apos;'))
+
+
+def legacy_get_field_xml(field: dict, object_name: str) -> Optional[str]:
+    """get_field_xml as it was before the template emitters (list appends + chained replace)."""
+    field_name = field.get('name', '')
+    field_type = field.get('type', '').lower()
+
+    # Skip standard fields
+    if field_name in STANDARD_FIELDS:
+        return None
+
+    # Skip non-custom fields (those without __c suffix, except Name)
+    if not field_name.endswith('__c'):
+        return None
+
+    # Skip excluded fields for this object
+    if field_name in EXCLUDED_FIELDS.get(object_name, []):
+        print(f"  Skipping excluded field: {field_name}")
+        return None
+
+    # Handle lookup/reference fields
+    if field_type == 'reference':
+        reference_to = field.get('referenceTo', [])
+        if reference_to:
+            ref_object = reference_to[0]
+            # Skip lookups to objects we're not creating (except standard objects)
+            if ref_object.endswith('__c') and ref_object not in OBJECTS_BEING_CREATED:
+                print(f"  Skipping lookup to non-existent object: {field_name} -> {ref_object}")
+                return None
+
+    # Map field type
+    metadata_type = FIELD_TYPE_MAP.get(field_type)
+    if metadata_type is None:
+        print(f"  Skipping unsupported field type: {field_name} ({field_type})")
+        return None
+
+    # Build field XML
+    xml_parts = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<CustomField xmlns="http://soap.sforce.com/2006/04/metadata">',
+        f'    <fullName>{field_name}</fullName>',
+    ]
+
+    # Add label
+    label = field.get('label', field_name.replace('__c', '').replace('_', ' '))
+    xml_parts.append(f'    <label>{legacy_escape_xml(label)}</label>')
+
+    # Add description if available
+    inline_help = field.get('inlineHelpText')
+    if inline_help:
+        xml_parts.append(f'    <description>{legacy_escape_xml(inline_help)}</description>')
+
+    # Handle different field types
+    if metadata_type == 'Text':
+        length = field.get('length', 255)
+        xml_parts.append(f'    <length>{min(length, 255)}</length>')
+        xml_parts.append('    <type>Text</type>')
+        xml_parts.append(f'    <required>{str(not field.get("nillable", True)).lower()}</required>')
+
+    elif metadata_type == 'LongTextArea':
+        length = field.get('length', 32768)
+        # Minimum length for LongTextArea is 256
+        length = max(length, 256)
+        xml_parts.append(f'    <length>{length}</length>')
+        xml_parts.append('    <type>LongTextArea</type>')
+        xml_parts.append('    <visibleLines>3</visibleLines>')
+
+    elif metadata_type == 'Checkbox':
+        default_value = field.get('defaultValue')
+        # Checkbox defaultValue must be exactly 'true' or 'false'
+        if default_value is None or default_value == '':
+            default_value = False
+        xml_parts.append(f'    <defaultValue>{str(bool(default_value)).lower()}</defaultValue>')
+        xml_parts.append('    <type>Checkbox</type>')
+
+    elif metadata_type == 'Number':
+        precision = field.get('precision', 18)
+        scale = field.get('scale', 0)
+        xml_parts.append(f'    <precision>{precision}</precision>')
+        xml_parts.append(f'    <scale>{scale}</scale>')
+        xml_parts.append('    <type>Number</type>')
+        xml_parts.append(f'    <required>{str(not field.get("nillable", True)).lower()}</required>')
+
+    elif metadata_type == 'Currency':
+        precision = field.get('precision', 18)
+        scale = field.get('scale', 2)
+        xml_parts.append(f'    <precision>{precision}</precision>')
+        xml_parts.append(f'    <scale>{scale}</scale>')
+        xml_parts.append('    <type>Currency</type>')
+        xml_parts.append(f'    <required>{str(not field.get("nillable", True)).lower()}</required>')
+
+    elif metadata_type == 'Percent':
+        precision = field.get('precision', 18)
+        scale = field.get('scale', 2)
+        xml_parts.append(f'    <precision>{precision}</precision>')
+        xml_parts.append(f'    <scale>{scale}</scale>')
+        xml_parts.append('    <type>Percent</type>')
+        xml_parts.append(f'    <required>{str(not field.get("nillable", True)).lower()}</required>')
+
+    elif metadata_type in ['Phone', 'Email', 'Url']:
+        xml_parts.append(f'    <type>{metadata_type}</type>')
+        xml_parts.append(f'    <required>{str(not field.get("nillable", True)).lower()}</required>')
+
+    elif metadata_type in ['Date', 'DateTime', 'Time']:
+        xml_parts.append(f'    <type>{metadata_type}</type>')
+        xml_parts.append(f'    <required>{str(not field.get("nillable", True)).lower()}</required>')
+
+    elif metadata_type == 'Picklist':
+        xml_parts.append('    <type>Picklist</type>')
+        xml_parts.append(f'    <required>{str(not field.get("nillable", True)).lower()}</required>')
+        picklist_values = field.get('picklistValues', [])
+        if picklist_values:
+            xml_parts.append('    <valueSet>')
+            xml_parts.append('        <restricted>true</restricted>')
+            xml_parts.append('        <valueSetDefinition>')
+            xml_parts.append('            <sorted>false</sorted>')
+            for pv in picklist_values:
+                if pv.get('active', True):
+                    xml_parts.append('            <value>')
+                    xml_parts.append(f'                <fullName>{legacy_escape_xml(pv.get("value", ""))}</fullName>')
+                    xml_parts.append(f'                <default>{str(pv.get("defaultValue", False)).lower()}</default>')
+                    xml_parts.append(f'                <label>{legacy_escape_xml(pv.get("label", pv.get("value", "")))}</label>')
+                    xml_parts.append('            </value>')
+            xml_parts.append('        </valueSetDefinition>')
+            xml_parts.append('    </valueSet>')
+
+    elif metadata_type == 'MultiselectPicklist':
+        xml_parts.append('    <type>MultiselectPicklist</type>')
+        xml_parts.append(f'    <required>{str(not field.get("nillable", True)).lower()}</required>')
+        xml_parts.append('    <visibleLines>4</visibleLines>')
+        picklist_values = field.get('picklistValues', [])
+        if picklist_values:
+            xml_parts.append('    <valueSet>')
+            xml_parts.append('        <restricted>true</restricted>')
+            xml_parts.append('        <valueSetDefinition>')
+            xml_parts.append('            <sorted>false</sorted>')
+            for pv in picklist_values:
+                if pv.get('active', True):
+                    xml_parts.append('            <value>')
+                    xml_parts.append(f'                <fullName>{legacy_escape_xml(pv.get("value", ""))}</fullName>')
+                    xml_parts.append(f'                <default>{str(pv.get("defaultValue", False)).lower()}</default>')
+                    xml_parts.append(f'                <label>{legacy_escape_xml(pv.get("label", pv.get("value", "")))}</label>')
+                    xml_parts.append('            </value>')
+            xml_parts.append('        </valueSetDefinition>')
+            xml_parts.append('    </valueSet>')
+
+    elif metadata_type == 'Lookup':
+        reference_to = field.get('referenceTo', [])
+        if not reference_to:
+            return None
+        ref_object = reference_to[0]
+
+        # Get base relationship name from field name (remove __c)
+        base_rel_name = field_name.replace('__c', '')
+        parent_obj_name = object_name.replace('__c', '')
+
+        # For lookups to standard objects OR custom objects we're creating,
+        # make relationship name unique by including the parent object name
+        # This avoids conflicts like "Booking__r" already existing on Booking
+        standard_objects = ['User', 'Contact', 'Account', 'Lead', 'Opportunity', 'Case']
+        custom_objects_being_created = ['Booking__c', 'BookingEvent__c', 'EventItem__c']
+
+        if ref_object in standard_objects or ref_object in custom_objects_being_created:
+            # Use format: FieldName_ParentObject (e.g., Booking_EventItem)
+            relationship_name = f'{base_rel_name}_{parent_obj_name}'
+            relationship_label = f'{base_rel_name} ({parent_obj_name})'
+        else:
+            relationship_name = field.get('relationshipName', base_rel_name)
+            relationship_label = field.get('relationshipName', base_rel_name)
+
+        xml_parts.append(f'    <referenceTo>{ref_object}</referenceTo>')
+        xml_parts.append(f'    <relationshipName>{relationship_name}</relationshipName>')
+        xml_parts.append(f'    <relationshipLabel>{legacy_escape_xml(relationship_label)}</relationshipLabel>')
+        xml_parts.append('    <type>Lookup</type>')
+
+        # Required lookups need Restrict or Cascade delete, optional can use SetNull
+        is_required = not field.get('nillable', True)
+        if is_required:
+            xml_parts.append('    <deleteConstraint>Restrict</deleteConstraint>')
+        else:
+            xml_parts.append('    <deleteConstraint>SetNull</deleteConstraint>')
+        xml_parts.append(f'    <required>{str(is_required).lower()}</required>')
+
+    xml_parts.append('</CustomField>')
+
+    return '\n'.join(xml_parts)
+
+
+def time_renderer(render, fields: List[tuple], repeat: int) -> float:
+    """Return the best fields-per-second rate over `repeat` passes."""
+    best = float('inf')
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for field, object_name in fields:
+                render(field, object_name)
+            best = min(best, time.perf_counter() - start)
+    return len(fields) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark get_field_xml before/after the template emitters')
+    parser.add_argument('--objects', nargs='+', default=['BookingEvent__c', 'EventItem__c'])
+    parser.add_argument('--repeat', type=int, default=100)
+    args = parser.parse_args()
+
+    fields = load_fields(args.objects)
+    print(f"Fields: {len(fields)} ({', '.join(args.objects)})")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        mismatches = [field['name'] for field, object_name in fields
+                      if legacy_get_field_xml(field, object_name) != get_field_xml(field, object_name)]
+    if mismatches:
+        print(f"Output mismatch for: {', '.join(mismatches)}")
+        raise SystemExit(1)
+    print("Output: identical to the list-append implementation")
+
+    before = time_renderer(legacy_get_field_xml, fields, args.repeat)
+    after = time_renderer(get_field_xml, fields, args.repeat)
+    print(f"Before (list appends): {before:,.0f} fields/s")
+    print(f"After (templates):     {after:,.0f} fields/s")
+    print(f"Speedup: {after / before:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
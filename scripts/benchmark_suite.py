@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+Scale benchmarks for the metadata and permission scripts on synthetic input.
+
+Generates describe dumps and a permission set at a configurable size (objects x
+fields, picklist sizes, pre-existing fieldPermissions), then runs each stage in
+a fresh process so its peak RSS is its own:
+
+  describe_stream        stream every field out of the dumps
+  get_field_xml          render every field
+  process_file           full generation into an empty output tree
+  load_catalog           cold metadata catalog build over the generated tree
+  add_permissions        add_permissions.generate_field_permissions_xml per object
+  update_permission_set  update_permission_set.main over every object
+  sync_permissions       sync_permissions.sync_all on the permission set
+
+Each stage reports wall time, items per second and peak RSS. --save-baseline
+writes the results to JSON; --baseline compares a run against it and exits 1
+when a stage's throughput drops or its peak RSS grows by more than --tolerance.
+
+--work-dir keeps the inputs for inspection. The directory is marked with a
+.benchmark-work-dir file and cleared on the next run only when it holds that
+marker; an existing non-empty directory without it is refused.
+
+Usage:
+    python3 scripts/benchmark_suite.py --scale large --save-baseline bench-baseline.json
+    python3 scripts/benchmark_suite.py --scale large --baseline bench-baseline.json
+    python3 scripts/benchmark_suite.py --objects 10 --fields 200 --stages process_file load_catalog
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional
+import argparse
+import contextlib
+import importlib
+import json
+import multiprocessing
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Written into --work-dir; only directories holding it are cleared
+WORK_DIR_MARKER = '.benchmark-work-dir'
+
+# Preset sizes: objects, fields per object, picklist fields per object,
+# values per picklist, fieldPermissions already in the permission set
+SCALES = {
+    'small': dict(objects=3, fields=200, picklist_fields=4, picklist_values=100, field_permissions=600),
+    'medium': dict(objects=20, fields=300, picklist_fields=6, picklist_values=500, field_permissions=6000),
+    'large': dict(objects=50, fields=500, picklist_fields=4, picklist_values=1000, field_permissions=20000),
+}
+
+# Describe types cycled through for the non-picklist fields
+FIELD_TYPES = ['string', 'textarea', 'boolean', 'double', 'currency', 'percent', 'phone',
+               'email', 'url', 'date', 'datetime', 'reference']
+
+PERMISSION_SET_NAME = 'Bench_Admin'
+
+
+def object_name(index: int) -> str:
+    return f'Bench{index:03d}__c'
+
+
+def synthetic_field(index: int, field_type: str, picklist_values: int) -> dict:
+    field = {
+        'name': f'Field{index:04d}__c',
+        'label': f'Field {index} & "Co"',
+        'type': field_type,
+        'nillable': index % 7 != 0,
+        'inlineHelpText': f'Help for field {index}' if index % 3 == 0 else None,
+        'length': 255 if field_type == 'string' else 32768 if field_type == 'textarea' else 0,
+        'precision': 18,
+        'scale': 2,
+        'defaultValue': None,
+        'referenceTo': ['User'] if field_type == 'reference' else [],
+        'relationshipName': f'Field{index:04d}__r' if field_type == 'reference' else None,
+        'picklistValues': [],
+    }
+    if field_type in ('picklist', 'multipicklist'):
+        field['picklistValues'] = [
+            {'value': f'Value {i}', 'label': f'Value <{i}>', 'active': i % 50 != 49, 'defaultValue': i == 0}
+            for i in range(picklist_values)
+        ]
+    return field
+
+
+def synthetic_describe(index: int, fields: int, picklist_fields: int, picklist_values: int) -> dict:
+    described = [{'name': 'Id', 'type': 'id'}, {'name': 'Name', 'type': 'string', 'label': 'Name'}]
+    for i in range(fields):
+        if i < picklist_fields:
+            field_type = 'multipicklist' if i % 2 else 'picklist'
+        else:
+            field_type = FIELD_TYPES[i % len(FIELD_TYPES)]
+        described.append(synthetic_field(i, field_type, picklist_values))
+    name = object_name(index)
+    return {'name': name, 'label': f'Bench {index}', 'labelPlural': f'Bench {index}s', 'fields': described}
+
+
+def write_permission_set(path: Path, objects: List[str], fields: int, field_permissions: int):
+    """A permission set already holding field_permissions fieldPermissions entries (spread over objects)."""
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>',
+             '<PermissionSet xmlns="http://soap.sforce.com/2006/04/metadata">']
+    for i in range(field_permissions):
+        obj = objects[i % len(objects)]
+        field = f'Field{(i // len(objects)) % max(fields, 1):04d}__c' if i < len(objects) * fields else f'Extra{i}__c'
+        lines += ['    <fieldPermissions>', '        <editable>false</editable>',
+                  f'        <field>{obj}.{field}</field>', '        <readable>true</readable>',
+                  '    </fieldPermissions>']
+    lines += [f'    <label>{PERMISSION_SET_NAME}</label>', '</PermissionSet>']
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text('\n'.join(lines) + '\n')
+
+
+def generate_inputs(work_dir: Path, config: dict) -> dict:
+    """Write one describe dump per object and the permission set; returns paths for the stages."""
+    dumps_dir = work_dir / 'describes'
+    dumps_dir.mkdir(parents=True, exist_ok=True)
+    objects = []
+    for index in range(config['objects']):
+        describe = synthetic_describe(index, config['fields'], config['picklist_fields'],
+                                      config['picklist_values'])
+        with open(dumps_dir / f"{describe['name']}.json", 'w') as f:
+            json.dump(describe, f)
+        objects.append(describe['name'])
+
+    project_dir = work_dir / 'project'
+    (project_dir / 'sfdx-project.json').parent.mkdir(parents=True, exist_ok=True)
+    (project_dir / 'sfdx-project.json').write_text('{"packageDirectories": [{"path": "force-app"}]}')
+    source_dir = project_dir / 'force-app' / 'main' / 'default'
+    perm_set = source_dir / 'permissionsets' / f'{PERMISSION_SET_NAME}.permissionset-meta.xml'
+    write_permission_set(perm_set, objects, config['fields'], config['field_permissions'])
+    return {
+        'dumps': sorted(str(path) for path in dumps_dir.glob('*.json')),
+        'objects': objects,
+        'project_dir': str(project_dir),
+        'source_dir': str(source_dir),
+        'perm_set': str(perm_set),
+    }
+
+
+# Stages: each takes the inputs dict and returns the number of items it processed.
+# They run in a child process, which imports the scripts under test itself.
+
+def stage_describe_stream(inputs: dict) -> int:
+    from describe_stream import iter_fields
+    return sum(1 for path in inputs['dumps'] for _ in iter_fields(path))
+
+
+def stage_get_field_xml(inputs: dict) -> int:
+    from describe_stream import iter_fields
+    from generate_object_metadata import get_field_xml
+    fields = [(obj, field) for path in inputs['dumps'] for obj, field in iter_fields(path)]
+    for obj, field in fields:
+        get_field_xml(field, obj)
+    return len(fields)
+
+
+def stage_process_file(inputs: dict) -> int:
+    import generate_object_metadata
+    # Every run renders into an empty tree, so each one writes all files
+    output_base = Path(inputs['project_dir']) / 'process-file-run'
+    shutil.rmtree(output_base, ignore_errors=True)
+    return sum(result['fields_created']
+               for path in inputs['dumps']
+               for result in generate_object_metadata.process_file(path, str(output_base)))
+
+
+def stage_load_catalog(inputs: dict) -> int:
+    from metadata_catalog import build_catalog
+    return build_catalog(inputs['source_dir']).field_count()
+
+
+def stage_add_permissions(inputs: dict) -> int:
+    import add_permissions
+    add_permissions.BASE_PATH = Path(inputs['source_dir']) / 'objects'
+    count = 0
+    for obj in inputs['objects']:
+        fields = add_permissions.get_custom_fields(obj)
+        add_permissions.generate_field_permissions_xml(obj, fields)
+        count += len(fields)
+    return count
+
+
+def stage_update_permission_set(inputs: dict) -> int:
+    import update_permission_set
+    update_permission_set.BASE_PATH = Path(inputs['source_dir'])
+    scratch = Path(inputs['perm_set']).with_suffix('.update.xml')
+    shutil.copy(inputs['perm_set'], scratch)
+    update_permission_set.main(scratch, inputs['objects'])
+    return update_permission_set.get_catalog().field_count()
+
+
+def stage_sync_permissions(inputs: dict) -> int:
+    import sync_permissions
+    results = sync_permissions.sync_all(Path(inputs['source_dir']), inputs['objects'], workers=1,
+                                        dry_run=True, use_cache=False)
+    return sum(result['upserted'] + result['removed'] for result in results)
+
+
+# Stages in run order
+STAGES: Dict[str, Callable[[dict], int]] = {
+    'describe_stream': stage_describe_stream,
+    'get_field_xml': stage_get_field_xml,
+    'process_file': stage_process_file,
+    'load_catalog': stage_load_catalog,
+    'add_permissions': stage_add_permissions,
+    'update_permission_set': stage_update_permission_set,
+    'sync_permissions': stage_sync_permissions,
+}
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+# Modules under test, imported before a stage is timed
+BENCHMARKED_MODULES = ['describe_stream', 'generate_object_metadata', 'metadata_catalog',
+                       'add_permissions', 'update_permission_set', 'sync_permissions']
+
+
+def run_stage(name: str, inputs: dict) -> dict:
+    """Run one stage (in the current process) with its output silenced; returns its measurements."""
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    for module in BENCHMARKED_MODULES:
+        importlib.import_module(module)
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        items = STAGES[name](inputs)
+        wall = time.perf_counter() - start
+    return {
+        'wall_s': round(wall, 4),
+        'items': items,
+        'items_per_s': round(items / wall, 1) if wall else 0.0,
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+    }
+
+
+def run_isolated(name: str, inputs: dict, repeat: int = 1) -> dict:
+    """Run a stage repeat times, each in a fresh interpreter so peak RSS reflects that stage alone.
+
+    Reports the fastest run and the highest peak RSS.
+    """
+    runs = []
+    for _ in range(repeat):
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+            runs.append(executor.submit(run_stage, name, inputs).result())
+    best = min(runs, key=lambda run: run['wall_s'])
+    return dict(best, peak_rss_mb=max(run['peak_rss_mb'] for run in runs))
+
+
+def compare(results: Dict[str, dict], baseline: dict, tolerance: float) -> List[str]:
+    """Regressions against a baseline: throughput down or peak RSS up by more than tolerance."""
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get('stages', {}).get(name)
+        if not previous:
+            continue
+        if previous['items_per_s'] and result['items_per_s'] < previous['items_per_s'] * (1 - tolerance):
+            regressions.append(f"{name}: {result['items_per_s']:.0f} items/s vs "
+                               f"{previous['items_per_s']:.0f} in the baseline")
+        if previous['peak_rss_mb'] and result['peak_rss_mb'] > previous['peak_rss_mb'] * (1 + tolerance):
+            regressions.append(f"{name}: peak RSS {result['peak_rss_mb']:.0f} MB vs "
+                               f"{previous['peak_rss_mb']:.0f} MB in the baseline")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small', help='Preset input size')
+    for key in SCALES['small']:
+        parser.add_argument(f"--{key.replace('_', '-')}", type=int, dest=key,
+                            help=f'Override the preset {key.replace("_", " ")}')
+    parser.add_argument('--stages', nargs='+', choices=list(STAGES), default=list(STAGES))
+    parser.add_argument('--work-dir', help='Keep the generated inputs here (default: a temporary directory)')
+    parser.add_argument('--baseline', help='Baseline JSON to compare against')
+    parser.add_argument('--save-baseline', help='Write the results to this baseline JSON')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Runs per stage; the fastest is reported (default: 3)')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Allowed relative slowdown / RSS growth before flagging (default: 0.25)')
+    args = parser.parse_args(argv)
+
+    config = dict(SCALES[args.scale])
+    config.update({key: getattr(args, key) for key in config if getattr(args, key) is not None})
+
+    temp_dir = None
+    if args.work_dir:
+        work_dir = Path(args.work_dir)
+        if work_dir.exists():
+            if (work_dir / WORK_DIR_MARKER).is_file():
+                shutil.rmtree(work_dir)
+            elif not work_dir.is_dir() or any(work_dir.iterdir()):
+                raise SystemExit(f"Error: {work_dir} exists and is not a benchmark work dir "
+                                 f"({WORK_DIR_MARKER} missing); choose another --work-dir or remove it")
+        work_dir.mkdir(parents=True, exist_ok=True)
+        (work_dir / WORK_DIR_MARKER).write_text('Created by scripts/benchmark_suite.py; cleared on every run\n')
+    else:
+        temp_dir = tempfile.TemporaryDirectory(prefix='metadata-bench-')
+        work_dir = Path(temp_dir.name)
+
+    try:
+        print(f"Generating {config['objects']} objects x {config['fields']} fields "
+              f"({config['picklist_fields']} picklists x {config['picklist_values']} values each), "
+              f"{config['field_permissions']} fieldPermissions")
+        start = time.perf_counter()
+        inputs = generate_inputs(work_dir, config)
+        print(f"Inputs ready in {time.perf_counter() - start:.1f}s\n")
+
+        # The generated tree the catalog and permission stages read
+        from generate_object_metadata import process_file
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            for path in inputs['dumps']:
+                process_file(path, inputs['source_dir'])
+        stages = [name for name in STAGES if name in args.stages]
+
+        print(f"{'stage':<24}{'wall s':>10}{'items':>10}{'items/s':>12}{'peak RSS MB':>14}")
+        results = {}
+        for name in stages:
+            result = results[name] = run_isolated(name, inputs, args.repeat)
+            print(f"{name:<24}{result['wall_s']:>10.2f}{result['items']:>10}"
+                  f"{result['items_per_s']:>12.0f}{result['peak_rss_mb']:>14.1f}")
+    finally:
+        if temp_dir:
+            temp_dir.cleanup()
+
+    report = {'config': config, 'python': sys.version.split()[0], 'stages': results}
+    if args.save_baseline:
+        Path(args.save_baseline).write_text(json.dumps(report, indent=2, sort_keys=True) + '\n')
+        print(f"\nBaseline written to {args.save_baseline}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        if baseline.get('config') != config:
+            print(f"\nWarning: baseline was recorded with {baseline.get('config')}; not comparing")
+            return
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("\nRegressions:")
+            for regression in regressions:
+                print(f"  {regression}")
+            raise SystemExit(1)
+        print(f"\nNo regressions against {args.baseline}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+"""
+Load a set of dataimport exports in dependency order, siblings in parallel.
+
+The dependency graph comes from the CSV headers: a "Location__r" or
+"Location__r.UniqueExternalId__c" column makes the file depend on the file
+that loads Location__c. Every object runs as its own asyncio task that waits
+only for its own parents, so a dependent starts as soon as the objects it
+references are loaded and the total time is that of the longest chain rather
+than the sum of all loads. A load that fails or rejects rows skips its
+dependents, whose rows would otherwise fail on the missing parents.
+
+Raw exports (with the "_" type column) are normalized first through the
+normalize_import_csv pipeline, with parent references resolved against the
+other files in the set (see import_references).
+
+--upsert upserts on UniqueExternalId__c. Raw exports then get external IDs
+derived from their content and parents and lose their duplicate rows (see
+external_ids), so a reload updates the records of the previous load rather
+than inserting copies. Rows whose keys collide with different values fail the
+load unless --keep-first; --key-columns OBJECT=COL[,COL...] keys an object by
+more columns than its Name, for both its own load and its children's parent
+references. Adding --changed-only sends only the rows whose content changed
+since the last clean load of the object.
+
+Clients:
+  local  LocalBulkClient, a file-backed stand-in that writes
+         <jobId>-success-records.csv / -failed-records.csv like the Bulk API
+         and rejects references to parents it has not loaded
+  sf     SfCliBulkClient, which runs `sf data import bulk` / `sf data upsert bulk`
+
+Usage:
+    python3 scripts/bulk_load.py dataimport/*.csv --client local --set "Location__c=Delphi Default Property"
+    python3 scripts/bulk_load.py dataimport/location.csv dataimport/guestroomtype.csv --client sf --target-org dev
+    python3 scripts/bulk_load.py dataimport/location.csv dataimport/guestroomtype.csv \\
+        dataimport/eventclassification.csv --upsert --set "Location__c=Delphi Default Property" \\
+        --key-columns GuestroomType__c=Name,SortOrder__c --key-columns EventClassification__c=Name,IsActive__c
+"""
+
+from typing import Dict, Iterable, List, NamedTuple, Optional
+import argparse
+import asyncio
+import csv
+import itertools
+import json
+import time
+from pathlib import Path
+
+from external_ids import (
+    MANIFEST_DIR, KeyColumns, KeyingReport, keying_stage, load_manifest, manifest_path, parse_key_columns,
+    save_manifest,
+)
+from import_references import (
+    KEY_FIELD, ParentIndex, UnresolvedReference, load_parent_index, reference_columns, reference_resolver,
+    relationship_object,
+)
+from normalize_import_csv import PLACEHOLDER, TYPE_COLUMN, normalize, parse_placeholder_values, read_rows
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_STAGING_DIR = PROJECT_DIR / '.sfdx' / 'bulk-load'
+
+
+class LoadJob(NamedTuple):
+    object_name: str
+    path: Path
+    depends_on: frozenset
+    raw: bool
+
+
+class LoadResult(NamedTuple):
+    object_name: str
+    job_id: str
+    processed: int
+    failed: int
+    started: float = 0.0
+    finished: float = 0.0
+    error: Optional[str] = None
+
+
+def read_header(path: Path):
+    """Header and first data row of a CSV, without reading the rest."""
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        reader = csv.reader(f)
+        return next(reader, []), next(reader, [])
+
+
+def plan_job(path, object_name: Optional[str] = None) -> LoadJob:
+    """Describe one file: the object it loads (from its "_" column unless given) and its parents."""
+    path = Path(path)
+    header, first = read_header(path)
+    raw = TYPE_COLUMN in header
+    if object_name is None and raw and first:
+        match = PLACEHOLDER.fullmatch(first[header.index(TYPE_COLUMN)])
+        object_name = match.group(1) if match else None
+    if object_name is None:
+        raise ValueError(f"{path}: cannot tell which object it loads; use OBJECT=FILE")
+
+    parents = {relationship_object(name) for name in header if name.endswith('__r')}
+    parents.update(object_name for _, _, object_name, _ in reference_columns(header))
+    parents.discard(object_name)
+    return LoadJob(object_name, path, frozenset(parents), raw)
+
+
+def plan(specs: Iterable[str]) -> Dict[str, LoadJob]:
+    """Plan "[OBJECT=]FILE" specs; parents outside the set are assumed to exist in the org already."""
+    jobs: Dict[str, LoadJob] = {}
+    for spec in specs:
+        object_name, sep, path = spec.rpartition('=')
+        job = plan_job(path, object_name) if sep and not Path(spec).exists() else plan_job(spec)
+        if job.object_name in jobs:
+            raise ValueError(f"{job.object_name} is loaded by both {jobs[job.object_name].path} and {job.path}")
+        jobs[job.object_name] = job
+
+    jobs = {name: job._replace(depends_on=job.depends_on & jobs.keys()) for name, job in jobs.items()}
+    tiers(jobs)  # raises on cycles
+    return jobs
+
+
+def tiers(jobs: Dict[str, LoadJob]) -> List[List[str]]:
+    """Objects grouped by depth in the dependency graph (for reporting; loads do not wait per tier)."""
+    remaining = dict(jobs)
+    done: set = set()
+    result = []
+    while remaining:
+        ready = sorted(name for name, job in remaining.items() if job.depends_on <= done)
+        if not ready:
+            raise ValueError(f"Dependency cycle between: {', '.join(sorted(remaining))}")
+        result.append(ready)
+        done.update(ready)
+        for name in ready:
+            del remaining[name]
+    return result
+
+
+class LocalBulkClient:
+    """File-backed stand-in for the Bulk API.
+
+    Each load waits latency + rows * row_latency seconds, appends accepted rows
+    to <root>/<Object>.csv and writes the per-job result files. A row is
+    rejected when one of its "<Relationship>.<Field>" values names a parent
+    that has not been loaded, in this run or an earlier one into the same root.
+    Upserts replace the stored row with the same external ID.
+    """
+
+    def __init__(self, root, latency: float = 0.05, row_latency: float = 0.0):
+        self.root = Path(root)
+        self.latency = latency
+        self.row_latency = row_latency
+        self._loaded: Dict[str, Dict[str, set]] = {}  # object -> field -> values
+        self._job_ids = itertools.count(1)
+
+    def _store(self, object_name: str) -> Dict[str, set]:
+        """Field values loaded for an object, read from <root>/<Object>.csv on first use."""
+        store = self._loaded.get(object_name)
+        if store is None:
+            store = self._loaded[object_name] = {}
+            object_file = self.root / f'{object_name}.csv'
+            if object_file.exists():
+                header, rows = read_rows(object_file)
+                columns = [store.setdefault(name, set()) for name in header]
+                for row in rows:
+                    for values, value in zip(columns, row):
+                        if value:
+                            values.add(value)
+        return store
+
+    async def load(self, object_name: str, path: Path, external_id_field: Optional[str] = None) -> LoadResult:
+        job_id = f'750LOCAL{next(self._job_ids):010d}'
+        header, rows = read_rows(path)
+        references = reference_columns(header)
+        job_dir = self.root / 'jobs'
+        job_dir.mkdir(parents=True, exist_ok=True)
+
+        accepted = []
+        failed = []
+        for row in rows:
+            error = None
+            for column, _, parent, field in references:
+                value = row[column] if column < len(row) else ''
+                if value and value not in self._store(parent).get(field, ()):
+                    error = (f"INVALID_FIELD:Foreign key external ID: {value} not found for field "
+                             f"{field} in entity {parent}:--")
+                    break
+            if error:
+                failed.append([error] + row)
+            else:
+                accepted.append(row)
+
+        await asyncio.sleep(self.latency + self.row_latency * (len(accepted) + len(failed)))
+
+        store = self._store(object_name)
+        for i, name in enumerate(header):
+            values = store.setdefault(name, set())
+            values.update(row[i] for row in accepted if i < len(row) and row[i])
+
+        object_file = self.root / f'{object_name}.csv'
+        created = [True] * len(accepted)
+        if external_id_field and external_id_field in header and object_file.exists():
+            key_index = header.index(external_id_field)
+            _, stored_rows = read_rows(object_file)
+            records = {row[key_index] if key_index < len(row) else '': row for row in stored_rows}
+            created = [row[key_index] not in records for row in accepted]
+            records.update((row[key_index], row) for row in accepted)
+            with open(object_file, 'w', encoding='utf-8', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(header)
+                writer.writerows(records.values())
+        else:
+            new_file = not object_file.exists()
+            with open(object_file, 'a', encoding='utf-8', newline='') as f:
+                writer = csv.writer(f)
+                if new_file:
+                    writer.writerow(header)
+                writer.writerows(accepted)
+        with open(job_dir / f'{job_id}-success-records.csv', 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['sf__Id', 'sf__Created'] + header)
+            writer.writerows([f'a00LOCAL{job_id[-6:]}{i:06d}', str(new).lower()] + row
+                             for i, (row, new) in enumerate(zip(accepted, created)))
+        with open(job_dir / f'{job_id}-failed-records.csv', 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['sf__Id', 'sf__Error'] + header)
+            writer.writerows([''] + row for row in failed)
+
+        return LoadResult(object_name, job_id, len(accepted) + len(failed), len(failed))
+
+
+class SfCliBulkClient:
+    """Bulk API client running the sf CLI (`sf data import bulk`, or `upsert bulk` with an external ID)."""
+
+    def __init__(self, target_org: Optional[str] = None, wait_minutes: int = 30):
+        self.target_org = target_org
+        self.wait_minutes = wait_minutes
+
+    async def load(self, object_name: str, path: Path, external_id_field: Optional[str] = None) -> LoadResult:
+        if external_id_field:
+            command = ['sf', 'data', 'upsert', 'bulk', '--external-id', external_id_field]
+        else:
+            command = ['sf', 'data', 'import', 'bulk']
+        command += ['--sobject', object_name, '--file', str(path), '--wait', str(self.wait_minutes),
+                    '--line-ending', 'LF', '--json']
+        if self.target_org:
+            command += ['--target-org', self.target_org]
+
+        process = await asyncio.create_subprocess_exec(
+            *command, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+        stdout, stderr = await process.communicate()
+        try:
+            response = json.loads(stdout or b'{}')
+        except ValueError:
+            response = {}
+        result = response.get('result') or {}
+        job_info = result.get('jobInfo', result)
+        if process.returncode and not job_info.get('numberRecordsProcessed'):
+            message = response.get('message') or stderr.decode(errors='replace').strip()
+            raise RuntimeError(message or f"sf exited with status {process.returncode}")
+        return LoadResult(object_name, job_info.get('id') or job_info.get('jobId') or '',
+                          int(job_info.get('numberRecordsProcessed') or 0),
+                          int(job_info.get('numberRecordsFailed') or 0))
+
+
+def prepare(job: LoadJob, staging_dir: Path, index: ParentIndex, placeholders: Dict[str, str],
+            report: Optional[KeyingReport] = None, previous: Optional[Dict[str, str]] = None,
+            keep_first: bool = False, key_columns: Optional[KeyColumns] = None) -> Path:
+    """Normalize a raw export into staging_dir, resolving references against the parent index.
+
+    With a report, external IDs are derived (from key_columns where it names
+    the object) and duplicates dropped on the way; previous (key -> content
+    hash of the last load) also drops unchanged rows. Rows whose keys collide
+    fail the job unless keep_first.
+    """
+    if not job.raw:
+        return job.path
+    staging_dir.mkdir(parents=True, exist_ok=True)
+    output = staging_dir / f'{job.object_name}.csv'
+    keys = (keying_stage(job.object_name, placeholders, key_columns, previous=previous, report=report,
+                         parents=index, keep_first=keep_first) if report else None)
+    normalize(job.path, output, placeholders=placeholders,
+              references=reference_resolver(index, placeholders), keys=keys)
+    return output
+
+
+async def run(jobs: Dict[str, LoadJob], client, max_concurrent: int = 5,
+              staging_dir: Path = DEFAULT_STAGING_DIR, placeholders: Optional[Dict[str, str]] = None,
+              upsert: bool = False, changed_only: bool = False,
+              manifest_dir: Path = MANIFEST_DIR, keep_first: bool = False,
+              key_columns: Optional[KeyColumns] = None) -> Dict[str, LoadResult]:
+    """Load every job once its parents have loaded; returns results by object.
+
+    With upsert, raw exports are keyed (see prepare) and a clean load records
+    its keys in manifest_dir, which changed_only compares the next load with.
+    key_columns keys both an object's own load and the parent index.
+    """
+    placeholders = placeholders or {}
+    # Every raw export in the set is a potential parent; the index is read-only once built
+    index = await asyncio.to_thread(
+        load_parent_index, [f'{job.object_name}={job.path}' for job in jobs.values() if job.raw],
+        placeholders, upsert, key_columns)
+    semaphore = asyncio.Semaphore(max_concurrent)
+    start = time.perf_counter()
+    tasks: Dict[str, asyncio.Task] = {}
+
+    async def load(job: LoadJob) -> LoadResult:
+        parents = [await tasks[name] for name in sorted(job.depends_on)]
+        blocked = [parent.object_name for parent in parents if parent.error or parent.failed]
+        if blocked:
+            return LoadResult(job.object_name, '', 0, 0, error=f"skipped: {', '.join(blocked)} did not load cleanly")
+        async with semaphore:
+            started = time.perf_counter() - start
+            report = KeyingReport() if upsert else None
+            manifest = manifest_path(job.object_name, manifest_dir)
+            try:
+                previous = load_manifest(manifest) if changed_only else None
+                path = await asyncio.to_thread(prepare, job, staging_dir, index, placeholders, report, previous,
+                                               keep_first, key_columns)
+                result = await client.load(job.object_name, path, KEY_FIELD if upsert else None)
+                if report and job.raw and not result.failed:
+                    save_manifest(manifest, report.hashes)
+            except (UnresolvedReference, ValueError, OSError, RuntimeError) as e:
+                return LoadResult(job.object_name, '', 0, 0, started, time.perf_counter() - start, str(e))
+            if report and (report.duplicates or report.unchanged or report.collisions):
+                print(f"{job.object_name}: left out {report.duplicates} duplicate and {report.unchanged} "
+                      f"unchanged rows, {len(report.collisions)} key collisions")
+            return result._replace(started=started, finished=time.perf_counter() - start)
+
+    for name, job in jobs.items():
+        tasks[name] = asyncio.ensure_future(load(job))
+    await asyncio.gather(*tasks.values())
+    return {name: task.result() for name, task in tasks.items()}
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('files', nargs='+', metavar='[OBJECT=]FILE',
+                        help='Export files to load (raw exports name their object in the "_" column)')
+    parser.add_argument('--client', choices=['local', 'sf'], default='local')
+    parser.add_argument('--target-org', help='Org alias or username for the sf client')
+    parser.add_argument('--local-dir', default=str(DEFAULT_STAGING_DIR / 'org'),
+                        help='Directory the local client stores loaded records in')
+    parser.add_argument('--latency', type=float, default=0.05,
+                        help='Simulated seconds per job for the local client')
+    parser.add_argument('--max-concurrent', type=int, default=5,
+                        help='Maximum number of loads in flight')
+    parser.add_argument('--set', dest='placeholders', action='append', metavar='OBJECT=VALUE',
+                        help='Parent for "[OBJECT]" placeholders, by Name or external ID (repeatable)')
+    parser.add_argument('--upsert', action='store_true',
+                        help=f'Upsert on {KEY_FIELD} instead of inserting, deriving missing IDs')
+    parser.add_argument('--changed-only', action='store_true',
+                        help='With --upsert, send only rows that changed since the last clean load')
+    parser.add_argument('--keep-first', action='store_true',
+                        help='With --upsert, keep the first of rows whose keys collide with different '
+                             'values instead of failing the load')
+    parser.add_argument('--key-columns', action='append', metavar='OBJECT=COL[,COL...]',
+                        help='With --upsert, columns identifying a row of OBJECT besides its parents '
+                             '(repeatable; default: Name, or the object\'s natural key)')
+    parser.add_argument('--plan', action='store_true', help='Print the load order and exit')
+    args = parser.parse_args(argv)
+
+    try:
+        jobs = plan(args.files)
+        key_columns = parse_key_columns(args.key_columns)
+    except ValueError as e:
+        raise SystemExit(f"Error: {e}")
+
+    print("Load plan:")
+    for depth, names in enumerate(tiers(jobs), start=1):
+        print(f"  {depth}. {', '.join(names)}")
+    if args.plan:
+        return
+
+    if args.client == 'local':
+        client = LocalBulkClient(args.local_dir, latency=args.latency)
+    else:
+        client = SfCliBulkClient(args.target_org)
+
+    start = time.perf_counter()
+    results = asyncio.run(run(jobs, client, args.max_concurrent,
+                              placeholders=parse_placeholder_values(args.placeholders),
+                              upsert=args.upsert, changed_only=args.changed_only,
+                              keep_first=args.keep_first, key_columns=key_columns))
+    wall = time.perf_counter() - start
+
+    print()
+    for result in sorted(results.values(), key=lambda r: (r.started, r.object_name)):
+        if result.error:
+            print(f"{result.object_name}: FAILED {result.error}")
+        else:
+            print(f"{result.object_name}: job {result.job_id}, {result.processed} processed, "
+                  f"{result.failed} failed ({result.started:.2f}s -> {result.finished:.2f}s)")
+    serial = sum(r.finished - r.started for r in results.values() if not r.error)
+    print(f"\nDone in {wall:.2f}s (sum of loads {serial:.2f}s)")
+    if any(r.error or r.failed for r in results.values()):
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Split an import CSV into Bulk API sized, gzip-compressed chunks whose rows touch disjoint parents.
+
+Child imports such as DocumentSection (1,100+ rows) all reference a handful of
+Location__c parents. Rows of one parent spread over batches that load in
+parallel fight over the parent's row lock and fail with UNABLE_TO_LOCK_ROW.
+This script groups rows that share a parent (any "<Relationship>.<Field>"
+reference column, or the columns given with --group-by; rows linked through
+several parents form one group) and packs whole groups into chunks, so no two
+chunks lock the same parent.
+
+Chunks respect both a row limit and an exact byte budget: the UTF-8 size of
+the chunk's CSV, header included, before compression. A group too large for
+one chunk is split over consecutive chunks that share its parent; those go to
+successive "waves". Chunks in the same wave touch disjoint parents and can load
+in parallel, while the waves themselves load one after another.
+
+The input is read twice: once to size the groups and plan the packing, then
+again to stream every row through its chunk's gzip writer. Memory stays
+proportional to the number of parents, not rows. Raw exports (with the "_" type
+column) are normalized on the way (see normalize_import_csv).
+
+Writes <output-dir>/<stem>-NNN.csv.gz (or .csv with --no-gzip) and
+<stem>-chunks.json, which lists every chunk with its rows, bytes, compressed
+bytes, parent count and wave.
+
+Usage:
+    python3 scripts/chunk_import_csv.py dataimport/docsection_clean.csv
+    python3 scripts/chunk_import_csv.py dataimport/DocumentSection.csv --set "Location__c=Delphi Default Property" \\
+        --max-rows 5000 --max-bytes 5000000 -o .sfdx/chunks
+"""
+
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+import argparse
+import csv
+import gzip
+import io
+import json
+from pathlib import Path
+
+from import_references import reference_columns, relationship_object
+from normalize_import_csv import (
+    LINE_ENDINGS, TYPE_COLUMN, Row, build_stages, parse_placeholder_values, read_rows, run_pipeline,
+)
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_OUTPUT_DIR = PROJECT_DIR / '.sfdx' / 'chunks'
+
+# Bulk API batch limits: 10,000 records and 10 MB of (uncompressed) data
+MAX_ROWS = 10_000
+MAX_BYTES = 10_000_000
+
+# gzip level for the chunks; 6 is zlib's default size/speed trade-off
+COMPRESS_LEVEL = 6
+
+# (column, value) identifying one parent record
+Parent = Tuple[str, str]
+
+
+class Chunk(NamedTuple):
+    path: Path
+    rows: int
+    size: int                 # uncompressed CSV bytes, header included
+    compressed_size: int
+    parents: int
+    wave: int
+
+
+class RowEncoder:
+    """Encodes rows to the exact UTF-8 CSV bytes they are written as."""
+
+    def __init__(self, line_ending: str = 'lf'):
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer, lineterminator=LINE_ENDINGS[line_ending])
+
+    def encode(self, row: Row) -> bytes:
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        self._writer.writerow(row)
+        return self._buffer.getvalue().encode('utf-8')
+
+
+class ParentGroups:
+    """Union-find over parents: rows referencing a common parent end up in one group."""
+
+    def __init__(self):
+        self._parent: Dict[Parent, Parent] = {}
+
+    def find(self, node: Parent) -> Parent:
+        root = self._parent.setdefault(node, node)
+        while root != self._parent[root]:
+            root = self._parent[root]
+        while node != root:
+            self._parent[node], node = root, self._parent[node]
+        return root
+
+    def union(self, nodes: Sequence[Parent]) -> Parent:
+        root = self.find(nodes[0])
+        for node in nodes[1:]:
+            other = self.find(node)
+            if other != root:
+                self._parent[other] = root
+        return root
+
+    def __len__(self) -> int:
+        return len(self._parent)
+
+
+def parent_columns(header: Row, group_by: Optional[Sequence[str]] = None) -> List[Tuple[int, str]]:
+    """(index, parent object) of the columns identifying a row's parents."""
+    if group_by:
+        missing = [name for name in group_by if name not in header]
+        if missing:
+            raise ValueError(f"--group-by columns not in the file: {', '.join(missing)}")
+        return [(header.index(name), relationship_object(name.partition('.')[0])) for name in group_by]
+    return [(index, parent_object) for index, _, parent_object, _ in reference_columns(header)]
+
+
+def row_parents(row: Row, columns: List[Tuple[int, str]]) -> List[Parent]:
+    return [(parent_object, row[index]) for index, parent_object in columns if index < len(row) and row[index]]
+
+
+def open_rows(path, placeholders: Optional[Dict[str, str]] = None) -> Tuple[Row, Iterator[Row]]:
+    """Header and rows of an import file, normalized first when it is a raw export."""
+    header, rows = read_rows(path)
+    if TYPE_COLUMN in header:
+        header, rows = run_pipeline(header, rows, build_stages(placeholders=placeholders))
+    return header, rows
+
+
+def pack_groups(groups: Dict[Parent, List[int]], header_size: int, max_rows: int,
+                max_bytes: int) -> Tuple[Dict[Parent, int], List[List[int]]]:
+    """First-fit decreasing packing of whole groups into chunks.
+
+    groups maps a group root to [rows, bytes]. Returns (group -> chunk number
+    for the groups that fit in a chunk, per-chunk [rows, bytes] totals).
+    Groups too large for a chunk are left out; they are split when written.
+    """
+    assignment: Dict[Parent, int] = {}
+    chunks: List[List[int]] = []
+    for root, (rows, size) in sorted(groups.items(), key=lambda item: (-item[1][1], item[0])):
+        if rows > max_rows or header_size + size > max_bytes:
+            continue
+        for number, totals in enumerate(chunks):
+            if totals[0] + rows <= max_rows and totals[1] + size <= max_bytes:
+                break
+        else:
+            number = len(chunks)
+            chunks.append([0, header_size])
+        chunks[number][0] += rows
+        chunks[number][1] += size
+        assignment[root] = number
+    return assignment, chunks
+
+
+class ChunkWriter:
+    """Streams rows into numbered chunk files, tracking their size and parents.
+
+    A chunk can be opened with room reserved for the groups planned into it;
+    fits() keeps that room free for them.
+    """
+
+    def __init__(self, output_dir: Path, stem: str, header: bytes, compress: bool = True):
+        self.output_dir = output_dir
+        self.stem = stem
+        self.header = header
+        self.compress = compress
+        self.paths: List[Path] = []
+        self.streams: List = []
+        self.reserved: List[List[int]] = []   # [rows, bytes] still to come from planned groups
+        self.rows: List[int] = []
+        self.sizes: List[int] = []
+        self.parents: List[set] = []
+        self.waves: List[int] = []
+
+    def open(self, wave: int = 0, reserve: Tuple[int, int] = (0, 0)) -> int:
+        number = len(self.streams)
+        suffix = '.csv.gz' if self.compress else '.csv'
+        path = self.output_dir / f'{self.stem}-{number + 1:03d}{suffix}'
+        stream = gzip.open(path, 'wb', compresslevel=COMPRESS_LEVEL) if self.compress else open(path, 'wb')
+        stream.write(self.header)
+        self.paths.append(path)
+        self.streams.append(stream)
+        self.reserved.append(list(reserve))
+        self.rows.append(0)
+        self.sizes.append(len(self.header))
+        self.parents.append(set())
+        self.waves.append(wave)
+        return number
+
+    def write(self, number: int, data: bytes, parents: List[Parent], planned: bool = False):
+        if planned:
+            self.reserved[number][0] -= 1
+            self.reserved[number][1] -= len(data)
+        self.streams[number].write(data)
+        self.rows[number] += 1
+        self.sizes[number] += len(data)
+        self.parents[number].update(parents)
+
+    def fits(self, number: int, size: int, max_rows: int, max_bytes: int) -> bool:
+        rows, reserved_size = self.reserved[number]
+        return (self.rows[number] + rows < max_rows
+                and self.sizes[number] + reserved_size + size <= max_bytes)
+
+    def close(self) -> List[Chunk]:
+        chunks = []
+        for number, (path, stream) in enumerate(zip(self.paths, self.streams)):
+            stream.close()
+            chunks.append(Chunk(path, self.rows[number], self.sizes[number], path.stat().st_size,
+                                len(self.parents[number]), self.waves[number]))
+        return chunks
+
+
+def chunk_file(input_path, output_dir: Path = DEFAULT_OUTPUT_DIR, max_rows: int = MAX_ROWS,
+               max_bytes: int = MAX_BYTES, group_by: Optional[Sequence[str]] = None,
+               placeholders: Optional[Dict[str, str]] = None, line_ending: str = 'lf',
+               compress: bool = True) -> List[Chunk]:
+    """Split input_path into chunks under output_dir and write the chunk manifest; returns the chunks."""
+    input_path = Path(input_path)
+    encoder = RowEncoder(line_ending)
+
+    # Pass 1: group sizes
+    header, rows = open_rows(input_path, placeholders)
+    if not header:
+        raise ValueError(f"{input_path} is empty")
+    header_bytes = encoder.encode(header)
+    columns = parent_columns(header, group_by)
+    groups = ParentGroups()
+    by_parent: Dict[Parent, List[int]] = {}   # first parent of a row -> [rows, bytes]
+    for line, row in enumerate(rows, start=2):
+        size = len(encoder.encode(row))
+        if len(header_bytes) + size > max_bytes:
+            raise ValueError(f"{input_path}, line {line}: a single row is larger than the {max_bytes} byte budget")
+        parents = row_parents(row, columns)
+        if parents:
+            groups.union(parents)
+            counts = by_parent.setdefault(parents[0], [0, 0])
+            counts[0] += 1
+            counts[1] += size
+    totals: Dict[Parent, List[int]] = {}
+    for parent, (count, size) in by_parent.items():
+        group = totals.setdefault(groups.find(parent), [0, 0])
+        group[0] += count
+        group[1] += size
+    assignment, planned = pack_groups(totals, len(header_bytes), max_rows, max_bytes)
+
+    # Pass 2: stream each row into its chunk
+    output_dir.mkdir(parents=True, exist_ok=True)
+    stem = input_path.name.split('.')[0]
+    for stale in output_dir.glob(f'{stem}-[0-9][0-9][0-9].csv*'):
+        stale.unlink()
+    writer = ChunkWriter(output_dir, stem, header_bytes, compress)
+    for rows_planned, size_planned in planned:
+        writer.open(reserve=(rows_planned, size_planned - len(header_bytes)))
+    split_chunks: Dict[Parent, int] = {}   # oversized group -> chunk currently being filled
+    _, rows = open_rows(input_path, placeholders)
+    for row in rows:
+        data = encoder.encode(row)
+        parents = row_parents(row, columns)
+        if not parents:
+            # Rows without a parent cannot contend; they fill whatever room is left
+            number = next((n for n in range(len(writer.streams))
+                           if writer.fits(n, len(data), max_rows, max_bytes)), None)
+            if number is None:
+                number = writer.open()
+        else:
+            root = groups.find(parents[0])
+            number = assignment.get(root)
+            if number is not None:
+                writer.write(number, data, parents, planned=True)
+                continue
+            number = split_chunks.get(root)
+            if number is None or not writer.fits(number, len(data), max_rows, max_bytes):
+                wave = writer.waves[number] + 1 if number is not None else 0
+                number = split_chunks[root] = writer.open(wave)
+        writer.write(number, data, parents)
+    chunks = writer.close()
+
+    manifest = {
+        'source': str(input_path),
+        'max_rows': max_rows,
+        'max_bytes': max_bytes,
+        'parents': len(groups),
+        'chunks': [{'file': chunk.path.name, 'rows': chunk.rows, 'bytes': chunk.size,
+                    'compressed_bytes': chunk.compressed_size, 'parents': chunk.parents, 'wave': chunk.wave}
+                   for chunk in chunks],
+    }
+    with open(output_dir / f'{stem}-chunks.json', 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return chunks
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('input', help='Import CSV (normalized, or a raw export with the "_" type column)')
+    parser.add_argument('-o', '--output-dir', default=str(DEFAULT_OUTPUT_DIR), help='Directory for the chunks')
+    parser.add_argument('--max-rows', type=int, default=MAX_ROWS, help=f'Rows per chunk (default: {MAX_ROWS})')
+    parser.add_argument('--max-bytes', type=int, default=MAX_BYTES,
+                        help=f'Uncompressed bytes per chunk, header included (default: {MAX_BYTES})')
+    parser.add_argument('--group-by', nargs='+', metavar='COLUMN',
+                        help='Parent columns to group rows by (default: the "<Relationship>.<Field>" columns)')
+    parser.add_argument('--set', dest='placeholders', action='append', metavar='OBJECT=VALUE',
+                        help='Value for "[OBJECT]" placeholders in raw exports (repeatable)')
+    parser.add_argument('--line-ending', choices=sorted(LINE_ENDINGS), default='lf')
+    parser.add_argument('--no-gzip', action='store_true', help='Write plain .csv chunks')
+    args = parser.parse_args(argv)
+
+    try:
+        chunks = chunk_file(args.input, Path(args.output_dir), args.max_rows, args.max_bytes, args.group_by,
+                            parse_placeholder_values(args.placeholders), args.line_ending, not args.no_gzip)
+    except (OSError, ValueError) as e:
+        raise SystemExit(f"Error: {e}")
+
+    for chunk in chunks:
+        print(f"{chunk.path.name}: {chunk.rows} rows, {chunk.size} bytes "
+              f"({chunk.compressed_size} compressed), {chunk.parents} parents, wave {chunk.wave}")
+    waves = max((chunk.wave for chunk in chunks), default=-1) + 1
+    print(f"\n{sum(chunk.rows for chunk in chunks)} rows in {len(chunks)} chunks, {waves} waves "
+          f"-> {args.output_dir}")
+
+
+if __name__ == '__main__':
+    main()
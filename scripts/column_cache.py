@@ -0,0 +1,484 @@
+#!/usr/bin/env python3
+"""
+Columnar cache of the dataimport exports for dataset-wide checks.
+
+Checks that span a whole export (duplicate Names per Location, children whose
+parent is missing, null rates) used to re-read the quoted CSVs row by row, and
+each table also exists as raw, _clean and _import copies. This module keeps one
+cache file per raw export under .sfdx/column-cache/. Every column is
+dictionary-encoded: its distinct values are stored once, and each row holds an
+integer code in an array of the narrowest width ('B', 'H' or 'I') that fits.
+The cache file is memory-mapped and the code arrays are read through
+memoryviews, so opening a table costs one small JSON header, not a CSV parse.
+A cache file is rebuilt only when its source CSV changes (size and mtime,
+then content hash); a CSV touched without changing gets its new mtime recorded,
+so it is not hashed again on the next run.
+
+Checks run on the columns, not on rows:
+  - profiles count codes once per column (distinct values, null rate, top values)
+  - joins work on dictionaries: each distinct child value is looked up among the
+    parent's Names and external IDs once, and the result is mapped back to the
+    rows through the codes
+  - duplicate keys count tuples of codes, never comparing strings
+
+Rules:
+  duplicate-key  rows sharing the object's natural key (Name, or its NATURAL_KEYS entry
+                 in external_ids) and parent reference (default key), or --key
+  orphan         reference values matching no Name or external ID of the parent export
+
+Sources default to the raw exports in dataimport/; the _clean, _import and
+_crlf copies are derived from them (see normalize_import_csv) and are skipped.
+Exits 1 when any check fails.
+
+Usage:
+    python3 scripts/column_cache.py                        # refresh the cache and run the checks
+    python3 scripts/column_cache.py --profile              # also print column profiles
+    python3 scripts/column_cache.py dataimport/guestroomtype.csv --key Name
+"""
+
+from array import array
+from collections import Counter
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+from pathlib import Path
+
+from external_ids import DEFAULT_KEY_COLUMNS, NATURAL_KEYS
+from import_references import EXTERNAL_ID_FIELDS, reference_columns
+from normalize_import_csv import PLACEHOLDER, TYPE_COLUMN, read_rows
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+DATAIMPORT_DIR = PROJECT_DIR / 'dataimport'
+CACHE_DIR = PROJECT_DIR / '.sfdx' / 'column-cache'
+
+# Suffixes of the files derived from a raw export
+DERIVED_SUFFIXES = ('_clean', '_import', '_crlf')
+
+# Bump when the file layout changes so old cache files are rebuilt
+CACHE_VERSION = 1
+MAGIC = b'COLCACHE'
+# Magic, then the JSON header length
+PREFIX = struct.Struct('<8sQ')
+# Code arrays start on this boundary so memoryview.cast can read them in place
+ALIGNMENT = 8
+
+# Narrowest code type for a dictionary of up to this many values
+CODE_TYPES = (('B', 1 << 8), ('H', 1 << 16), ('I', 1 << 32))
+
+TOP_VALUES = 3
+# Row numbers listed per duplicate key
+ROWS_SHOWN = 10
+
+
+class Column:
+    """One dictionary-encoded column: values holds each distinct string once, codes one index per row."""
+
+    def __init__(self, name: str, values: List[str], codes: Sequence[int]):
+        self.name = name
+        self.values = values
+        self.codes = codes
+        self._counts: Optional[Counter] = None
+        self._lookup: Optional[Dict[str, int]] = None
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __getitem__(self, row: int) -> str:
+        return self.values[self.codes[row]]
+
+    def code(self, value: str) -> Optional[int]:
+        if self._lookup is None:
+            self._lookup = {value: code for code, value in enumerate(self.values)}
+        return self._lookup.get(value)
+
+    def counts(self) -> Counter:
+        """Rows per code, counted once."""
+        if self._counts is None:
+            self._counts = Counter(self.codes)
+        return self._counts
+
+    def count(self, value: str) -> int:
+        code = self.code(value)
+        return 0 if code is None else self.counts()[code]
+
+
+class Table:
+    """A cached export. Use as a context manager; columns are only valid while it is open."""
+
+    def __init__(self, name: str, source: Path, columns: List[Column], rebuilt: bool = False,
+                 buffer: Optional[mmap.mmap] = None):
+        self.name = name
+        self.source = source
+        self.columns = {column.name: column for column in columns}
+        self.header = [column.name for column in columns]
+        self.rebuilt = rebuilt
+        self._buffer = buffer
+
+    def __len__(self) -> int:
+        return len(next(iter(self.columns.values()))) if self.columns else 0
+
+    def __enter__(self) -> 'Table':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        # Views into the map must be released before it can be closed
+        for column in self.columns.values():
+            if isinstance(column.codes, memoryview):
+                column.codes.release()
+        if self._buffer is not None:
+            self._buffer.close()
+            self._buffer = None
+
+    def column(self, name: str) -> Column:
+        if name not in self.columns:
+            raise KeyError(f"{self.source.name} has no column {name}")
+        return self.columns[name]
+
+    def row(self, row: int) -> List[str]:
+        return [column[row] for column in self.columns.values()]
+
+    @property
+    def object_name(self) -> Optional[str]:
+        """sObject named by the "_" type column, when every row names the same one."""
+        if TYPE_COLUMN not in self.columns:
+            return None
+        objects = {match.group(1) for value in self.columns[TYPE_COLUMN].values
+                   if (match := PLACEHOLDER.fullmatch(value))}
+        return objects.pop() if len(objects) == 1 else None
+
+
+def source_files(directory: Path = DATAIMPORT_DIR) -> List[Path]:
+    """Raw exports in directory, without the copies derived from them."""
+    return [path for path in sorted(directory.glob('*.csv')) if not path.stem.endswith(DERIVED_SUFFIXES)]
+
+
+def cache_path(source: Path, cache_dir: Path = CACHE_DIR) -> Path:
+    return cache_dir / f'{source.stem}.cols'
+
+
+def file_digest(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _code_type(size: int) -> str:
+    for typecode, limit in CODE_TYPES:
+        if size <= limit:
+            return typecode
+    raise ValueError(f"{size} distinct values do not fit a code array")
+
+
+def _padding(offset: int) -> int:
+    return -offset % ALIGNMENT
+
+
+def build(source: Path, target: Path):
+    """Encode a CSV export into a cache file, written to a temporary file and renamed into place."""
+    stat = source.stat()
+    header, rows = read_rows(source)
+    lookups: List[Dict[str, int]] = [{} for _ in header]
+    codes = [array('I') for _ in header]
+    for row in rows:
+        for i, lookup in enumerate(lookups):
+            value = row[i] if i < len(row) else ''
+            code = lookup.get(value)
+            if code is None:
+                code = lookup[value] = len(lookup)
+            codes[i].append(code)
+
+    columns = []
+    arrays = []
+    offset = 0
+    for name, lookup, column_codes in zip(header, lookups, codes):
+        typecode = _code_type(len(lookup))
+        data = array(typecode, column_codes).tobytes()
+        columns.append({'name': name, 'type': typecode, 'offset': offset, 'rows': len(column_codes),
+                        'values': list(lookup)})
+        arrays.append(data)
+        offset += len(data) + _padding(len(data))
+    meta = json.dumps({
+        'version': CACHE_VERSION,
+        'byteorder': sys.byteorder,
+        'source': {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': file_digest(source)},
+        'columns': columns,
+    }).encode('utf-8')
+
+    target.parent.mkdir(parents=True, exist_ok=True)
+    temp = target.with_name(f'.{target.name}.tmp')
+    with open(temp, 'wb') as f:
+        start = PREFIX.size + len(meta)
+        f.write(PREFIX.pack(MAGIC, len(meta)) + meta + b'\0' * _padding(start))
+        for data in arrays:
+            f.write(data + b'\0' * _padding(len(data)))
+    os.replace(temp, target)
+
+
+def _read_meta(buffer) -> Tuple[dict, int]:
+    """The JSON header of a mapped cache file and the offset its code arrays start at."""
+    magic, length = PREFIX.unpack_from(buffer)
+    if magic != MAGIC:
+        raise ValueError('not a column cache file')
+    start = PREFIX.size + length
+    return json.loads(bytes(buffer[PREFIX.size:start])), start + _padding(start)
+
+
+def _is_fresh(meta: dict, source: Path) -> bool:
+    if meta.get('version') != CACHE_VERSION or meta.get('byteorder') != sys.byteorder:
+        return False
+    stat = source.stat()
+    recorded = meta['source']
+    if (recorded['size'], recorded['mtime_ns']) == (stat.st_size, stat.st_mtime_ns):
+        return True
+    # Touched but maybe not changed (checkout, copy): compare content before rebuilding
+    return recorded['size'] == stat.st_size and recorded['sha256'] == file_digest(source)
+
+
+def _record_stat(target: Path, meta: dict, source: Path) -> bool:
+    """Write source's current size and mtime into target's header in place; False when it no longer fits."""
+    stat = source.stat()
+    meta = dict(meta, source=dict(meta['source'], size=stat.st_size, mtime_ns=stat.st_mtime_ns))
+    data = json.dumps(meta).encode('utf-8')
+    with open(target, 'r+b') as f:
+        _, length = PREFIX.unpack(f.read(PREFIX.size))
+        if len(data) > length:
+            return False
+        # The header keeps its length: JSON allows the trailing spaces
+        f.write(data.ljust(length))
+    return True
+
+
+def _map(path: Path) -> Optional[Tuple[mmap.mmap, dict, int]]:
+    try:
+        with open(path, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (FileNotFoundError, ValueError):
+        return None
+    try:
+        meta, start = _read_meta(buffer)
+    except (struct.error, ValueError):
+        buffer.close()
+        return None
+    return buffer, meta, start
+
+
+def load_table(source: Path, cache_dir: Path = CACHE_DIR, rebuild: bool = False) -> Table:
+    """Open the cached columns of a CSV export, rebuilding the cache file first when the CSV changed."""
+    target = cache_path(source, cache_dir)
+    mapped = None if rebuild else _map(target)
+    if mapped is not None:
+        recorded = mapped[1]['source']
+        stat = source.stat()
+        if not _is_fresh(mapped[1], source):
+            mapped[0].close()
+            mapped = None
+        elif (recorded['size'], recorded['mtime_ns']) != (stat.st_size, stat.st_mtime_ns):
+            # Same content under a new mtime: record it, so the next run does not hash the file again
+            if not _record_stat(target, mapped[1], source):
+                mapped[0].close()
+                mapped = None
+    rebuilt = mapped is None
+    if rebuilt:
+        build(source, target)
+        mapped = _map(target)
+        if mapped is None:
+            raise ValueError(f"{target}: cache file could not be read back")
+
+    buffer, meta, start = mapped
+    view = memoryview(buffer)
+    columns = []
+    for column in meta['columns']:
+        size = array(column['type']).itemsize * column['rows']
+        position = start + column['offset']
+        codes = view[position:position + size].cast(column['type'])
+        columns.append(Column(column['name'], column['values'], codes))
+    view.release()
+    return Table(source.stem, source, columns, rebuilt, buffer)
+
+
+class ColumnProfile(NamedTuple):
+    name: str
+    distinct: int
+    nulls: int
+    rows: int
+    top: List[Tuple[str, int]]
+
+    def __str__(self) -> str:
+        rate = self.nulls / self.rows if self.rows else 0.0
+        top = ', '.join(f'{value!r} x{count}' for value, count in self.top)
+        return f'{self.name}: {self.distinct} distinct, {rate:.0%} empty; {top}'
+
+
+class Issue(NamedTuple):
+    rule: str
+    table: str
+    column: str
+    message: str
+
+    def __str__(self) -> str:
+        return f'{self.table}.{self.column}: [{self.rule}] {self.message}'
+
+
+def profile(table: Table) -> List[ColumnProfile]:
+    profiles = []
+    for column in table.columns.values():
+        counts = column.counts()
+        top = [(column.values[code], count) for code, count in counts.most_common(TOP_VALUES)]
+        profiles.append(ColumnProfile(column.name, len(column.values), column.count(''), len(column), top))
+    return profiles
+
+
+def default_key(table: Table) -> List[str]:
+    """The object's natural key (see external_ids) plus every parent reference column.
+
+    A Name should be unique per parent; SetupValue__c Names only per value list.
+    """
+    key = list(NATURAL_KEYS.get(table.object_name, DEFAULT_KEY_COLUMNS))
+    if any(name not in table.columns for name in key):
+        return []
+    for column, bare, _, _ in reference_columns(table.header):
+        key.append(table.header[column])
+        if bare is not None:
+            key.append(table.header[bare])
+    return key
+
+
+def duplicate_keys(table: Table, key: Sequence[str]) -> List[Issue]:
+    """Rows whose key columns hold the same values, found by counting code tuples."""
+    columns = [table.column(name) for name in key]
+    rows_by_key: Dict[tuple, List[int]] = {}
+    for row, codes in enumerate(zip(*(column.codes for column in columns)), start=1):
+        rows_by_key.setdefault(codes, []).append(row)
+    issues = []
+    for codes, rows in rows_by_key.items():
+        if len(rows) < 2:
+            continue
+        values = ', '.join(f'{column.name}={column.values[code]!r}' for column, code in zip(columns, codes))
+        shown = ', '.join(map(str, rows[:ROWS_SHOWN])) + (', ...' if len(rows) > ROWS_SHOWN else '')
+        issues.append(Issue('duplicate-key', table.name, key[0], f"{len(rows)} rows share {values} (rows {shown})"))
+    return issues
+
+
+def parent_keys(parent: Table) -> Set[str]:
+    """Every Name and external ID of a parent export: the values a reference may use."""
+    keys: Set[str] = set()
+    for name in ('Name',) + EXTERNAL_ID_FIELDS:
+        if name in parent.columns:
+            keys.update(parent.columns[name].values)
+    keys.discard('')
+    return keys
+
+
+def orphan_references(table: Table, parents: Dict[str, Table]) -> List[Issue]:
+    """Reference values that match no parent row, looked up once per distinct value.
+
+    Empty cells and "[Object]" placeholders are left to normalize_import_csv to fill.
+    """
+    issues = []
+    keys_by_object: Dict[str, Set[str]] = {}
+    columns = []
+    for column, bare, object_name, _ in reference_columns(table.header):
+        columns.append((table.header[column], object_name))
+        if bare is not None:
+            columns.append((table.header[bare], object_name))
+    for name, object_name in columns:
+        column = table.columns[name]
+        counts = column.counts()
+        references = [code for code, value in enumerate(column.values)
+                      if value and not PLACEHOLDER.fullmatch(value) and counts[code]]
+        if not references:
+            continue
+        if object_name not in parents:
+            rows = sum(counts[code] for code in references)
+            issues.append(Issue('orphan', table.name, name,
+                                f"{rows} rows reference {object_name}, which has no export to check against"))
+            continue
+        if object_name not in keys_by_object:
+            keys_by_object[object_name] = parent_keys(parents[object_name])
+        keys = keys_by_object[object_name]
+        for code in references:
+            if column.values[code] not in keys:
+                issues.append(Issue('orphan', table.name, name,
+                                    f"{column.values[code]!r} matches no {object_name} Name or external ID "
+                                    f"({counts[code]} rows)"))
+    return issues
+
+
+def check(tables: Iterable[Table], key: Optional[Sequence[str]] = None) -> List[Issue]:
+    """Duplicate keys in every table, and orphans against the tables that export each parent object."""
+    tables = list(tables)
+    parents = {table.object_name: table for table in tables if table.object_name}
+    issues = []
+    for table in tables:
+        table_key = list(key) if key else default_key(table)
+        missing = [name for name in table_key if name not in table.columns]
+        if key and missing:
+            raise ValueError(f"{table.source.name} has no column {', '.join(missing)}")
+        if table_key:
+            issues.extend(duplicate_keys(table, table_key))
+        issues.extend(orphan_references(table, parents))
+    return issues
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('sources', nargs='*', help=f'CSV exports (default: the raw exports in {DATAIMPORT_DIR})')
+    parser.add_argument('--cache-dir', default=str(CACHE_DIR), help='Directory for the cache files')
+    parser.add_argument('--rebuild', action='store_true', help='Rebuild every cache file, changed or not')
+    parser.add_argument('--profile', action='store_true', help='Print distinct values, null rate and top values '
+                                                             'per column')
+    parser.add_argument('--key', nargs='+', help='Columns that must be unique together '
+                                                 '(default: Name plus the parent reference columns)')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    sources = [Path(source) for source in args.sources] or source_files()
+    missing = [str(source) for source in sources if not source.is_file()]
+    if missing:
+        raise SystemExit(f"Error: no such file: {', '.join(missing)}")
+
+    tables = []
+    try:
+        for source in sources:
+            tables.append(load_table(source, Path(args.cache_dir), args.rebuild))
+        rebuilt = [table.name for table in tables if table.rebuilt]
+        rows = sum(len(table) for table in tables)
+        print(f"{len(tables)} tables, {rows} rows "
+              f"({len(rebuilt)} cache files rebuilt{': ' + ', '.join(rebuilt) if rebuilt else ''})")
+
+        if args.profile:
+            for table in tables:
+                print(f"\n{table.name} ({len(table)} rows)")
+                for column_profile in profile(table):
+                    print(f"  {column_profile}")
+
+        issues = check(tables, args.key)
+    except (OSError, ValueError, KeyError) as e:
+        raise SystemExit(f"Error: {e}")
+    finally:
+        for table in tables:
+            table.close()
+
+    if issues:
+        print()
+    for issue in issues:
+        print(issue)
+    print(f"\n{len(issues)} issues ({(time.perf_counter() - start) * 1000:.0f} ms)")
+    if issues:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Build delta deployments holding only the metadata files that changed.
+
+generate_package_xml lists every field of every object (<members>Obj.*</members>),
+so each deploy re-sends all of them. This module hashes each object and field
+file under force-app/main/default/objects, and each global value set under
+globalValueSets/, and compares the result with a baseline, which is either:
+
+  - a git ref (--from-ref HEAD~1): the blob hashes `git ls-tree` reports, or
+  - a saved manifest (.sfdx/deploy-manifest.json), written with --save after
+    a successful deploy.
+
+Hashes are git blob hashes in both cases, so an unchanged file compares equal
+without reading anything out of git. The delta directory gets:
+
+  package.xml                 changed and added members only
+  destructiveChanges.xml      removed members, when there are any
+  force-app/...               copies of the changed files
+  sfdx-project.json           so the delta directory deploys on its own
+  .delta-manifest             marks the directory as this script's to replace
+
+The delta directory is cleared before each run only when it holds that marker;
+an existing directory without it (a mistyped --output-dir) is left alone and
+the run fails.
+
+Usage:
+    python3 scripts/delta_manifest.py --from-ref origin/main [--objects Booking__c ...]
+    python3 scripts/delta_manifest.py                     # against the saved manifest
+    python3 scripts/delta_manifest.py --save              # after a successful deploy
+"""
+
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+from pathlib import Path
+
+from generate_object_metadata import render_package_xml, write_if_changed
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+SOURCE_PATH = Path('force-app') / 'main' / 'default'
+MANIFEST_PATH = Path('.sfdx') / 'deploy-manifest.json'
+DELTA_DIR = Path('.sfdx') / 'delta'
+MANIFEST_VERSION = 1
+
+OBJECT_SUFFIX = '.object-meta.xml'
+FIELD_SUFFIX = '.field-meta.xml'
+VALUE_SET_SUFFIX = '.globalValueSet-meta.xml'
+
+# Written into every delta directory; only directories holding it are cleared
+DELTA_MARKER = '.delta-manifest'
+
+# Source folders holding the components compared
+SOURCE_FOLDERS = ('objects', 'globalValueSets')
+
+# (metadata type, member), e.g. ('CustomField', 'Booking__c.Status__c')
+Component = Tuple[str, str]
+
+
+class Delta(NamedTuple):
+    changed: Dict[Component, str]   # component -> path relative to the source dir
+    removed: List[Component]
+
+
+def git_blob_hash(data: bytes) -> str:
+    """The object ID git gives a file with this content."""
+    return hashlib.sha1(b'blob %d\0' % len(data) + data).hexdigest()
+
+
+def component_for(relative_path: str) -> Optional[Component]:
+    """Map a path relative to the source dir to a component.
+
+    objects/<Obj>/<Obj>.object-meta.xml, objects/<Obj>/fields/<Field>.field-meta.xml
+    and globalValueSets/<Name>.globalValueSet-meta.xml are recognized.
+    """
+    parts = relative_path.split('/')
+    if parts[0] == 'objects':
+        if len(parts) == 3 and parts[2] == parts[1] + OBJECT_SUFFIX:
+            return 'CustomObject', parts[1]
+        if len(parts) == 4 and parts[2] == 'fields' and parts[3].endswith(FIELD_SUFFIX):
+            return 'CustomField', f'{parts[1]}.{parts[3][:-len(FIELD_SUFFIX)]}'
+    elif parts[0] == 'globalValueSets' and len(parts) == 2 and parts[1].endswith(VALUE_SET_SUFFIX):
+        return 'GlobalValueSet', parts[1][:-len(VALUE_SET_SUFFIX)]
+    return None
+
+
+def in_scope(component: Component, objects: Optional[Iterable[str]]) -> bool:
+    """Whether a component belongs to the objects being compared (global value sets always do)."""
+    type_name, member = component
+    if objects is None or type_name == 'GlobalValueSet':
+        return True
+    return member.split('.', 1)[0] in objects
+
+
+def snapshot(source_dir: Path, objects: Optional[Iterable[str]] = None) -> Dict[Component, Tuple[str, str]]:
+    """Component -> (blob hash, path relative to source_dir) for the files in the tree."""
+    objects = set(objects) if objects is not None else None
+    candidates = []
+    objects_dir = source_dir / 'objects'
+    if objects_dir.is_dir():
+        for object_entry in os.scandir(objects_dir):
+            if not object_entry.is_dir() or (objects is not None and object_entry.name not in objects):
+                continue
+            candidates.append(f'objects/{object_entry.name}/{object_entry.name}{OBJECT_SUFFIX}')
+            fields_dir = Path(object_entry.path) / 'fields'
+            if fields_dir.is_dir():
+                candidates.extend(f'objects/{object_entry.name}/fields/{entry.name}'
+                                  for entry in os.scandir(fields_dir) if entry.name.endswith(FIELD_SUFFIX))
+    value_set_dir = source_dir / 'globalValueSets'
+    if value_set_dir.is_dir():
+        candidates.extend(f'globalValueSets/{entry.name}' for entry in os.scandir(value_set_dir)
+                          if entry.name.endswith(VALUE_SET_SUFFIX))
+
+    result = {}
+    for relative_path in candidates:
+        path = source_dir / relative_path
+        if path.exists():
+            result[component_for(relative_path)] = (git_blob_hash(path.read_bytes()), relative_path)
+    return result
+
+
+def baseline_from_git(source_dir: Path, ref: str, objects: Optional[Iterable[str]] = None) -> Dict[Component, str]:
+    """Component -> blob hash of the files under source_dir at a git ref."""
+    objects = set(objects) if objects is not None else None
+    try:
+        output = subprocess.run(['git', 'ls-tree', '-r', '-z', ref, '--', *SOURCE_FOLDERS], cwd=source_dir,
+                                check=True, capture_output=True).stdout
+    except subprocess.CalledProcessError as e:
+        raise ValueError(f"git ls-tree {ref} failed: {e.stderr.decode(errors='replace').strip()}")
+    baseline = {}
+    for entry in output.split(b'\0'):
+        if not entry:
+            continue
+        info, _, path = entry.decode('utf-8').partition('\t')
+        _, object_type, blob = info.split()
+        component = component_for(path)
+        if object_type == 'blob' and component and in_scope(component, objects):
+            baseline[component] = blob
+    return baseline
+
+
+def load_manifest(path: Path) -> Dict[Component, str]:
+    """Component -> blob hash from a saved deploy manifest (empty when there is none)."""
+    try:
+        with open(path, 'r') as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return {}
+    if manifest.get('version') != MANIFEST_VERSION:
+        return {}
+    return {(type_name, member): blob
+            for type_name, members in manifest.get('components', {}).items()
+            for member, blob in members.items()}
+
+
+def save_manifest(path: Path, current: Dict[Component, Tuple[str, str]]):
+    components: Dict[str, Dict[str, str]] = {}
+    for (type_name, member), (blob, _) in current.items():
+        components.setdefault(type_name, {})[member] = blob
+    path.parent.mkdir(parents=True, exist_ok=True)
+    write_if_changed(path, json.dumps({'version': MANIFEST_VERSION, 'components': components},
+                                      indent=2, sort_keys=True))
+
+
+def compute_delta(current: Dict[Component, Tuple[str, str]], baseline: Dict[Component, str]) -> Delta:
+    changed = {component: relative_path for component, (blob, relative_path) in current.items()
+               if baseline.get(component) != blob}
+    removed_objects = {member for type_name, member in baseline
+                       if type_name == 'CustomObject' and ('CustomObject', member) not in current}
+    removed = []
+    for component in baseline:
+        if component in current:
+            continue
+        type_name, member = component
+        # Fields of a deleted object go with it
+        if type_name == 'CustomField' and member.split('.', 1)[0] in removed_objects:
+            continue
+        removed.append(component)
+    return Delta(changed, sorted(removed))
+
+
+def group_members(components: Iterable[Component]) -> Dict[str, List[str]]:
+    types: Dict[str, List[str]] = {}
+    for type_name, member in sorted(components):
+        types.setdefault(type_name, []).append(member)
+    return types
+
+
+def write_delta(delta: Delta, project_dir: Path, output_dir: Path):
+    """Write package.xml, destructiveChanges.xml and the staged source tree into output_dir.
+
+    Raises ValueError when output_dir exists, is not empty and was not written by this script.
+    """
+    if output_dir.exists():
+        if (output_dir / DELTA_MARKER).is_file():
+            shutil.rmtree(output_dir)
+        elif not output_dir.is_dir() or any(output_dir.iterdir()):
+            raise ValueError(f"{output_dir} exists and is not a delta directory ({DELTA_MARKER} missing); "
+                             f"choose another --output-dir or remove it")
+    output_dir.mkdir(parents=True, exist_ok=True)
+    (output_dir / DELTA_MARKER).write_text('Created by scripts/delta_manifest.py; cleared on every run\n')
+    for relative_path in delta.changed.values():
+        target = output_dir / SOURCE_PATH / relative_path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy2(project_dir / SOURCE_PATH / relative_path, target)
+
+    project_file = project_dir / 'sfdx-project.json'
+    if project_file.exists():
+        shutil.copy2(project_file, output_dir / 'sfdx-project.json')
+    (output_dir / 'package.xml').write_text(render_package_xml(group_members(delta.changed)))
+    if delta.removed:
+        (output_dir / 'destructiveChanges.xml').write_text(render_package_xml(group_members(delta.removed)))
+
+
+def build_delta(project_dir: Path, objects: Optional[List[str]] = None, from_ref: Optional[str] = None,
+                manifest_path: Optional[Path] = None, output_dir: Optional[Path] = None) -> Delta:
+    """Compare the objects tree with a git ref (or the saved manifest) and write the delta directory."""
+    source_dir = project_dir / SOURCE_PATH
+    current = snapshot(source_dir, objects)
+    if from_ref:
+        baseline = baseline_from_git(source_dir, from_ref, objects)
+    else:
+        baseline = load_manifest(manifest_path or project_dir / MANIFEST_PATH)
+        baseline = {c: blob for c, blob in baseline.items() if in_scope(c, objects)}
+    delta = compute_delta(current, baseline)
+    write_delta(delta, project_dir, output_dir or project_dir / DELTA_DIR)
+    return delta
+
+
+def print_summary(delta: Delta, output_dir: Path):
+    counts = {}
+    for type_name, _ in delta.changed:
+        counts[type_name] = counts.get(type_name, 0) + 1
+    changed = ', '.join(f'{count} {type_name}' for type_name, count in sorted(counts.items())) or 'nothing'
+    print(f"Delta: {changed} changed, {len(delta.removed)} removed -> {output_dir}")
+    if not delta.changed and not delta.removed:
+        return
+    command = f'cd "{output_dir}" && sf project deploy start --manifest package.xml'
+    if delta.removed:
+        command += ' --post-destructive-changes destructiveChanges.xml'
+    print(f"To deploy, run:\n{command}")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--project-dir', default=str(PROJECT_DIR), help='SFDX project root')
+    parser.add_argument('--objects', nargs='+', help='Limit the delta to these objects')
+    parser.add_argument('--from-ref', help='Compare against this git ref instead of the saved manifest')
+    parser.add_argument('--manifest', help=f'Saved manifest path (default: <project>/{MANIFEST_PATH})')
+    parser.add_argument('--output-dir', help=f'Delta directory (default: <project>/{DELTA_DIR})')
+    parser.add_argument('--save', action='store_true',
+                        help='Record the current tree as the deployed baseline and exit')
+    args = parser.parse_args(argv)
+
+    project_dir = Path(args.project_dir)
+    manifest_path = Path(args.manifest) if args.manifest else project_dir / MANIFEST_PATH
+    if args.save:
+        current = snapshot(project_dir / SOURCE_PATH, args.objects)
+        if args.objects:
+            # Keep the baseline of the objects not being saved
+            kept = {c: (blob, '') for c, blob in load_manifest(manifest_path).items()
+                    if not in_scope(c, args.objects)}
+            current = {**kept, **current}
+        save_manifest(manifest_path, current)
+        print(f"Saved {len(current)} components to {manifest_path}")
+        return
+
+    output_dir = Path(args.output_dir) if args.output_dir else project_dir / DELTA_DIR
+    try:
+        delta = build_delta(project_dir, args.objects, args.from_ref, manifest_path, output_dir)
+    except ValueError as e:
+        raise SystemExit(f"Error: {e}")
+    print_summary(delta, output_dir)
+
+
+if __name__ == '__main__':
+    main()
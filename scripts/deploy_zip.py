@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+Stream generated metadata into a Metadata API deploy zip, and deploy it.
+
+`generate_object_metadata.py --zip PATH` renders objects, fields, global value
+sets and package.xml straight into one zip through DeployArchive instead of
+writing hundreds of small files under force-app/ for the CLI to read back and
+zip. Each object becomes a single objects/<Object>.object entry in Metadata API
+format, its fields inlined as <fields> elements. The entry is streamed as each
+field is rendered, so nothing is staged on disk. --compress-level sets the
+deflate level: 0 stores, 1 is fastest, 9 smallest.
+
+The zip is a single package (package.xml at its root):
+    sf project deploy start --metadata-dir deploy.zip --single-package
+
+or deploy it with this script through the REST deployRequest resource, which
+uploads the zip and polls until the deploy is done:
+    python3 scripts/deploy_zip.py deploy.zip --target-org dev [--check-only]
+
+--serve starts StubDeployServer, a local stand-in for the deployRequest
+resource that checks the zip (every package.xml member present, every entry
+well-formed XML) and reports failures the way the Metadata API does, to test
+the zip mode offline.
+
+Usage:
+    python3 scripts/generate_object_metadata.py --zip deploy.zip [--compress-level 1]
+    python3 scripts/deploy_zip.py --serve --port 8766 &
+    python3 scripts/deploy_zip.py deploy.zip --instance-url http://127.0.0.1:8766 --access-token x
+"""
+
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import BinaryIO, Dict, List, Optional
+import argparse
+import http.client
+import io
+import itertools
+import json
+import os
+import re
+import threading
+import time
+import uuid
+import xml.etree.ElementTree as ET
+import zipfile
+from pathlib import Path
+
+from fetch_describes import ConnectionPool, org_credentials
+from generate_object_metadata import PACKAGE_API_VERSION
+
+DEFAULT_COMPRESS_LEVEL = 6
+
+DEPLOY_PATH = '/services/data/v{version}/metadata/deployRequest'
+POLL_INTERVAL = 2.0
+DEPLOY_TIMEOUT = 600.0
+
+METADATA_NS = '{http://soap.sforce.com/2006/04/metadata}'
+# Source-format root element of a field file, replaced by <fields> inside the .object entry
+CUSTOM_FIELD_ROOT = re.compile(r'^(?:<\?xml[^>]*\?>\s*)?<CustomField[^>]*>\n?|\n?</CustomField>\s*$')
+
+# Metadata API folder and suffix of each metadata type in the zip
+TYPE_PATHS = {
+    'CustomObject': ('objects', 'object'),
+    'GlobalValueSet': ('globalValueSets', 'globalValueSet'),
+}
+
+
+class DeployArchive:
+    """Metadata API deploy zip, written entry by entry as metadata is rendered.
+
+    Objects are streamed: begin_object opens objects/<Object>.object, add_field
+    appends a <fields> element to it and end_object closes it, so only one
+    field's XML is held at a time.
+    """
+
+    def __init__(self, stream: BinaryIO, compress_level: int = DEFAULT_COMPRESS_LEVEL):
+        if not 0 <= compress_level <= 9:
+            raise ValueError(f"compress level must be 0-9, got {compress_level}")
+        compression = zipfile.ZIP_STORED if compress_level == 0 else zipfile.ZIP_DEFLATED
+        self.zip = zipfile.ZipFile(stream, 'w', compression,
+                                   compresslevel=compress_level if compress_level else None)
+        self.entries: List[str] = []
+        self.bytes_written = 0          # uncompressed
+        self._entry = None
+        self._tail = b''
+
+    def add(self, name: str, content: str):
+        """Add a whole entry (package.xml, a global value set)."""
+        data = content.encode('utf-8')
+        self.zip.writestr(name, data)
+        self.entries.append(name)
+        self.bytes_written += len(data)
+
+    def begin_object(self, object_name: str, object_xml: str) -> str:
+        """Open the object's entry with its object XML; returns the entry name."""
+        if self._entry is not None:
+            raise ValueError('an object entry is already open')
+        head, closing, tail = object_xml.rpartition('</CustomObject>')
+        if not closing:
+            raise ValueError(f"{object_name}: object XML has no </CustomObject>")
+        name = f'objects/{object_name}.object'
+        self._entry = self.zip.open(name, 'w')
+        self._tail = (closing + tail).encode('utf-8')
+        self._write(head.encode('utf-8'))
+        self.entries.append(name)
+        return name
+
+    def add_field(self, field_xml: str):
+        """Append a source-format field file to the open object as a <fields> element."""
+        body = CUSTOM_FIELD_ROOT.sub('', field_xml)
+        self._write(('    <fields>\n'
+                     + ''.join(f'    {line}\n' for line in body.split('\n'))
+                     + '    </fields>\n').encode('utf-8'))
+
+    def end_object(self):
+        self._write(self._tail)
+        self._entry.close()
+        self._entry = None
+
+    def _write(self, data: bytes):
+        self._entry.write(data)
+        self.bytes_written += len(data)
+
+    def close(self):
+        if self._entry is not None:
+            self.end_object()
+        self.zip.close()
+
+
+def multipart_body(parts: List[tuple]) -> tuple:
+    """Encode (name, filename, content type, bytes) parts as multipart/form-data; returns (content type, body)."""
+    boundary = f'----deploy{uuid.uuid4().hex}'
+    chunks = []
+    for name, filename, content_type, data in parts:
+        disposition = f'form-data; name="{name}"' + (f'; filename="{filename}"' if filename else '')
+        chunks.append(f'--{boundary}\r\nContent-Disposition: {disposition}\r\n'
+                      f'Content-Type: {content_type}\r\n\r\n'.encode('utf-8'))
+        chunks.append(data)
+        chunks.append(b'\r\n')
+    chunks.append(f'--{boundary}--\r\n'.encode('utf-8'))
+    return f'multipart/form-data; boundary={boundary}', b''.join(chunks)
+
+
+def deploy(instance_url: str, access_token: str, zip_data: bytes, check_only: bool = False,
+           api_version: str = PACKAGE_API_VERSION, poll_interval: float = POLL_INTERVAL,
+           timeout: float = DEPLOY_TIMEOUT) -> dict:
+    """Deploy a single-package zip through the REST deployRequest resource; returns the final deployResult."""
+    options = {'deployOptions': {'singlePackage': True, 'checkOnly': check_only, 'rollbackOnError': True}}
+    content_type, body = multipart_body([
+        ('json', None, 'application/json', json.dumps(options).encode('utf-8')),
+        ('file', 'deploy.zip', 'application/zip', zip_data),
+    ])
+    path = DEPLOY_PATH.format(version=api_version)
+    auth = {'Authorization': f'Bearer {access_token}', 'Accept': 'application/json'}
+    pool = ConnectionPool(instance_url)
+    try:
+        status, _, response = pool.request('POST', path, {**auth, 'Content-Type': content_type,
+                                                          'Content-Length': str(len(body))}, body)
+        if status not in (200, 201):
+            raise ValueError(f"deploy request failed: HTTP {status}: {response[:200].decode('utf-8', 'replace')}")
+        deploy_id = json.loads(response)['id']
+        deadline = time.monotonic() + timeout
+        while True:
+            status, _, response = pool.request('GET', f'{path}/{deploy_id}?includeDetails=true', auth)
+            if status != 200:
+                raise ValueError(f"deploy status failed: HTTP {status}: {response[:200].decode('utf-8', 'replace')}")
+            result = json.loads(response)['deployResult']
+            if result.get('done'):
+                return result
+            if time.monotonic() > deadline:
+                raise ValueError(f"deploy {deploy_id} not done after {timeout:.0f}s (status {result.get('status')})")
+            time.sleep(poll_interval)
+    finally:
+        pool.close()
+
+
+def check_package(zip_data: bytes) -> dict:
+    """What the stand-in deploy reports for a zip: a deployResult with componentFailures."""
+    failures = []
+    deployed = 0
+
+    def fail(file_name: str, full_name: str, problem: str, component_type: str = ''):
+        failures.append({'fileName': file_name, 'fullName': full_name, 'componentType': component_type,
+                         'problem': problem, 'problemType': 'Error', 'success': False})
+
+    try:
+        archive = zipfile.ZipFile(io.BytesIO(zip_data))
+        names = set(archive.namelist())
+    except zipfile.BadZipFile as e:
+        names, archive = set(), None
+        fail('', '', f'Invalid zip: {e}')
+
+    members: Dict[str, List[str]] = {}
+    if archive is not None and 'package.xml' not in names:
+        fail('package.xml', 'package.xml', 'No package.xml found')
+    elif archive is not None:
+        try:
+            package = ET.fromstring(archive.read('package.xml'))
+            for types in package.iter(f'{METADATA_NS}types'):
+                members.setdefault(types.findtext(f'{METADATA_NS}name'), []).extend(
+                    member.text for member in types.iter(f'{METADATA_NS}members'))
+        except ET.ParseError as e:
+            fail('package.xml', 'package.xml', f'Error parsing file: {e}')
+
+    object_fields: Dict[str, set] = {}
+    for name in sorted(names - {'package.xml'}):
+        try:
+            root = ET.fromstring(archive.read(name))
+        except ET.ParseError as e:
+            fail(name, name, f'Error parsing file: {e}')
+            continue
+        deployed += 1
+        if name.startswith('objects/'):
+            fields = {field.findtext(f'{METADATA_NS}fullName') for field in root.iter(f'{METADATA_NS}fields')}
+            object_fields[name[len('objects/'):].rsplit('.', 1)[0]] = fields
+            deployed += len(fields)
+
+    for type_name, type_members in members.items():
+        if type_name == 'CustomField':
+            for member in type_members:
+                object_name, _, field_name = member.partition('.')
+                fields = object_fields.get(object_name)
+                if fields is None or (field_name != '*' and field_name not in fields):
+                    fail(f'objects/{object_name}.object', member, f'Entity of type CustomField named {member} '
+                         'cannot be found', type_name)
+        elif type_name in TYPE_PATHS:
+            folder, suffix = TYPE_PATHS[type_name]
+            for member in type_members:
+                if f'{folder}/{member}.{suffix}' not in names:
+                    fail(f'{folder}/{member}.{suffix}', member, f'An object {member} of type {type_name} '
+                         'was named in package.xml, but was not found in zipped directory', type_name)
+
+    return {
+        'status': 'Failed' if failures else 'Succeeded',
+        'success': not failures,
+        'done': True,
+        'numberComponentsDeployed': 0 if failures else deployed,
+        'numberComponentErrors': len(failures),
+        'details': {'componentFailures': failures},
+    }
+
+
+class StubDeployServer(ThreadingHTTPServer):
+    """Local stand-in for the REST deployRequest resource.
+
+    POST takes the multipart json + zip upload and answers 201 with a deploy
+    ID; GET <id> returns the deployResult of check_package. A deploy reports
+    InProgress until latency seconds after its upload. deploys keeps the
+    uploaded zips by ID, for inspection.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, port: int = 0, latency: float = 0.0):
+        self.latency = latency
+        self.deploys: Dict[str, dict] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        super().__init__(('127.0.0.1', port), _DeployHandler)
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self.server_address[1]}'
+
+
+class _DeployHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    deploy_path = re.compile(r'/services/data/v[\d.]+/metadata/deployRequest(?:/(\w+))?/?(?:\?.*)?$')
+
+    def do_POST(self):
+        server: StubDeployServer = self.server
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        match = self.deploy_path.match(self.path)
+        if not self._authorized():
+            return
+        if not match or match.group(1):
+            return self._send(404, [{'errorCode': 'NOT_FOUND'}])
+
+        message = BytesParser(policy=HTTP).parsebytes(
+            f"Content-Type: {self.headers.get('Content-Type', '')}\r\n\r\n".encode('utf-8') + body)
+        parts = {part.get_param('name', header='content-disposition'): part.get_payload(decode=True)
+                 for part in message.iter_parts()} if message.is_multipart() else {}
+        if 'file' not in parts:
+            return self._send(400, [{'errorCode': 'INVALID_MULTIPART_REQUEST', 'message': 'No file part'}])
+        options = json.loads(parts.get('json') or b'{}').get('deployOptions', {})
+
+        with server._lock:
+            deploy_id = f'0Af{next(server._ids):012d}'
+            server.deploys[deploy_id] = {'zip': parts['file'], 'options': options,
+                                         'ready': time.monotonic() + server.latency,
+                                         'result': check_package(parts['file'])}
+        self._send(201, {'id': deploy_id, 'deployOptions': options,
+                         'deployResult': {'id': deploy_id, 'status': 'Pending', 'done': False}})
+
+    def do_GET(self):
+        server: StubDeployServer = self.server
+        match = self.deploy_path.match(self.path)
+        if not self._authorized():
+            return
+        deploy = server.deploys.get(match.group(1)) if match and match.group(1) else None
+        if deploy is None:
+            return self._send(404, [{'errorCode': 'NOT_FOUND'}])
+        if time.monotonic() < deploy['ready']:
+            result = {'status': 'InProgress', 'done': False}
+        else:
+            result = dict(deploy['result'], checkOnly=bool(deploy['options'].get('checkOnly')))
+        self._send(200, {'id': match.group(1), 'deployResult': dict(result, id=match.group(1))})
+
+    def _authorized(self) -> bool:
+        if self.headers.get('Authorization', '').startswith('Bearer '):
+            return True
+        self._send(401, [{'errorCode': 'INVALID_SESSION_ID'}])
+        return False
+
+    def _send(self, status: int, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def print_result(result: dict):
+    print(f"Deploy {result.get('id')}: {result.get('status')} "
+          f"({result.get('numberComponentsDeployed', 0)} components, "
+          f"{result.get('numberComponentErrors', 0)} errors)")
+    for failure in result.get('details', {}).get('componentFailures', []):
+        print(f"  {failure.get('fileName') or failure.get('fullName')}: {failure.get('problem')}")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('zip', nargs='?', help='Deploy zip (from generate_object_metadata.py --zip)')
+    parser.add_argument('--target-org', help='sf CLI org alias or username to take credentials from')
+    parser.add_argument('--instance-url', default=os.environ.get('SF_INSTANCE_URL'),
+                        help='Instance URL (default: $SF_INSTANCE_URL)')
+    parser.add_argument('--access-token', default=os.environ.get('SF_ACCESS_TOKEN'),
+                        help='Access token (default: $SF_ACCESS_TOKEN)')
+    parser.add_argument('--api-version', default=PACKAGE_API_VERSION)
+    parser.add_argument('--check-only', action='store_true', help='Validate without saving (checkOnly)')
+    parser.add_argument('--timeout', type=float, default=DEPLOY_TIMEOUT, help='Seconds to wait for the deploy')
+    parser.add_argument('--serve', action='store_true', help='Run the stub deployRequest server')
+    parser.add_argument('--port', type=int, default=8766, help='Port for --serve')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds each stub deploy stays InProgress')
+    args = parser.parse_args(argv)
+
+    if args.serve:
+        server = StubDeployServer(args.port, args.latency)
+        print(f"Accepting deploys at {server.url}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return
+
+    if not args.zip:
+        parser.error('give the zip to deploy')
+    try:
+        zip_data = Path(args.zip).read_bytes()
+        if args.instance_url and args.access_token:
+            instance_url, access_token = args.instance_url, args.access_token
+        else:
+            instance_url, access_token = org_credentials(args.target_org)
+        start = time.perf_counter()
+        result = deploy(instance_url, access_token, zip_data, args.check_only, args.api_version,
+                        poll_interval=min(POLL_INTERVAL, args.timeout), timeout=args.timeout)
+    except (OSError, http.client.HTTPException, ValueError) as e:
+        raise SystemExit(f"Error: {e}")
+
+    print_result(result)
+    print(f"\n{len(zip_data)} bytes deployed in {time.perf_counter() - start:.2f}s")
+    if not result.get('success'):
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
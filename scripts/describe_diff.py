@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Diff two describe snapshots to find field drift between orgs or sandboxes.
+
+Each side is a describe dump or a directory of them (*.json, in any layout
+describe_stream reads). Describes are paired by object name, and their
+`fields` arrays are streamed without decoding: every raw field entry is hashed,
+and an entry whose hash also occurs on the other side is identical there and
+is never decoded. Only the entries left over are decoded and matched by field
+name, so diffing two snapshots that barely differ costs little more than
+hashing them. Each dump is scanned once to record where its describes start;
+the diff then reads every describe at its offset, so the cost grows linearly
+with the number of objects.
+
+For each object the diff reports:
+  added     fields only in the new snapshot
+  removed   fields only in the old snapshot
+  changed   fields whose describe attributes differ (type, length, precision,
+            scale, nillable, referenceTo, ...), with old and new values and,
+            for picklists, the values added, removed and changed
+and objects present on one side only.
+
+Pass the old snapshot to the generator to rebuild only what drifted:
+    python3 scripts/generate_object_metadata.py --drift-from snapshots/prod
+
+Exits 1 when the snapshots differ, like diff.
+
+Usage:
+    python3 scripts/describe_diff.py OLD NEW                 # files or directories
+    python3 scripts/describe_diff.py OLD NEW --json          # one JSON object per line
+    python3 scripts/describe_diff.py OLD NEW --objects Booking__c
+"""
+
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+import argparse
+import hashlib
+import json
+import time
+from pathlib import Path
+
+from describe_stream import DescribeDump, StreamedDescribe
+
+ADDED = 'added'
+REMOVED = 'removed'
+CHANGED = 'changed'
+
+# Picklist entry attributes compared per value
+PICKLIST_ATTRIBUTES = ('label', 'active', 'defaultValue', 'validFor')
+
+
+class PicklistDelta(NamedTuple):
+    added: List[str]
+    removed: List[str]
+    # value -> attribute -> (old, new)
+    changed: Dict[str, Dict[str, tuple]]
+
+
+class Drift(NamedTuple):
+    """One difference; field_name is empty for an object added or removed as a whole."""
+    object_name: str
+    field_name: str
+    status: str
+    # attribute -> (old, new), for changed fields
+    attributes: Optional[Dict[str, tuple]] = None
+    picklist: Optional[PicklistDelta] = None
+
+    def to_dict(self) -> dict:
+        result = {'object': self.object_name, 'field': self.field_name or None, 'status': self.status}
+        if self.attributes:
+            result['attributes'] = {name: {'old': old, 'new': new}
+                                    for name, (old, new) in self.attributes.items()}
+        if self.picklist:
+            result['picklist'] = {
+                'added': self.picklist.added,
+                'removed': self.picklist.removed,
+                'changed': {value: {name: {'old': old, 'new': new} for name, (old, new) in attributes.items()}
+                            for value, attributes in self.picklist.changed.items()},
+            }
+        return result
+
+    def __str__(self) -> str:
+        if not self.field_name:
+            return f'{self.status} object {self.object_name}'
+        where = f'{self.object_name}.{self.field_name}'
+        if self.status != CHANGED:
+            return f'{self.status} {where}'
+        parts = [f'{name} {_show(old)} -> {_show(new)}' for name, (old, new) in self.attributes.items()]
+        if self.picklist:
+            parts.extend(f'+{value}' for value in self.picklist.added)
+            parts.extend(f'-{value}' for value in self.picklist.removed)
+            parts.extend(f'~{value} ({", ".join(attributes)})' for value, attributes in self.picklist.changed.items())
+        return f'{self.status} {where}: {"; ".join(parts)}'
+
+
+def _show(value) -> str:
+    return json.dumps(value) if isinstance(value, (str, list, dict)) else str(value)
+
+
+def _digest(raw: bytes) -> bytes:
+    return hashlib.blake2b(raw, digest_size=16).digest()
+
+
+def snapshot_files(path: Path) -> List[Path]:
+    if path.is_dir():
+        return sorted(path.glob('*.json'))
+    if path.is_file():
+        return [path]
+    raise FileNotFoundError(f"{path} does not exist")
+
+
+# (dump, byte offset of the describe in it)
+DescribeLocation = Tuple[Path, int]
+
+
+def index_snapshot(path: Path) -> Dict[str, DescribeLocation]:
+    """Object name -> where its describe is, for a dump or a directory of dumps."""
+    objects = {}
+    for json_path in snapshot_files(path):
+        with DescribeDump(str(json_path)) as dump:
+            for describe in dump:
+                objects.setdefault(describe.name, (json_path, describe.offset))
+    return objects
+
+
+class DescribeReader:
+    """Reads describes by location, keeping the last dump open: consecutive objects mostly share one."""
+
+    def __init__(self):
+        self._path: Optional[Path] = None
+        self._dump: Optional[DescribeDump] = None
+
+    def describe(self, location: DescribeLocation) -> StreamedDescribe:
+        """The describe at location; valid until a describe of another dump is read."""
+        path, offset = location
+        if path != self._path:
+            self.close()
+            self._dump = DescribeDump(str(path)).__enter__()
+            self._path = path
+        return self._dump.describe_at(offset)
+
+    def close(self):
+        if self._dump is not None:
+            self._dump.__exit__(None, None, None)
+        self._dump = self._path = None
+
+    def __enter__(self) -> 'DescribeReader':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def diff_picklist(old: list, new: list) -> Optional[PicklistDelta]:
+    old_values = {entry.get('value'): entry for entry in old or []}
+    new_values = {entry.get('value'): entry for entry in new or []}
+    changed = {}
+    for value in old_values.keys() & new_values.keys():
+        attributes = {name: (old_values[value].get(name), new_values[value].get(name))
+                      for name in PICKLIST_ATTRIBUTES
+                      if old_values[value].get(name) != new_values[value].get(name)}
+        if attributes:
+            changed[value] = attributes
+    delta = PicklistDelta([value for value in new_values if value not in old_values],
+                          [value for value in old_values if value not in new_values],
+                          dict(sorted(changed.items())))
+    return delta if delta.added or delta.removed or delta.changed else None
+
+
+def diff_field(old: dict, new: dict) -> Tuple[Dict[str, tuple], Optional[PicklistDelta]]:
+    """Differing attributes (old, new) and the picklist delta of two describes of one field."""
+    attributes = {name: (old.get(name), new.get(name))
+                  for name in sorted(old.keys() | new.keys())
+                  if name != 'picklistValues' and old.get(name) != new.get(name)}
+    return attributes, diff_picklist(old.get('picklistValues'), new.get('picklistValues'))
+
+
+def diff_describes(object_name: str, old: StreamedDescribe, new: StreamedDescribe) -> List[Drift]:
+    """Field drift between two describes of one object, in new-snapshot field order."""
+    old_fields = old.get('fields', [])
+    new_fields = new.get('fields', [])
+    old_spans = {}
+    for span, raw in zip(old_fields.spans, old_fields.raw()):
+        old_spans[_digest(raw)] = span
+    unmatched_new = []
+    for span, raw in zip(new_fields.spans, new_fields.raw()):
+        if old_spans.pop(_digest(raw), None) is None:
+            unmatched_new.append(span)
+
+    # Entries left on the old side were removed or changed; decode them by name
+    old_by_name = {}
+    for span in old_spans.values():
+        field = old_fields.load(span)
+        old_by_name[field.get('name', '')] = field
+    drifts = []
+    for span in unmatched_new:
+        field = new_fields.load(span)
+        name = field.get('name', '')
+        previous = old_by_name.pop(name, None)
+        if previous is None:
+            drifts.append(Drift(object_name, name, ADDED))
+            continue
+        attributes, picklist = diff_field(previous, field)
+        if attributes or picklist:
+            drifts.append(Drift(object_name, name, CHANGED, attributes, picklist))
+    drifts.extend(Drift(object_name, name, REMOVED) for name in sorted(old_by_name))
+    return drifts
+
+
+def diff_snapshots(old_path: Path, new_path: Path, objects: Optional[Iterable[str]] = None) -> Iterator[Drift]:
+    """Yield the drift between two snapshots (dumps or directories), object by object."""
+    old_index = index_snapshot(old_path)
+    new_index = index_snapshot(new_path)
+    names = sorted(old_index.keys() | new_index.keys())
+    if objects is not None:
+        wanted = set(objects)
+        names = [name for name in names if name in wanted]
+    with DescribeReader() as old_reader, DescribeReader() as new_reader:
+        for object_name in names:
+            if object_name not in old_index:
+                yield Drift(object_name, '', ADDED)
+                continue
+            if object_name not in new_index:
+                yield Drift(object_name, '', REMOVED)
+                continue
+            yield from diff_describes(object_name, old_reader.describe(old_index[object_name]),
+                                      new_reader.describe(new_index[object_name]))
+
+
+def drifted_fields(drifts: Iterable[Drift]) -> Dict[str, Optional[Set[str]]]:
+    """Object -> names of its added and changed fields, or None for an object that is new as a whole.
+
+    This is the set the generator needs to rebuild; objects without drift are absent.
+    """
+    fields: Dict[str, Optional[Set[str]]] = {}
+    for drift in drifts:
+        if drift.status == REMOVED:
+            continue
+        if not drift.field_name:
+            fields[drift.object_name] = None
+        elif fields.get(drift.object_name, set()) is not None:
+            fields.setdefault(drift.object_name, set()).add(drift.field_name)
+    return fields
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('old', help='Old snapshot: a describe dump or a directory of them')
+    parser.add_argument('new', help='New snapshot: a describe dump or a directory of them')
+    parser.add_argument('--objects', nargs='+', help='Only diff these objects')
+    parser.add_argument('--json', action='store_true', help='Print each difference as a JSON object per line')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    counts = {ADDED: 0, REMOVED: 0, CHANGED: 0}
+    try:
+        for drift in diff_snapshots(Path(args.old), Path(args.new), args.objects):
+            counts[drift.status] += 1
+            print(json.dumps(drift.to_dict()) if args.json else drift)
+    except (OSError, ValueError) as e:
+        raise SystemExit(f"Error: {e}")
+
+    if not args.json:
+        print(f"\n{counts[ADDED]} added, {counts[REMOVED]} removed, {counts[CHANGED]} changed "
+              f"({(time.perf_counter() - start) * 1000:.0f} ms)")
+    if any(counts.values()):
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Streaming reader for sObject describe dumps.
+
+Workbench raw responses, REST describe downloads and org-wide dumps can run to
+many megabytes. Instead of reading the whole file into a string and calling
+json.loads on it, DescribeDump memory-maps the file, walks the JSON structure
+with a small tokenizer and records only byte offsets. Members of each describe
+(label, name, ...) are decoded on demand and `fields` entries are decoded one
+at a time, so memory use stays flat regardless of the dump size.
+
+Supported layouts:
+  - a single describe object, optionally preceded by raw HTTP headers
+  - several describe objects concatenated in one file (each may carry headers)
+  - wrappers such as a JSON array of describes or composite responses,
+    where describes are nested inside other objects/arrays
+"""
+
+from typing import Iterator, List, Optional, Tuple
+import codecs
+import json
+import mmap
+import re
+
+_STRING_RE = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"')
+_WHITESPACE_RE = re.compile(rb'\s*')
+# Start of the next top-level JSON document (skips HTTP headers and separators)
+_DOCUMENT_START_RE = re.compile(rb'[\[{]')
+
+_DECODER = json.JSONDecoder()
+
+# Initial decode window; grows until the value at the cursor fits
+DECODE_WINDOW = 4 * 1024
+# Containers larger than this are walked member by member instead of decoded whole
+MAX_INLINE_VALUE = 256 * 1024
+
+# How deep to look for describes nested inside wrapper documents
+MAX_NESTING = 4
+
+
+class _ValueTooLarge(Exception):
+    pass
+
+
+def _skip_ws(buf, pos: int) -> int:
+    return _WHITESPACE_RE.match(buf, pos).end()
+
+
+def decode_at(buf, pos: int, max_size: Optional[int] = None) -> Tuple[object, int]:
+    """Decode the JSON value starting at byte offset pos; return (value, end offset).
+
+    Only a window of the buffer around the value is decoded, so the cost is
+    proportional to the value rather than to the whole dump.
+    """
+    total = len(buf)
+    size = DECODE_WINDOW
+    while True:
+        end = min(pos + size, total)
+        # The incremental decoder leaves a multi-byte character cut by the window undecoded
+        text = codecs.getincrementaldecoder('utf-8')().decode(buf[pos:end])
+        try:
+            value, index = _DECODER.raw_decode(text)
+        except json.JSONDecodeError as e:
+            if end >= total:
+                raise ValueError(f'Invalid JSON at offset {pos}: {e}') from None
+            index = None
+        # A value that runs to the edge of the window may have been cut short
+        if index is not None and (index < len(text) or end >= total):
+            consumed = index if text.isascii() else len(text[:index].encode('utf-8'))
+            return value, pos + consumed
+        if max_size is not None and size >= max_size:
+            raise _ValueTooLarge()
+        size *= 4
+
+
+def _skip_value(buf, pos: int) -> int:
+    """Return the offset just past the JSON value starting at pos."""
+    try:
+        return decode_at(buf, pos, MAX_INLINE_VALUE)[1]
+    except _ValueTooLarge:
+        pass
+    if buf[pos:pos + 1] == b'{':
+        spans = [(start, end) for _, start, end in iter_members(buf, pos)]
+        return _expect(buf, spans[-1][1], b'}')
+    spans = list(iter_elements(buf, pos))
+    return _expect(buf, spans[-1][1], b']')
+
+
+def _expect(buf, pos: int, char: bytes) -> int:
+    pos = _skip_ws(buf, pos)
+    if buf[pos:pos + 1] != char:
+        raise ValueError(f'Expected {char.decode()!r} at offset {pos}')
+    return pos + 1
+
+
+def iter_members(buf, pos: int) -> Iterator[Tuple[str, int, int]]:
+    """Yield (key, value_start, value_end) for each member of the object at pos."""
+    pos = _expect(buf, pos, b'{')
+    pos = _skip_ws(buf, pos)
+    if buf[pos:pos + 1] == b'}':
+        return
+    while True:
+        pos = _skip_ws(buf, pos)
+        match = _STRING_RE.match(buf, pos)
+        if not match:
+            raise ValueError(f'Expected an object key at offset {pos}')
+        key = json.loads(match.group())
+        pos = _expect(buf, match.end(), b':')
+        start = _skip_ws(buf, pos)
+        end = _skip_value(buf, start)
+        yield key, start, end
+        pos = _skip_ws(buf, end)
+        separator = buf[pos:pos + 1]
+        if separator == b'}':
+            return
+        if separator != b',':
+            raise ValueError(f'Expected , or }} at offset {pos}')
+        pos += 1
+
+
+def iter_elements(buf, pos: int, decode: bool = False) -> Iterator[tuple]:
+    """Yield (start, end) for each element of the array at pos.
+
+    With decode=True, yield (start, end, value) so callers that need the value
+    do not have to parse each element twice.
+    """
+    pos = _expect(buf, pos, b'[')
+    pos = _skip_ws(buf, pos)
+    if buf[pos:pos + 1] == b']':
+        return
+    while True:
+        start = _skip_ws(buf, pos)
+        if decode:
+            value, end = decode_at(buf, start)
+            yield start, end, value
+        else:
+            end = _skip_value(buf, start)
+            yield start, end
+        pos = _skip_ws(buf, end)
+        separator = buf[pos:pos + 1]
+        if separator == b']':
+            return
+        if separator != b',':
+            raise ValueError(f'Expected , or ] at offset {pos}')
+        pos += 1
+
+
+class FieldStream:
+    """Lazy view over a describe's `fields` array; each entry is decoded on iteration."""
+
+    def __init__(self, buf, start: int):
+        self._buf = buf
+        self._start = start
+        self._spans: Optional[List[Tuple[int, int]]] = None
+
+    @property
+    def spans(self) -> List[Tuple[int, int]]:
+        if self._spans is None:
+            self._spans = list(iter_elements(self._buf, self._start))
+        return self._spans
+
+    def raw(self) -> Iterator[bytes]:
+        """Yield the undecoded JSON bytes of each field entry."""
+        for start, end in self.spans:
+            yield self._buf[start:end]
+
+    def load(self, span: Tuple[int, int]) -> dict:
+        """Decode the field entry at span (one of spans)."""
+        start, end = span
+        return json.loads(self._buf[start:end])
+
+    def __iter__(self) -> Iterator[dict]:
+        if self._spans is not None:
+            for start, end in self._spans:
+                yield json.loads(self._buf[start:end])
+            return
+        spans = []
+        for start, end, value in iter_elements(self._buf, self._start, decode=True):
+            spans.append((start, end))
+            yield value
+        self._spans = spans
+
+    def __len__(self) -> int:
+        return len(self.spans)
+
+
+class StreamedDescribe:
+    """One sObject describe inside a dump. Supports the dict-style `get` used by the generator."""
+
+    def __init__(self, buf, members: dict, offset: int = 0):
+        self._buf = buf
+        self._members = members
+        self._cache = {}
+        # Where the describe object starts in the dump (see DescribeDump.describe_at)
+        self.offset = offset
+
+    def get(self, key: str, default=None):
+        if key not in self._members:
+            return default
+        if key == 'fields':
+            return FieldStream(self._buf, self._members[key][0])
+        if key not in self._cache:
+            start, end = self._members[key]
+            self._cache[key] = json.loads(self._buf[start:end])
+        return self._cache[key]
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._members
+
+    @property
+    def name(self) -> str:
+        return self.get('name', 'Unknown')
+
+
+class DescribeDump:
+    """Memory-mapped describe dump. Use as a context manager and iterate for describes.
+
+    Describes (and their field streams) are only valid while the dump is open.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+        self._buf = None
+
+    def __enter__(self) -> 'DescribeDump':
+        self._file = open(self.path, 'rb')
+        try:
+            self._buf = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped
+            self._buf = b''
+        return self
+
+    def __exit__(self, *exc_info):
+        if isinstance(self._buf, mmap.mmap):
+            self._buf.close()
+        self._file.close()
+        self._buf = None
+        self._file = None
+
+    def describe_at(self, offset: int) -> StreamedDescribe:
+        """The describe starting at offset, as given by a StreamedDescribe's offset on an earlier pass."""
+        members = {key: (start, end) for key, start, end in iter_members(self._buf, offset)}
+        return StreamedDescribe(self._buf, members, offset)
+
+    def __iter__(self) -> Iterator[StreamedDescribe]:
+        buf = self._buf
+        pos = 0
+        while True:
+            match = _DOCUMENT_START_RE.search(buf, pos)
+            if not match:
+                return
+            pos = yield from self._find_describes(match.start(), MAX_NESTING)
+
+    def _find_describes(self, pos: int, depth: int):
+        """Yield the describes found in the value at pos; return the offset past that value."""
+        buf = self._buf
+        first = buf[pos:pos + 1]
+        if first == b'[' and depth > 0:
+            spans = list(iter_elements(buf, pos))
+            for start, _ in spans:
+                yield from self._find_describes(start, depth - 1)
+            return _expect(buf, spans[-1][1], b']') if spans else _skip_value(buf, pos)
+        if first != b'{':
+            return _skip_value(buf, pos)
+
+        members = {key: (start, end) for key, start, end in iter_members(buf, pos)}
+        fields = members.get('fields')
+        if fields and buf[fields[0]:fields[0] + 1] == b'[':
+            yield StreamedDescribe(buf, members, pos)
+        elif depth > 0:
+            for start, _ in members.values():
+                yield from self._find_describes(start, depth - 1)
+        if not members:
+            return _skip_value(buf, pos)
+        return _expect(buf, max(end for _, end in members.values()), b'}')
+
+
+def iter_fields(json_path: str) -> Iterator[Tuple[str, dict]]:
+    """Yield (object_name, field) for every field of every describe in a dump."""
+    with DescribeDump(json_path) as dump:
+        for describe in dump:
+            object_name = describe.name
+            for field in describe.get('fields', []):
+                yield object_name, field
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Derive stable external IDs for dataimport rows, so loads can upsert instead of insert.
+
+The raw exports leave UniqueExternalId__c, ExternalId__c and
+SourceSystemExternalId__c empty and repeat rows verbatim ("Default Tax Group"
+eight times in taxgroup.csv), so every reload inserted another copy. The
+keying stage fills the empty ID columns from a hash of the row's natural key:
+
+  - the object name,
+  - its key columns: Name, plus the per-object extras in NATURAL_KEYS
+    (SetupValue__c names repeat across SetupValueTypeIndexed__c lists), or
+    the columns given with --key-columns OBJECT=COL[,COL...],
+  - its parent context: each relationship's reference value, or the bare
+    "Location__r" value, with "[Object]" placeholders replaced by their --set
+    value. When the parent export is indexed (--parent, or the other files of
+    a bulk_load), the value is replaced by the parent's UniqueExternalId__c, so
+    naming the parent by Name or by external ID gives the same ID. The index
+    keys the parent with the same key columns as the parent's own load.
+
+ExternalId__c gets the hash, SourceSystemExternalId__c the source system
+("dataimport") and UniqueExternalId__c both joined; IDs already present are
+kept. The same row therefore gets the same ID on every run, and ParentIndex
+computes a parent's ID the same way when the parent export has none, so child
+references resolve to it.
+
+In the same hashing pass rows are deduplicated by ID. Exact repeats are
+dropped. Rows whose key collides but whose content differs fail the run with
+KeyCollisionError, since keeping one would silently lose the other
+(eventclassification.csv repeats names that differ only in IsActive__c): add
+key columns to tell them apart
+(--key-columns EventClassification__c=Name,IsActive__c), or pass --keep-first
+to keep the first row and report the rest. With a manifest of the IDs and
+content hashes from the last load, unchanged rows are dropped too, so a reload
+only sends the rows that changed.
+
+Usage (the stage runs inside normalize_import_csv and bulk_load):
+    python3 scripts/normalize_import_csv.py dataimport/taxgroup.csv -o taxgroup_import.csv --synthesize-ids
+    python3 scripts/bulk_load.py dataimport/location.csv dataimport/guestroomtype.csv --upsert \\
+        --set "Location__c=Delphi Default Property" --key-columns GuestroomType__c=Name,SortOrder__c \\
+        --changed-only
+"""
+
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+import hashlib
+import json
+from pathlib import Path
+
+from import_references import KEY_FIELD, ParentIndex, relationship_object
+from normalize_import_csv import PLACEHOLDER, TYPE_COLUMN, Row, Stage
+
+EXTERNAL_ID_FIELD = 'ExternalId__c'
+SOURCE_SYSTEM_FIELD = 'SourceSystemExternalId__c'
+ID_FIELDS = (KEY_FIELD, EXTERNAL_ID_FIELD, SOURCE_SYSTEM_FIELD)
+
+SOURCE_SYSTEM = 'dataimport'
+
+# Hex digits of the sha256 kept in ExternalId__c (80 bits)
+ID_LENGTH = 20
+
+DEFAULT_KEY_COLUMNS = ('Name',)
+# Objects whose Name alone does not identify a record
+NATURAL_KEYS = {
+    'SetupValue__c': ('Name', 'SetupValueTypeIndexed__c'),
+}
+
+# Object -> key columns given on the command line, overriding the defaults above
+KeyColumns = Dict[str, Sequence[str]]
+
+MANIFEST_DIR = Path(__file__).resolve().parent.parent / '.sfdx' / 'external-ids'
+MANIFEST_VERSION = 1
+
+
+class KeyCollision(NamedTuple):
+    line: int
+    key: str
+    first_line: int
+    object_name: str = ''
+
+
+class KeyCollisionError(ValueError):
+    """Two rows derive the same key but hold different values."""
+
+    def __init__(self, collision: KeyCollision):
+        object_name = collision.object_name or 'OBJECT'
+        columns = ','.join(key_columns_for(object_name))
+        super().__init__(f"line {collision.line} has the key of line {collision.first_line} ({collision.key}) "
+                         f"with different values; add key columns that tell them apart (--key-columns "
+                         f"{object_name}={columns},COLUMN) or pass --keep-first to keep line {collision.first_line}")
+        self.collision = collision
+
+
+class KeyingReport:
+    """What the keying stage dropped, filled in as the rows stream through."""
+
+    def __init__(self):
+        self.synthesized = 0
+        self.duplicates = 0
+        self.unchanged = 0
+        self.collisions: List[KeyCollision] = []
+        # unique key -> content hash of every row kept, for the next run's manifest
+        self.hashes: Dict[str, str] = {}
+
+
+def key_columns_for(object_name: str, key_columns: Optional[KeyColumns] = None) -> Sequence[str]:
+    """The columns identifying a row of object_name: given in key_columns, else its natural key."""
+    if key_columns and object_name in key_columns:
+        return key_columns[object_name]
+    return NATURAL_KEYS.get(object_name, DEFAULT_KEY_COLUMNS)
+
+
+def parse_key_columns(specs: Optional[Sequence[str]], object_name: Optional[str] = None) -> KeyColumns:
+    """Parse --key-columns values: "OBJECT=COL[,COL...]", or bare column names for object_name."""
+    key_columns: Dict[str, List[str]] = {}
+    for spec in specs or []:
+        name, sep, columns = spec.rpartition('=')
+        if not sep and object_name is not None:
+            name = object_name
+        if not name or not columns.strip(','):
+            raise ValueError(f"--key-columns expects OBJECT=COL[,COL...], got '{spec}'")
+        key_columns.setdefault(name, []).extend(column for column in columns.split(',') if column)
+    return {name: tuple(columns) for name, columns in key_columns.items()}
+
+
+def synthesize_id(object_name: str, values: Sequence[str]) -> str:
+    payload = '\x1f'.join((object_name, *values))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:ID_LENGTH]
+
+
+def content_hash(row: Row, skip: Sequence[int] = ()) -> str:
+    """Hash of a row's cells, leaving out the columns at skip (the ID columns)."""
+    cells = [cell for i, cell in enumerate(row) if i not in skip]
+    return hashlib.sha1('\x1f'.join(cells).encode('utf-8')).hexdigest()
+
+
+class Keyer:
+    """Computes external IDs for rows of one header layout."""
+
+    def __init__(self, header: Row, object_name: Optional[str] = None,
+                 placeholders: Optional[Dict[str, str]] = None,
+                 key_columns: Optional[KeyColumns] = None, source_system: str = SOURCE_SYSTEM,
+                 parents: Optional[ParentIndex] = None):
+        self.header = header
+        self.object_name = object_name
+        self.placeholders = placeholders or {}
+        self.key_columns = key_columns
+        self.source_system = source_system
+        self.parents = parents
+        self.type_index = header.index(TYPE_COLUMN) if TYPE_COLUMN in header else None
+        self.id_indexes = {name: header.index(name) for name in ID_FIELDS if name in header}
+        self._layouts: Dict[str, List[int]] = {}   # object -> key column indexes
+
+        # relationship -> (reference column index, bare column index); "Location__r.UniqueExternalId__c"
+        # and "Location__r" both describe the Location__r relationship
+        relationships: Dict[str, List[Optional[int]]] = {}
+        for i, name in enumerate(header):
+            relationship, sep, _ = name.partition('.')
+            if sep:
+                relationships.setdefault(relationship, [None, None])[0] = i
+            elif name.endswith('__r'):
+                relationships.setdefault(name, [None, None])[1] = i
+        self.relationships = [(name, *relationships[name]) for name in sorted(relationships)]
+
+    def row_object(self, row: Row) -> Optional[str]:
+        if self.type_index is not None and self.type_index < len(row):
+            match = PLACEHOLDER.fullmatch(row[self.type_index])
+            if match:
+                return match.group(1)
+        return self.object_name
+
+    def _value(self, row: Row, index: Optional[int]) -> str:
+        value = row[index] if index is not None and index < len(row) else ''
+        match = PLACEHOLDER.fullmatch(value)
+        return self.placeholders.get(match.group(1), '') if match else value
+
+    def _key_indexes(self, object_name: str) -> List[int]:
+        layout = self._layouts.get(object_name)
+        if layout is None:
+            names = key_columns_for(object_name, self.key_columns)
+            missing = [name for name in names if name not in self.header]
+            if missing:
+                raise ValueError(f"{object_name}: key columns not in the file: {', '.join(missing)}")
+            layout = self._layouts[object_name] = [self.header.index(name) for name in names]
+        return layout
+
+    def _parent_key(self, relationship: str, value: str) -> str:
+        """The parent's UniqueExternalId__c when it is indexed, else value as given."""
+        if value and self.parents is not None:
+            try:
+                return self.parents.resolve(relationship_object(relationship), value)
+            except LookupError:
+                pass
+        return value
+
+    def natural_key(self, row: Row, object_name: str) -> List[str]:
+        values = [self._value(row, i) for i in self._key_indexes(object_name)]
+        for relationship, reference, bare in self.relationships:
+            values.append(self._parent_key(relationship, self._value(row, reference) or self._value(row, bare)))
+        return values
+
+    def ids(self, row: Row) -> Dict[str, str]:
+        """The ID columns for row: existing values, with the empty ones derived."""
+        object_name = self.row_object(row)
+        if object_name is None:
+            raise ValueError('rows name no object in a "_" column; give the object explicitly')
+        ids = {name: row[i] if i < len(row) else '' for name, i in self.id_indexes.items()}
+        if not ids.get(KEY_FIELD):
+            external_id = ids.get(EXTERNAL_ID_FIELD) or synthesize_id(object_name, self.natural_key(row, object_name))
+            source = ids.get(SOURCE_SYSTEM_FIELD) or self.source_system
+            ids.update({EXTERNAL_ID_FIELD: external_id, SOURCE_SYSTEM_FIELD: source,
+                        KEY_FIELD: f'{source}-{external_id}'})
+        return ids
+
+
+def keying_stage(object_name: Optional[str] = None, placeholders: Optional[Dict[str, str]] = None,
+                 key_columns: Optional[KeyColumns] = None, previous: Optional[Dict[str, str]] = None,
+                 report: Optional[KeyingReport] = None, source_system: str = SOURCE_SYSTEM,
+                 parents: Optional[ParentIndex] = None, keep_first: bool = False) -> Stage:
+    """Stage filling the ID columns and dropping duplicate (and, with previous, unchanged) rows.
+
+    Runs on the raw rows, before the "_" column is dropped. object_name is used
+    when a row does not name its object; key_columns overrides the key columns
+    of the objects it names (give the parent index the same map, so parents
+    are keyed as by their own load). previous maps unique keys to the
+    content hashes of the last load (see load_manifest); report collects what
+    was dropped and the hashes of the rows kept. parents resolves parent
+    references to their keys for the parent context. A key collision raises
+    KeyCollisionError unless keep_first, which keeps the first row and reports
+    the collision.
+    """
+    report = report if report is not None else KeyingReport()
+
+    def assign_ids(header: Row, rows: Iterator[Row]) -> Tuple[Row, Iterator[Row]]:
+        if KEY_FIELD not in header:
+            header = header + [KEY_FIELD]
+        keyer = Keyer(header, object_name, placeholders, key_columns, source_system, parents)
+        skip = set(keyer.id_indexes.values())
+        if keyer.type_index is not None:
+            skip.add(keyer.type_index)
+
+        def keyed() -> Iterator[Row]:
+            seen: Dict[str, Tuple[str, int]] = {}   # unique key -> (content hash, line)
+            for line, row in enumerate(rows, start=2):
+                while len(row) < len(header):
+                    row.append('')
+                ids = keyer.ids(row)
+                key = ids[KEY_FIELD]
+                if not row[keyer.id_indexes[KEY_FIELD]]:
+                    report.synthesized += 1
+                for name, index in keyer.id_indexes.items():
+                    row[index] = ids[name]
+
+                digest = content_hash(row, skip)
+                first = seen.get(key)
+                if first is not None:
+                    if first[0] == digest:
+                        report.duplicates += 1
+                        continue
+                    collision = KeyCollision(line, key, first[1], keyer.row_object(row) or '')
+                    if not keep_first:
+                        raise KeyCollisionError(collision)
+                    report.collisions.append(collision)
+                    continue
+                seen[key] = (digest, line)
+                report.hashes[key] = digest
+                if previous is not None and previous.get(key) == digest:
+                    report.unchanged += 1
+                    continue
+                yield row
+
+        return header, keyed()
+    return assign_ids
+
+
+def manifest_path(object_name: str, directory: Path = MANIFEST_DIR) -> Path:
+    return directory / f'{object_name}.json'
+
+
+def load_manifest(path: Path) -> Dict[str, str]:
+    """Unique key -> content hash of the rows last loaded (empty when there is none)."""
+    try:
+        with open(path, 'r') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if manifest.get('version') != MANIFEST_VERSION:
+        return {}
+    return manifest.get('rows', {})
+
+
+def save_manifest(path: Path, hashes: Dict[str, str]):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump({'version': MANIFEST_VERSION, 'rows': hashes}, f, indent=1, sort_keys=True)
+
+
+def print_report(name: str, report: KeyingReport, limit: int = 5, file=None):
+    parts = [f"{report.synthesized} IDs derived", f"{report.duplicates} duplicates dropped"]
+    if report.unchanged:
+        parts.append(f"{report.unchanged} unchanged skipped")
+    if report.collisions:
+        parts.append(f"{len(report.collisions)} key collisions")
+    print(f"{name}: {', '.join(parts)}", file=file)
+    for collision in report.collisions[:limit]:
+        print(f"  line {collision.line} has the key of line {collision.first_line} ({collision.key}) "
+              f"with different values; kept line {collision.first_line}", file=file)
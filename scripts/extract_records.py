@@ -0,0 +1,612 @@
+#!/usr/bin/env python3
+"""
+Export org records to dataimport-style CSVs, in parallel Id-range chunks.
+
+Replaces the single-threaded export that produced the raw files in
+dataimport/. For each object (any object in the local metadata catalog):
+
+  1. SELECT COUNT() and the lowest and highest Id give the size of the export
+     and the Id range it spans
+  2. the range is split into equal Id ranges of about --chunk-size records
+     (primary-key chunking: Ids are base62 and sort by their characters,
+     so a range is a plain "Id >= lo AND Id < hi" filter on the Id index).
+     Real Ids are sparse and clustered (by pod, by instance migration), so
+     each range is then counted: a range over --chunk-size is split at the
+     middle of the Ids it actually holds and counted again, and neighbouring
+     ranges that fit in one chunk together (the empty ones between clusters)
+     are merged
+  3. every chunk is queried concurrently over one keep-alive connection pool
+     (see fetch_describes.ConnectionPool), following nextRecordsUrl within it,
+     and streamed to its own part file as pages arrive
+  4. the parts are appended to the output in Id order as they finish
+
+so no single query has to cover the whole table, and the export time scales
+with the number of chunks divided by --workers.
+
+The CSV has the layout of the raw exports (see normalize_import_csv): every
+cell quoted, a "_" column holding "[Object]", then Name, the external IDs,
+"<Relationship>" and "<Relationship>.UniqueExternalId__c" for each lookup to
+an object that has UniqueExternalId__c, then the other editable custom fields
+(or --fields). A record with a parent gets the "[Parent]" placeholder in the
+bare relationship column, like the hand-made exports. Lookups to objects
+without UniqueExternalId__c are left out: their Ids mean nothing in another org.
+
+--serve starts StubQueryServer, a local stand-in for the query resource over
+a directory of raw exports, to run an extract offline; --id-clusters spreads
+its Ids over that many clusters far apart, like a migrated org.
+
+Usage:
+    python3 scripts/extract_records.py EventClassification__c Location__c --target-org prod
+    python3 scripts/extract_records.py Item__c --fields IsActive__c UnitPrice__c --output-dir dataimport
+    python3 scripts/extract_records.py --serve dataimport --copies 100 --latency 0.05 &
+    python3 scripts/extract_records.py Item__c --instance-url http://127.0.0.1:8767 --access-token x
+"""
+
+from concurrent.futures import ThreadPoolExecutor, wait
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+from urllib.parse import parse_qs, quote, urlsplit
+import argparse
+import csv
+import http.client
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from fetch_describes import ConnectionPool, org_credentials
+from generate_object_metadata import PACKAGE_API_VERSION
+from import_references import EXTERNAL_ID_FIELDS, KEY_FIELD, relationship_object
+from metadata_catalog import MetadataCatalog, load_catalog
+from normalize_import_csv import PLACEHOLDER, TYPE_COLUMN, read_rows
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+SOURCE_DIR = PROJECT_DIR / 'force-app' / 'main' / 'default'
+DEFAULT_OUTPUT_DIR = PROJECT_DIR / '.sfdx' / 'extracts'
+
+DEFAULT_CHUNK_SIZE = 10_000
+DEFAULT_WORKERS = 8
+# Records per query page (the REST API returns between 200 and 2000)
+PAGE_SIZE = 2000
+
+QUERY_PATH = '/services/data/v{version}/query?q={query}'
+
+# Salesforce Ids: 15 significant base62 characters, in this (ASCII) order
+ID_ALPHABET = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz'
+ID_LENGTH = 15
+# Characters 16-18 of an 18-character Id encode the case of the first 15
+ID_SUFFIX_ALPHABET = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ012345'
+
+# Distance between the Id clusters of the stub server (--id-clusters)
+CLUSTER_GAP = len(ID_ALPHABET) ** 9
+
+IdRange = Tuple[Optional[str], Optional[str]]
+
+
+class ExportColumn(NamedTuple):
+    header: str                         # CSV column name
+    path: Optional[str]                 # SOQL field path, None for the "_" and bare relationship columns
+    parent: Optional[str] = None        # parent object, for relationship columns
+    relationship: Optional[str] = None  # SOQL relationship name, for bare relationship columns
+
+
+class ExtractResult(NamedTuple):
+    object_name: str
+    path: Optional[Path]
+    records: int
+    chunks: int
+    seconds: float
+    error: Optional[str] = None
+
+
+def id_to_int(record_id: str) -> int:
+    value = 0
+    for char in record_id[:ID_LENGTH]:
+        value = value * len(ID_ALPHABET) + ID_ALPHABET.index(char)
+    return value
+
+
+def int_to_id(value: int) -> str:
+    chars = []
+    for _ in range(ID_LENGTH):
+        value, digit = divmod(value, len(ID_ALPHABET))
+        chars.append(ID_ALPHABET[digit])
+    return ''.join(reversed(chars))
+
+
+def id_ranges(first_id: str, last_id: str, chunks: int) -> List[IdRange]:
+    """Split [first_id, last_id] into chunks (lo, hi) ranges; the ends are open (None)."""
+    low, high = id_to_int(first_id), id_to_int(last_id) + 1
+    chunks = max(1, min(chunks, high - low))
+    bounds = [int_to_id(low + (high - low) * i // chunks) for i in range(1, chunks)]
+    return list(zip([None] + bounds, bounds + [None]))
+
+
+def export_columns(catalog: MetadataCatalog, object_name: str,
+                   fields: Optional[List[str]] = None) -> List[ExportColumn]:
+    """The columns of an object's export, in raw export order."""
+    infos = catalog.objects.get(object_name, {})
+    columns = [ExportColumn(TYPE_COLUMN, None), ExportColumn('Name', 'Name')]
+    columns.extend(ExportColumn(name, name) for name in EXTERNAL_ID_FIELDS if name in infos)
+    others = []
+    for name in fields if fields is not None else sorted(infos):
+        info = infos.get(name)
+        if info is None:
+            raise ValueError(f"{object_name} has no field {name} in the source tree")
+        if name in EXTERNAL_ID_FIELDS or not info.editable:
+            continue
+        if info.type in ('Lookup', 'MasterDetail'):
+            parent = info.reference_to
+            if KEY_FIELD not in catalog.objects.get(parent, {}):
+                continue
+            # CSV columns are named after the field (import_references), queries use the relationship name
+            column = name[:-len('__c')] + '__r' if name.endswith('__c') else name
+            relationship = f'{info.relationship_name}__r' if info.relationship_name else column
+            columns.append(ExportColumn(column, None, parent, relationship))
+            columns.append(ExportColumn(f'{column}.{KEY_FIELD}', f'{relationship}.{KEY_FIELD}', parent))
+        else:
+            others.append(ExportColumn(name, name))
+    return columns + others
+
+
+def format_value(value) -> str:
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _lookup(record: dict, path: str):
+    """Value of a dotted SOQL path in a query record (None when a parent is missing)."""
+    value = record
+    for part in path.split('.'):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def export_row(record: dict, object_name: str, columns: List[ExportColumn]) -> List[str]:
+    row = []
+    for column in columns:
+        if column.header == TYPE_COLUMN:
+            row.append(f'[{object_name}]')
+        elif column.path is None:
+            # Bare relationship column: the parent's placeholder when the record has one
+            row.append(f'[{column.parent}]' if record.get(column.relationship) else '')
+        else:
+            row.append(format_value(_lookup(record, column.path)))
+    return row
+
+
+def range_filter(id_range: IdRange) -> str:
+    """The WHERE clause selecting an Id range ('' for an unbounded one)."""
+    low, high = id_range
+    conditions = []
+    if low:
+        conditions.append(f"Id >= '{low}'")
+    if high:
+        conditions.append(f"Id < '{high}'")
+    return f" WHERE {' AND '.join(conditions)}" if conditions else ''
+
+
+class Extractor:
+    """Runs the chunked queries of one extract against one org."""
+
+    def __init__(self, pool: ConnectionPool, access_token: str, api_version: str = PACKAGE_API_VERSION):
+        self.pool = pool
+        self.api_version = api_version
+        self.headers = {'Authorization': f'Bearer {access_token}', 'Accept': 'application/json',
+                        'Sforce-Query-Options': f'batchSize={PAGE_SIZE}'}
+
+    def _get(self, path: str) -> dict:
+        status, _, body = self.pool.request('GET', path, self.headers)
+        if status != 200:
+            raise ValueError(f"HTTP {status}: {body[:200].decode('utf-8', errors='replace')}")
+        return json.loads(body)
+
+    def query(self, soql: str) -> Iterator[dict]:
+        """Records of a query, page by page."""
+        page = self._get(QUERY_PATH.format(version=self.api_version, query=quote(soql)))
+        while True:
+            yield from page.get('records', [])
+            if page.get('done', True) or not page.get('nextRecordsUrl'):
+                return
+            page = self._get(page['nextRecordsUrl'])
+
+    def count(self, object_name: str, id_range: IdRange = (None, None)) -> int:
+        soql = f'SELECT COUNT() FROM {object_name}{range_filter(id_range)}'
+        return self._get(QUERY_PATH.format(version=self.api_version, query=quote(soql)))['totalSize']
+
+    def bound(self, object_name: str, order: str, id_range: IdRange = (None, None)) -> Optional[str]:
+        records = list(self.query(f'SELECT Id FROM {object_name}{range_filter(id_range)} ORDER BY Id {order} LIMIT 1'))
+        return records[0]['Id'] if records else None
+
+    def split(self, object_name: str, id_range: IdRange) -> Optional[List[IdRange]]:
+        """Split a range at the middle of the Ids it holds, so both halves hold records; None for a single Id."""
+        first = self.bound(object_name, 'ASC', id_range)
+        last = self.bound(object_name, 'DESC', id_range)
+        if not first or not last:
+            return None
+        low, high = id_to_int(first), id_to_int(last) + 1
+        if high - low < 2:
+            return None
+        middle = int_to_id((low + high) // 2)
+        return [(id_range[0], middle), (middle, id_range[1])]
+
+    def extract_chunk(self, object_name: str, columns: List[ExportColumn], id_range: IdRange,
+                      part_path: Path) -> int:
+        """Stream one Id range into a CSV part file (no header); returns the records written."""
+        paths = [column.path for column in columns if column.path]
+        soql = f"SELECT {', '.join(paths)} FROM {object_name}{range_filter(id_range)} ORDER BY Id"
+        count = 0
+        with open(part_path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f, quoting=csv.QUOTE_ALL, lineterminator='\n')
+            for record in self.query(soql):
+                writer.writerow(export_row(record, object_name, columns))
+                count += 1
+        return count
+
+
+def plan_ranges(extractor: Extractor, executor: ThreadPoolExecutor, object_name: str, total: int,
+                chunk_size: int = DEFAULT_CHUNK_SIZE) -> List[IdRange]:
+    """Id ranges of at most chunk_size records each (unless one Id range cannot be split), in Id order.
+
+    Starts from equal slices of the Id span and counts them concurrently. A
+    slice over chunk_size is split at the middle of the Ids it holds and its
+    halves are counted in the next round; then neighbouring ranges are merged
+    while they fit in one chunk, which folds the empty ranges between Id
+    clusters into their neighbours.
+    """
+    first = extractor.bound(object_name, 'ASC') if total else None
+    last = extractor.bound(object_name, 'DESC') if total else None
+    if not first or not last:
+        return []
+    pending = id_ranges(first, last, -(-total // chunk_size))
+    counted: List[Tuple[IdRange, int]] = []
+    while pending:
+        counts = list(executor.map(lambda id_range: extractor.count(object_name, id_range), pending))
+        oversized = []
+        for id_range, count in zip(pending, counts):
+            (oversized if count > chunk_size else counted).append((id_range, count))
+        splits = list(executor.map(lambda item: extractor.split(object_name, item[0]), oversized))
+        pending = []
+        for item, halves in zip(oversized, splits):
+            if halves is None:
+                counted.append(item)
+            else:
+                pending.extend(halves)
+
+    # Ranges partition the Id space: sort by lower bound (the open one first) and merge neighbours
+    counted.sort(key=lambda item: (item[0][0] is not None, item[0][0] or ''))
+    ranges: List[IdRange] = []
+    size = 0
+    for (low, high), count in counted:
+        if ranges and size + count <= chunk_size:
+            ranges[-1] = (ranges[-1][0], high)
+            size += count
+        else:
+            ranges.append((low, high))
+            size = count
+    return ranges
+
+
+def extract_object(extractor: Extractor, executor: ThreadPoolExecutor, object_name: str,
+                   columns: List[ExportColumn], output_path: Path, chunk_size: int = DEFAULT_CHUNK_SIZE) -> ExtractResult:
+    """Export one object to output_path; chunks run on executor and are appended in Id order."""
+    start = time.perf_counter()
+    total = extractor.count(object_name)
+    ranges = plan_ranges(extractor, executor, object_name, total, chunk_size)
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    temp = output_path.with_name(f'.{output_path.name}.tmp')
+    records = 0
+    try:
+        with tempfile.TemporaryDirectory(dir=output_path.parent) as parts_dir, \
+                open(temp, 'w', encoding='utf-8', newline='') as f:
+            csv.writer(f, quoting=csv.QUOTE_ALL, lineterminator='\n').writerow([column.header for column in columns])
+            parts = [Path(parts_dir) / f'{i}.csv' for i in range(len(ranges))]
+            futures = [executor.submit(extractor.extract_chunk, object_name, columns, id_range, part)
+                       for id_range, part in zip(ranges, parts)]
+            try:
+                for future, part in zip(futures, parts):
+                    records += future.result()
+                    with open(part, 'r', encoding='utf-8', newline='') as chunk:
+                        shutil.copyfileobj(chunk, f)
+                    part.unlink()
+            except BaseException:
+                # Let running chunks finish before their part files are removed
+                for future in futures:
+                    future.cancel()
+                wait(futures)
+                raise
+        os.replace(temp, output_path)
+    except BaseException:
+        temp.unlink(missing_ok=True)
+        raise
+    return ExtractResult(object_name, output_path, records, len(ranges), time.perf_counter() - start)
+
+
+def extract_all(objects: List[str], catalog: MetadataCatalog, instance_url: str, access_token: str,
+                output_dir: Path, fields: Optional[List[str]] = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                workers: int = DEFAULT_WORKERS, api_version: str = PACKAGE_API_VERSION) -> List[ExtractResult]:
+    """Export each object in turn; the chunks of each run concurrently on one pool."""
+    pool = ConnectionPool(instance_url)
+    extractor = Extractor(pool, access_token, api_version)
+    results = []
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            for object_name in objects:
+                start = time.perf_counter()
+                try:
+                    columns = export_columns(catalog, object_name, fields)
+                    results.append(extract_object(extractor, executor, object_name, columns,
+                                                  output_dir / f'{object_name}.csv', chunk_size))
+                except (OSError, http.client.HTTPException, ValueError, KeyError) as e:
+                    results.append(ExtractResult(object_name, None, 0, 0, time.perf_counter() - start, str(e)))
+    finally:
+        pool.close()
+    return results
+
+
+def to_18(record_id: str) -> str:
+    """The 18-character form of a 15-character Id."""
+    suffix = ''
+    for i in range(0, ID_LENGTH, 5):
+        bits = sum(1 << j for j, char in enumerate(record_id[i:i + 5]) if char.isupper())
+        suffix += ID_SUFFIX_ALPHABET[bits]
+    return record_id + suffix
+
+
+class StubQueryServer(ThreadingHTTPServer):
+    """Local stand-in for the REST query resource over a directory of raw exports.
+
+    Each raw export (a CSV with a "_" type column) becomes the records of its
+    object, repeated copies times, with generated Ids (contiguous, or split
+    over id_clusters clusters CLUSTER_GAP apart). A "[Parent]"
+    placeholder links a record to the first record of that parent, and
+    relationship names are taken from the catalog. The server
+    answers the queries Extractor sends (COUNT() and Id bounds, over the
+    whole object or an Id range, and Id-range selects with relationship
+    fields), pages results by page_size with
+    nextRecordsUrl, and adds latency to every request. requests and
+    connections count what the server saw.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, root: Path, catalog: MetadataCatalog, port: int = 0, latency: float = 0.0,
+                 copies: int = 1, page_size: int = PAGE_SIZE, id_clusters: int = 1):
+        self.latency = latency
+        self.page_size = page_size
+        self.requests = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+        # cursor id -> (records, next offset, fields)
+        self._cursors: Dict[str, Tuple[List[dict], int, List[str]]] = {}
+        # (object, "<relationshipName>__r") -> lookup field, from the catalog
+        self._relationships = {(object_name, f'{info.relationship_name}__r'): name
+                               for object_name, fields in catalog.objects.items()
+                               for name, info in fields.items() if info.relationship_name}
+        self.records: Dict[str, List[dict]] = {}
+        self._by_id: Dict[str, dict] = {}
+        self._load(Path(root), copies, max(1, id_clusters))
+        super().__init__(('127.0.0.1', port), _QueryHandler)
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self.server_address[1]}'
+
+    def process_request(self, request, client_address):
+        with self._lock:
+            self.connections += 1
+        super().process_request(request, client_address)
+
+    def _load(self, root: Path, copies: int, id_clusters: int = 1):
+        rows_by_object: Dict[str, List[dict]] = {}
+        for path in sorted(root.glob('*.csv')):
+            header, rows = read_rows(path)
+            if TYPE_COLUMN not in header:
+                # Drain the rows so read_rows closes the file
+                for _ in rows:
+                    pass
+                continue
+            for row in rows:
+                record = dict(zip(header, row))
+                match = PLACEHOLDER.fullmatch(record.pop(TYPE_COLUMN, ''))
+                if match:
+                    rows_by_object.setdefault(match.group(1), []).append(record)
+        for number, (object_name, rows) in enumerate(sorted(rows_by_object.items())):
+            prefix = 'a0' + ID_ALPHABET[number % len(ID_ALPHABET)]
+            records = []
+            count = len(rows) * copies
+            for i in range(count):
+                record = {name: value for name, value in rows[i % len(rows)].items() if '.' not in name}
+                # Equal blocks of consecutive Ids, the blocks CLUSTER_GAP apart
+                cluster = i * id_clusters // count
+                record['Id'] = to_18(prefix + int_to_id(cluster * CLUSTER_GAP + i + 1)[3:])
+                records.append(record)
+                self._by_id[record['Id']] = record
+            self.records[object_name] = records
+        # Placeholders point at the first record of the parent object
+        for records in self.records.values():
+            for record in records:
+                for name, value in list(record.items()):
+                    match = PLACEHOLDER.fullmatch(value) if isinstance(value, str) else None
+                    if match and self.records.get(match.group(1)):
+                        record[relationship_object(name)] = self.records[match.group(1)][0]['Id']
+
+    def field(self, object_name: str, record: dict, path: str):
+        """A field path of a record, with a relationship ("Parent__r.Field") as a nested record."""
+        name, sep, rest = path.partition('.')
+        if not sep:
+            return record.get(name) or None
+        lookup = self._relationships.get((object_name, name), relationship_object(name))
+        parent = self._by_id.get(record.get(lookup, ''))
+        return None if parent is None else {'attributes': {}, rest: parent.get(rest) or None}
+
+    def open_cursor(self, object_name: str, records: List[dict], fields: List[str]) -> dict:
+        with self._lock:
+            cursor = f'01g{len(self._cursors):012d}'
+            self._cursors[cursor] = (records, 0, [object_name] + fields)
+        return self.next_page(cursor)
+
+    def next_page(self, cursor: str) -> dict:
+        with self._lock:
+            records, offset, fields = self._cursors[cursor]
+            page = records[offset:offset + self.page_size]
+            done = offset + len(page) >= len(records)
+            self._cursors[cursor] = (records, offset + len(page), fields)
+        object_name, fields = fields[0], fields[1:]
+        result = {'totalSize': len(records), 'done': done,
+                  'records': [{'attributes': {}, **{path.split('.', 1)[0]: self.field(object_name, record, path)
+                                                     for path in fields}}
+                              for record in page]}
+        if not done:
+            result['nextRecordsUrl'] = f'/services/data/v{PACKAGE_API_VERSION}/query/{cursor}-{offset + len(page)}'
+        return result
+
+
+# SOQL the stub understands: the shapes Extractor generates
+_COUNT = re.compile(r'SELECT COUNT\(\) FROM (\w+)(?: WHERE (.+?))?$')
+_SELECT = re.compile(r"SELECT (.+?) FROM (\w+)(?: WHERE (.+?))? ORDER BY Id(?: (ASC|DESC))?(?: LIMIT (\d+))?$")
+_ID_CONDITION = re.compile(r"Id (>=|<) '(\w+)'$")
+
+
+class _QueryHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    query_path = re.compile(r'/services/data/v[\d.]+/query(?:/(\w+)-\d+)?/?(?:\?|$)')
+
+    def do_GET(self):
+        server: StubQueryServer = self.server
+        with server._lock:
+            server.requests += 1
+        if server.latency:
+            time.sleep(server.latency)
+        if not self.headers.get('Authorization', '').startswith('Bearer '):
+            return self._send(401, [{'errorCode': 'INVALID_SESSION_ID'}])
+        match = self.query_path.match(self.path)
+        if not match:
+            return self._send(404, [{'errorCode': 'NOT_FOUND'}])
+        if match.group(1):
+            return self._send(200, server.next_page(match.group(1)))
+
+        soql = parse_qs(urlsplit(self.path).query).get('q', [''])[0]
+        count = _COUNT.match(soql)
+        if count:
+            records = self._filter(server.records.get(count.group(1), []), count.group(2))
+            if records is None:
+                return self._send(400, [{'errorCode': 'MALFORMED_QUERY', 'message': soql}])
+            return self._send(200, {'totalSize': len(records), 'done': True, 'records': []})
+        select = _SELECT.match(soql)
+        if not select or select.group(2) not in server.records:
+            return self._send(400, [{'errorCode': 'MALFORMED_QUERY', 'message': soql}])
+        fields, object_name, where, order, limit = select.groups()
+        records = self._filter(server.records[object_name], where)
+        if records is None:
+            return self._send(400, [{'errorCode': 'MALFORMED_QUERY', 'message': where}])
+        records = sorted(records, key=lambda record: record['Id'][:ID_LENGTH], reverse=order == 'DESC')
+        if limit:
+            records = records[:int(limit)]
+        self._send(200, server.open_cursor(object_name, records, [field.strip() for field in fields.split(',')]))
+
+    @staticmethod
+    def _filter(records: List[dict], where: Optional[str]) -> Optional[List[dict]]:
+        """The records matching an Id-range WHERE clause; None when it is not one."""
+        for condition in (where.split(' AND ') if where else []):
+            id_condition = _ID_CONDITION.match(condition)
+            if not id_condition:
+                return None
+            operator, bound = id_condition.groups()
+            bound = bound[:ID_LENGTH]
+            records = [record for record in records
+                       if (record['Id'][:ID_LENGTH] >= bound) == (operator == '>=')]
+        return records
+
+    def _send(self, status: int, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('objects', nargs='*', help='Objects to export (must be in the source tree)')
+    parser.add_argument('--source-dir', default=str(SOURCE_DIR), help='SFDX source directory holding objects/')
+    parser.add_argument('--fields', nargs='+',
+                        help='Custom fields to export besides Name and the external IDs '
+                             '(default: every editable custom field)')
+    parser.add_argument('--output-dir', default=str(DEFAULT_OUTPUT_DIR), help='Where to write <Object>.csv')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='Records per Id-range chunk')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='Chunks queried concurrently')
+    parser.add_argument('--target-org', help='sf CLI org alias or username to take credentials from')
+    parser.add_argument('--instance-url', default=os.environ.get('SF_INSTANCE_URL'),
+                        help='Instance URL (default: $SF_INSTANCE_URL)')
+    parser.add_argument('--access-token', default=os.environ.get('SF_ACCESS_TOKEN'),
+                        help='Access token (default: $SF_ACCESS_TOKEN)')
+    parser.add_argument('--api-version', default=PACKAGE_API_VERSION)
+    parser.add_argument('--serve', metavar='DIR', help='Run the stub query server over the raw exports in DIR')
+    parser.add_argument('--port', type=int, default=8767, help='Port for --serve')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds of added latency for --serve')
+    parser.add_argument('--copies', type=int, default=1, help='Times each exported row is repeated for --serve')
+    parser.add_argument('--id-clusters', type=int, default=1,
+                        help='Spread the Ids of --serve over this many clusters far apart (default: contiguous)')
+    args = parser.parse_args(argv)
+
+    if args.serve:
+        server = StubQueryServer(Path(args.serve), load_catalog(Path(args.source_dir)), args.port, args.latency,
+                                 args.copies, id_clusters=args.id_clusters)
+        counts = ', '.join(f'{name} {len(records)}' for name, records in sorted(server.records.items()))
+        print(f"Serving {counts} at {server.url}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return
+
+    if not args.objects:
+        parser.error('give at least one object')
+    if args.chunk_size < 1:
+        parser.error('--chunk-size must be at least 1')
+    try:
+        catalog = load_catalog(Path(args.source_dir))
+        missing = [name for name in args.objects if name not in catalog.objects]
+        if missing:
+            raise ValueError(f"objects not found under {Path(args.source_dir) / 'objects'}: {', '.join(missing)}")
+        if args.instance_url and args.access_token:
+            instance_url, access_token = args.instance_url, args.access_token
+        else:
+            instance_url, access_token = org_credentials(args.target_org)
+        start = time.perf_counter()
+        results = extract_all(args.objects, catalog, instance_url, access_token, Path(args.output_dir),
+                              args.fields, args.chunk_size, args.workers, args.api_version)
+    except ValueError as e:
+        raise SystemExit(f"Error: {e}")
+
+    for result in results:
+        if result.error:
+            print(f"{result.object_name}: failed ({result.error})")
+        else:
+            print(f"{result.object_name}: {result.records} records in {result.chunks} chunks, "
+                  f"{result.seconds:.2f}s -> {result.path}")
+    print(f"\n{sum(result.records for result in results)} records in {time.perf_counter() - start:.2f}s")
+    if any(result.error for result in results):
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
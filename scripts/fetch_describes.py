@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+Fetch sObject describes from an org concurrently, with conditional-request caching.
+
+Replaces hand-downloading each describe from Workbench: every object's
+/services/data/vXX.X/sobjects/<Object>/describe is requested in parallel over
+a pool of keep-alive connections, so refreshing 20 objects costs about one
+round trip rather than 20. Responses are kept in .sfdx/describe-cache with
+their ETag and Last-Modified; later fetches send If-None-Match and
+If-Modified-Since, and an unchanged describe comes back as a bodyless 304.
+
+Each describe is written to <output-dir>/<Object>.json (left untouched when
+unchanged) in the format generate_object_metadata.py reads. --generate runs
+process_object on them and writes the package.xml.
+
+Credentials come from --instance-url and --access-token (or SF_INSTANCE_URL /
+SF_ACCESS_TOKEN), else from `sf org display` for --target-org.
+
+--serve starts StubRestServer, a local stand-in for the REST API that serves
+<Object>.json files from a directory with ETag/Last-Modified handling, to run
+the fetch offline.
+
+Usage:
+    python3 scripts/fetch_describes.py Booking__c BookingEvent__c EventItem__c --target-org dev
+    python3 scripts/fetch_describes.py Booking__c --target-org dev --generate "$PWD"
+    python3 scripts/fetch_describes.py --serve ~/Downloads --port 8765 &
+    python3 scripts/fetch_describes.py Booking__c --instance-url http://127.0.0.1:8765 --access-token x
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import urlsplit
+import argparse
+import hashlib
+import http.client
+import json
+import os
+import queue
+import re
+import subprocess
+import threading
+import time
+from pathlib import Path
+
+from generate_object_metadata import PACKAGE_API_VERSION, generate_package_xml, process_object, write_if_changed
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+CACHE_DIR = PROJECT_DIR / '.sfdx' / 'describe-cache'
+DEFAULT_OUTPUT_DIR = PROJECT_DIR / '.sfdx' / 'describes'
+CACHE_VERSION = 1
+DEFAULT_WORKERS = 16
+
+DESCRIBE_PATH = '/services/data/v{version}/sobjects/{object_name}/describe'
+
+# Connection failures after which a request is retried once on a fresh connection
+# (a pooled keep-alive connection may have been closed by the server meanwhile)
+STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, http.client.CannotSendRequest,
+                           ConnectionResetError, BrokenPipeError)
+
+
+class FetchResult(NamedTuple):
+    object_name: str
+    path: Optional[Path]
+    status: int               # 200, 304, or 0 when the request failed
+    seconds: float
+    size: int = 0             # bytes received
+    error: Optional[str] = None
+
+
+class ConnectionPool:
+    """Keep-alive HTTP(S) connections to one host, reused across threads."""
+
+    def __init__(self, base_url: str, timeout: float = 60.0):
+        parts = urlsplit(base_url)
+        if parts.scheme not in ('http', 'https'):
+            raise ValueError(f"Unsupported instance URL: {base_url}")
+        self.host = parts.netloc
+        self.timeout = timeout
+        self._connection_class = (http.client.HTTPSConnection if parts.scheme == 'https'
+                                  else http.client.HTTPConnection)
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+        self.opened = 0
+
+    def _connect(self) -> http.client.HTTPConnection:
+        self.opened += 1
+        return self._connection_class(self.host, timeout=self.timeout)
+
+    def request(self, method: str, path: str, headers: Dict[str, str],
+                body: Optional[bytes] = None) -> Tuple[int, Dict[str, str], bytes]:
+        """Send a request on an idle connection (or a new one); returns (status, headers, body)."""
+        try:
+            connection = self._idle.get_nowait()
+            reused = True
+        except queue.Empty:
+            connection, reused = self._connect(), False
+        try:
+            try:
+                connection.request(method, path, body, headers=headers)
+                response = connection.getresponse()
+            except STALE_CONNECTION_ERRORS:
+                if not reused:
+                    raise
+                connection.close()
+                connection = self._connect()
+                connection.request(method, path, body, headers=headers)
+                response = connection.getresponse()
+            body = response.read()
+        except BaseException:
+            connection.close()
+            raise
+        if response.will_close:
+            connection.close()
+        else:
+            self._idle.put(connection)
+        return response.status, {name.lower(): value for name, value in response.getheaders()}, body
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class DescribeCache:
+    """Describe bodies and their validators (ETag, Last-Modified), one JSON file per object."""
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.index_path = directory / 'index.json'
+        self.entries: Dict[str, dict] = {}
+        try:
+            with open(self.index_path, 'r') as f:
+                index = json.load(f)
+            if index.get('version') == CACHE_VERSION:
+                self.entries = index.get('objects', {})
+        except (OSError, ValueError):
+            pass
+
+    def body_path(self, object_name: str) -> Path:
+        return self.directory / f'{object_name}.json'
+
+    def validators(self, object_name: str) -> Dict[str, str]:
+        """Conditional request headers for a cached describe (none if the body is gone)."""
+        entry = self.entries.get(object_name)
+        if not entry or not self.body_path(object_name).exists():
+            return {}
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def store(self, object_name: str, headers: Dict[str, str], body: bytes):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.body_path(object_name).write_bytes(body)
+        self.entries[object_name] = {'etag': headers.get('etag'), 'last_modified': headers.get('last-modified')}
+
+    def save(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        write_if_changed(self.index_path, json.dumps({'version': CACHE_VERSION, 'objects': self.entries},
+                                                     indent=2, sort_keys=True))
+
+
+def fetch_describe(pool: ConnectionPool, cache: DescribeCache, object_name: str, access_token: str,
+                   output_dir: Path, api_version: str = PACKAGE_API_VERSION) -> FetchResult:
+    """Fetch one describe (conditionally when cached) and write <output_dir>/<Object>.json."""
+    start = time.perf_counter()
+    headers = {'Authorization': f'Bearer {access_token}', 'Accept': 'application/json',
+               'Accept-Encoding': 'identity', **cache.validators(object_name)}
+    path = DESCRIBE_PATH.format(version=api_version, object_name=object_name)
+    try:
+        status, response_headers, body = pool.request('GET', path, headers)
+    except (OSError, http.client.HTTPException) as e:
+        # IncompleteRead, BadStatusLine, ... are not OSErrors; one bad response must not abort the batch
+        return FetchResult(object_name, None, 0, time.perf_counter() - start, error=str(e))
+
+    if status == 304:
+        body = cache.body_path(object_name).read_bytes()
+    elif status == 200:
+        cache.store(object_name, response_headers, body)
+    else:
+        return FetchResult(object_name, None, 0, time.perf_counter() - start, len(body),
+                           error=f"HTTP {status}: {body[:200].decode('utf-8', errors='replace')}")
+
+    output_path = output_dir / f'{object_name}.json'
+    write_if_changed(output_path, body.decode('utf-8'))
+    return FetchResult(object_name, output_path, status, time.perf_counter() - start,
+                       len(body) if status == 200 else 0)
+
+
+def fetch_all(objects: List[str], instance_url: str, access_token: str, output_dir: Path,
+              cache_dir: Path = CACHE_DIR, workers: int = DEFAULT_WORKERS,
+              api_version: str = PACKAGE_API_VERSION) -> List[FetchResult]:
+    """Fetch the describes of objects in parallel; results are in input order."""
+    output_dir.mkdir(parents=True, exist_ok=True)
+    cache = DescribeCache(cache_dir)
+    pool = ConnectionPool(instance_url)
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(objects)))) as executor:
+            results = list(executor.map(
+                lambda name: fetch_describe(pool, cache, name, access_token, output_dir, api_version), objects))
+    finally:
+        pool.close()
+    cache.save()
+    return results
+
+
+def org_credentials(target_org: Optional[str] = None) -> Tuple[str, str]:
+    """(instance URL, access token) of an org authorized with the sf CLI."""
+    command = ['sf', 'org', 'display', '--json']
+    if target_org:
+        command += ['--target-org', target_org]
+    try:
+        output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+    except FileNotFoundError:
+        raise ValueError("sf CLI not found; pass --instance-url and --access-token instead")
+    except subprocess.CalledProcessError as e:
+        raise ValueError(f"sf org display failed: {(e.stdout or e.stderr).strip()}")
+    result = json.loads(output).get('result', {})
+    if not result.get('instanceUrl') or not result.get('accessToken'):
+        raise ValueError("sf org display returned no instance URL or access token")
+    return result['instanceUrl'], result['accessToken']
+
+
+class StubRestServer(ThreadingHTTPServer):
+    """Local stand-in for the describe REST resource, serving <root>/<Object>.json.
+
+    Responds with an ETag (hash of the file) and Last-Modified (its mtime) and
+    honours If-None-Match / If-Modified-Since with 304. latency is added to
+    every request, like a network round trip. requests and connections count
+    what the server saw, to check that connections are reused.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, root: Path, port: int = 0, latency: float = 0.0):
+        self.root = Path(root)
+        self.latency = latency
+        self.requests = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+        super().__init__(('127.0.0.1', port), _StubHandler)
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self.server_address[1]}'
+
+    def process_request(self, request, client_address):
+        with self._lock:
+            self.connections += 1
+        super().process_request(request, client_address)
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    describe_path = re.compile(r'/services/data/v[\d.]+/sobjects/(\w+)/describe/?$')
+
+    def do_GET(self):
+        server: StubRestServer = self.server
+        with server._lock:
+            server.requests += 1
+        if server.latency:
+            time.sleep(server.latency)
+
+        match = self.describe_path.match(self.path)
+        path = server.root / f'{match.group(1)}.json' if match else None
+        if not self.headers.get('Authorization', '').startswith('Bearer '):
+            return self._send(401, b'[{"errorCode":"INVALID_SESSION_ID"}]')
+        if path is None or not path.is_file():
+            return self._send(404, b'[{"errorCode":"NOT_FOUND"}]')
+
+        body = path.read_bytes()
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        mtime = int(path.stat().st_mtime)
+        headers = {'ETag': etag, 'Last-Modified': formatdate(mtime, usegmt=True)}
+        if self.headers.get('If-None-Match') == etag or self._not_modified_since(mtime):
+            return self._send(304, b'', headers)
+        self._send(200, body, headers)
+
+    def _not_modified_since(self, mtime: int) -> bool:
+        since = self.headers.get('If-Modified-Since')
+        if not since or self.headers.get('If-None-Match'):
+            return False
+        try:
+            return mtime <= parsedate_to_datetime(since).timestamp()
+        except (TypeError, ValueError):
+            return False
+
+    def _send(self, status: int, body: bytes, headers: Optional[Dict[str, str]] = None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if status != 304:
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if status != 304:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def generate(results: List[FetchResult], project_dir: Path):
+    """Feed the fetched describes to the metadata generator."""
+    output_base = project_dir / 'force-app' / 'main' / 'default'
+    objects = [process_object(str(result.path), str(output_base))['object_name']
+               for result in results if result.path]
+    if objects:
+        manifest_dir = project_dir / 'manifest'
+        manifest_dir.mkdir(exist_ok=True)
+        generate_package_xml(objects, str(manifest_dir))
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('objects', nargs='*', help='sObject API names to fetch')
+    parser.add_argument('--target-org', help='sf CLI org alias or username to take credentials from')
+    parser.add_argument('--instance-url', default=os.environ.get('SF_INSTANCE_URL'),
+                        help='Instance URL (default: $SF_INSTANCE_URL)')
+    parser.add_argument('--access-token', default=os.environ.get('SF_ACCESS_TOKEN'),
+                        help='Access token (default: $SF_ACCESS_TOKEN)')
+    parser.add_argument('--api-version', default=PACKAGE_API_VERSION)
+    parser.add_argument('--output-dir', default=str(DEFAULT_OUTPUT_DIR), help='Where to write <Object>.json')
+    parser.add_argument('--cache-dir', default=str(CACHE_DIR), help='Conditional-request cache directory')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='Concurrent requests')
+    parser.add_argument('--generate', metavar='PROJECT_DIR',
+                        help='Generate object metadata from the fetched describes into this SFDX project')
+    parser.add_argument('--serve', metavar='DIR', help='Run the stub REST server over DIR/<Object>.json')
+    parser.add_argument('--port', type=int, default=8765, help='Port for --serve')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds of added latency for --serve')
+    args = parser.parse_args(argv)
+
+    if args.serve:
+        server = StubRestServer(Path(args.serve), args.port, args.latency)
+        print(f"Serving describes from {args.serve} at {server.url}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return
+
+    if not args.objects:
+        parser.error('give at least one object')
+    try:
+        if args.instance_url and args.access_token:
+            instance_url, access_token = args.instance_url, args.access_token
+        else:
+            instance_url, access_token = org_credentials(args.target_org)
+        start = time.perf_counter()
+        results = fetch_all(args.objects, instance_url, access_token, Path(args.output_dir),
+                            Path(args.cache_dir), args.workers, args.api_version)
+    except ValueError as e:
+        raise SystemExit(f"Error: {e}")
+
+    for result in results:
+        if result.error:
+            print(f"{result.object_name}: failed ({result.error})")
+        else:
+            state = 'not modified' if result.status == 304 else f'{result.size} bytes'
+            print(f"{result.object_name}: {state} in {result.seconds:.2f}s -> {result.path}")
+    fetched = sum(1 for result in results if result.status == 200)
+    unchanged = sum(1 for result in results if result.status == 304)
+    print(f"\n{fetched} fetched, {unchanged} not modified in {time.perf_counter() - start:.2f}s")
+
+    if args.generate:
+        generate(results, Path(args.generate))
+    if any(result.error for result in results):
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
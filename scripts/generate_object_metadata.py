@@ -4,12 +4,22 @@ Generate Salesforce custom object metadata XML from describe JSON.
 Processes Workbench REST Explorer describe output and creates deployable metadata.
 """
 
-from typing import Optional, Dict, List
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Dict, List, Set
+import argparse
+import hashlib
 import json
 import os
+import re
 import sys
 from pathlib import Path
 
+from describe_diff import diff_snapshots, drifted_fields
+from describe_stream import DescribeDump, iter_fields
+from instrumentation import add_profile_arguments, configure_worker, profiling, recorder, settings
+from metadata_catalog import load_catalog
+from validate_metadata import validate
+
 # Configuration
 EXCLUDED_FIELDS = {
     'BookingEvent__c': ['AdvancedBooking__c', 'BanquetCheck__c', 'Beo__c'],
@@ -20,12 +30,19 @@ EXCLUDED_FIELDS = {
 # Objects we're creating - lookups to other objects should be excluded
 OBJECTS_BEING_CREATED = ['Booking__c', 'BookingEvent__c', 'EventItem__c']
 
+# Describe JSON files in the downloads dir and their objects (in deployment order: child to parent)
+DESCRIBE_FILES = [
+    ('EventItem__c.json', 'EventItem__c'),
+    ('BookigEvent__c.json', 'BookingEvent__c'),  # Note: typo in filename
+    ('Booking__c.json', 'Booking__c'),
+]
+
 # Standard fields that shouldn't be included in metadata (auto-created by Salesforce)
-STANDARD_FIELDS = [
+STANDARD_FIELDS = {
     'Id', 'OwnerId', 'IsDeleted', 'Name', 'CreatedDate', 'CreatedById',
     'LastModifiedDate', 'LastModifiedById', 'SystemModstamp', 'LastActivityDate',
     'LastViewedDate', 'LastReferencedDate', 'RecordTypeId'
-]
+}
 
 # Field type mapping from describe to metadata
 FIELD_TYPE_MAP = {
@@ -49,23 +66,202 @@ FIELD_TYPE_MAP = {
     'encryptedstring': 'Text',
 }
 
+# Bump whenever get_field_xml output changes so incremental runs re-render every field
+GENERATOR_VERSION = 1
+
+# API version written into package.xml
+PACKAGE_API_VERSION = '62.0'
+
+# Per-object field hash manifests used by incremental runs (relative to the project dir)
+HASH_CACHE_DIR = Path('.sfdx') / 'metadata-hashes'
+
+# A picklist value list becomes a GlobalValueSet when this many fields share it
+# and it has at least this many values (--global-value-sets)
+GLOBAL_VALUE_SET_MIN_FIELDS = 2
+GLOBAL_VALUE_SET_MIN_VALUES = 2
+GLOBAL_VALUE_SET_NAME_LENGTH = 40
+
+
+# Field XML emitters. Each metadata type has one emitter that renders its
+# type-specific block with a single compiled f-string; get_field_xml joins the
+# header, that block and the footer in one pass. Static blocks are constants.
+FIELD_XML_DECLARATION = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<CustomField xmlns="http://soap.sforce.com/2006/04/metadata">\n'
+)
+FIELD_FOOTER = '</CustomField>'
+VALUE_SET_HEADER = (
+    '    <valueSet>\n'
+    '        <restricted>true</restricted>\n'
+    '        <valueSetDefinition>\n'
+    '            <sorted>false</sorted>\n'
+)
+VALUE_SET_FOOTER = (
+    '        </valueSetDefinition>\n'
+    '    </valueSet>\n'
+)
+GLOBAL_VALUE_SET_REFERENCE = (
+    '    <valueSet>\n'
+    '        <restricted>true</restricted>\n'
+    '        <valueSetName>{}</valueSetName>\n'
+    '    </valueSet>\n'
+)
+
+# Numeric types and their default scale
+NUMERIC_DEFAULT_SCALE = {'Number': 0, 'Currency': 2, 'Percent': 2}
+
+# Lookup targets whose relationship name is suffixed with the parent object name
+STANDARD_LOOKUP_OBJECTS = ['User', 'Contact', 'Account', 'Lead', 'Opportunity', 'Case']
+
+
+def _required(field: dict) -> str:
+    return 'false' if field.get('nillable', True) else 'true'
+
+
+def render_picklist_values(picklist_values: list) -> str:
+    """Render the <value> entries for the active values of a picklist in one join."""
+    return ''.join([
+        '            <value>\n'
+        f'                <fullName>{escape_xml(pv.get("value", ""))}</fullName>\n'
+        f'                <default>{str(pv.get("defaultValue", False)).lower()}</default>\n'
+        f'                <label>{escape_xml(pv.get("label", pv.get("value", "")))}</label>\n'
+        '            </value>\n'
+        for pv in picklist_values if pv.get('active', True)
+    ])
+
+
+def _emit_text(field: dict, metadata_type: str, field_name: str, object_name: str) -> str:
+    return (f'    <length>{min(field.get("length", 255), 255)}</length>\n'
+            '    <type>Text</type>\n'
+            f'    <required>{_required(field)}</required>\n')
+
+
+def _emit_long_text_area(field: dict, metadata_type: str, field_name: str, object_name: str) -> str:
+    # Minimum length for LongTextArea is 256
+    return (f'    <length>{max(field.get("length", 32768), 256)}</length>\n'
+            '    <type>LongTextArea</type>\n'
+            '    <visibleLines>3</visibleLines>\n')
+
+
+def _emit_checkbox(field: dict, metadata_type: str, field_name: str, object_name: str) -> str:
+    default_value = field.get('defaultValue')
+    # Checkbox defaultValue must be exactly 'true' or 'false'
+    if default_value is None or default_value == '':
+        default_value = False
+    return (f'    <defaultValue>{str(bool(default_value)).lower()}</defaultValue>\n'
+            '    <type>Checkbox</type>\n')
+
+
+def _emit_numeric(field: dict, metadata_type: str, field_name: str, object_name: str) -> str:
+    return (f'    <precision>{field.get("precision", 18)}</precision>\n'
+            f'    <scale>{field.get("scale", NUMERIC_DEFAULT_SCALE[metadata_type])}</scale>\n'
+            f'    <type>{metadata_type}</type>\n'
+            f'    <required>{_required(field)}</required>\n')
+
+
+def _emit_simple(field: dict, metadata_type: str, field_name: str, object_name: str) -> str:
+    return (f'    <type>{metadata_type}</type>\n'
+            f'    <required>{_required(field)}</required>\n')
+
+
+def _emit_picklist(field: dict, metadata_type: str, field_name: str, object_name: str) -> str:
+    parts = [
+        f'    <type>{metadata_type}</type>\n'
+        f'    <required>{_required(field)}</required>\n'
+    ]
+    if metadata_type == 'MultiselectPicklist':
+        parts.append('    <visibleLines>4</visibleLines>\n')
+    picklist_values = field.get('picklistValues', [])
+    if picklist_values:
+        parts += (VALUE_SET_HEADER, render_picklist_values(picklist_values), VALUE_SET_FOOTER)
+    return ''.join(parts)
+
+
+def _emit_global_picklist(field: dict, metadata_type: str, value_set_name: str) -> str:
+    parts = [
+        f'    <type>{metadata_type}</type>\n'
+        f'    <required>{_required(field)}</required>\n'
+    ]
+    if metadata_type == 'MultiselectPicklist':
+        parts.append('    <visibleLines>4</visibleLines>\n')
+    parts.append(GLOBAL_VALUE_SET_REFERENCE.format(value_set_name))
+    return ''.join(parts)
 
-def get_field_xml(field: dict, object_name: str) -> Optional[str]:
-    """Generate XML for a single field."""
+
+def _emit_lookup(field: dict, metadata_type: str, field_name: str, object_name: str) -> Optional[str]:
+    reference_to = field.get('referenceTo', [])
+    if not reference_to:
+        return None
+    ref_object = reference_to[0]
+
+    # Get base relationship name from field name (remove __c)
+    base_rel_name = field_name.replace('__c', '')
+    parent_obj_name = object_name.replace('__c', '')
+
+    # For lookups to standard objects OR custom objects we're creating,
+    # make relationship name unique by including the parent object name
+    # This avoids conflicts like "Booking__r" already existing on Booking
+    if ref_object in STANDARD_LOOKUP_OBJECTS or ref_object in OBJECTS_BEING_CREATED:
+        # Use format: FieldName_ParentObject (e.g., Booking_EventItem)
+        relationship_name = f'{base_rel_name}_{parent_obj_name}'
+        relationship_label = f'{base_rel_name} ({parent_obj_name})'
+    else:
+        relationship_name = field.get('relationshipName', base_rel_name)
+        relationship_label = field.get('relationshipName', base_rel_name)
+
+    # Required lookups need Restrict or Cascade delete, optional can use SetNull
+    is_required = not field.get('nillable', True)
+    return (f'    <referenceTo>{ref_object}</referenceTo>\n'
+            f'    <relationshipName>{relationship_name}</relationshipName>\n'
+            f'    <relationshipLabel>{escape_xml(relationship_label)}</relationshipLabel>\n'
+            '    <type>Lookup</type>\n'
+            f'    <deleteConstraint>{"Restrict" if is_required else "SetNull"}</deleteConstraint>\n'
+            f'    <required>{str(is_required).lower()}</required>\n')
+
+
+# Metadata type -> emitter producing the type-specific part of the field XML
+FIELD_EMITTERS = {
+    'Text': _emit_text,
+    'LongTextArea': _emit_long_text_area,
+    'Checkbox': _emit_checkbox,
+    'Number': _emit_numeric,
+    'Currency': _emit_numeric,
+    'Percent': _emit_numeric,
+    'Phone': _emit_simple,
+    'Email': _emit_simple,
+    'Url': _emit_simple,
+    'Date': _emit_simple,
+    'DateTime': _emit_simple,
+    'Time': _emit_simple,
+    'Picklist': _emit_picklist,
+    'MultiselectPicklist': _emit_picklist,
+    'Lookup': _emit_lookup,
+}
+
+
+def get_field_xml(field: dict, object_name: str, value_set_name: Optional[str] = None) -> Optional[str]:
+    """Generate XML for a single field.
+
+    value_set_name makes a picklist reference that GlobalValueSet instead of
+    listing its values inline.
+    """
     field_name = field.get('name', '')
     field_type = field.get('type', '').lower()
 
     # Skip standard fields
     if field_name in STANDARD_FIELDS:
+        recorder().count('skipped.standard')
         return None
 
     # Skip non-custom fields (those without __c suffix, except Name)
     if not field_name.endswith('__c'):
+        recorder().count('skipped.not_custom')
         return None
 
     # Skip excluded fields for this object
     if field_name in EXCLUDED_FIELDS.get(object_name, []):
         print(f"  Skipping excluded field: {field_name}")
+        recorder().count('skipped.excluded')
         return None
 
     # Handle lookup/reference fields
@@ -76,164 +272,116 @@ def get_field_xml(field: dict, object_name: str) -> Optional[str]:
             # Skip lookups to objects we're not creating (except standard objects)
             if ref_object.endswith('__c') and ref_object not in OBJECTS_BEING_CREATED:
                 print(f"  Skipping lookup to non-existent object: {field_name} -> {ref_object}")
+                recorder().count('skipped.missing_lookup_target')
                 return None
 
     # Map field type
     metadata_type = FIELD_TYPE_MAP.get(field_type)
     if metadata_type is None:
         print(f"  Skipping unsupported field type: {field_name} ({field_type})")
+        recorder().count('skipped.unsupported_type')
         return None
 
-    # Build field XML
-    xml_parts = [
-        '<?xml version="1.0" encoding="UTF-8"?>',
-        '<CustomField xmlns="http://soap.sforce.com/2006/04/metadata">',
-        f'    <fullName>{field_name}</fullName>',
-    ]
+    if value_set_name and metadata_type in PICKLIST_TYPES:
+        body = _emit_global_picklist(field, metadata_type, value_set_name)
+    else:
+        body = FIELD_EMITTERS[metadata_type](field, metadata_type, field_name, object_name)
+    if body is None:
+        recorder().count('skipped.no_reference_target')
+        return None
 
-    # Add label
     label = field.get('label', field_name.replace('__c', '').replace('_', ' '))
-    xml_parts.append(f'    <label>{escape_xml(label)}</label>')
-
-    # Add description if available
     inline_help = field.get('inlineHelpText')
-    if inline_help:
-        xml_parts.append(f'    <description>{escape_xml(inline_help)}</description>')
-
-    # Handle different field types
-    if metadata_type == 'Text':
-        length = field.get('length', 255)
-        xml_parts.append(f'    <length>{min(length, 255)}</length>')
-        xml_parts.append('    <type>Text</type>')
-        xml_parts.append(f'    <required>{str(not field.get("nillable", True)).lower()}</required>')
-
-    elif metadata_type == 'LongTextArea':
-        length = field.get('length', 32768)
-        # Minimum length for LongTextArea is 256
-        length = max(length, 256)
-        xml_parts.append(f'    <length>{length}</length>')
-        xml_parts.append('    <type>LongTextArea</type>')
-        xml_parts.append('    <visibleLines>3</visibleLines>')
-
-    elif metadata_type == 'Checkbox':
-        default_value = field.get('defaultValue')
-        # Checkbox defaultValue must be exactly 'true' or 'false'
-        if default_value is None or default_value == '':
-            default_value = False
-        xml_parts.append(f'    <defaultValue>{str(bool(default_value)).lower()}</defaultValue>')
-        xml_parts.append('    <type>Checkbox</type>')
-
-    elif metadata_type == 'Number':
-        precision = field.get('precision', 18)
-        scale = field.get('scale', 0)
-        xml_parts.append(f'    <precision>{precision}</precision>')
-        xml_parts.append(f'    <scale>{scale}</scale>')
-        xml_parts.append('    <type>Number</type>')
-        xml_parts.append(f'    <required>{str(not field.get("nillable", True)).lower()}</required>')
-
-    elif metadata_type == 'Currency':
-        precision = field.get('precision', 18)
-        scale = field.get('scale', 2)
-        xml_parts.append(f'    <precision>{precision}</precision>')
-        xml_parts.append(f'    <scale>{scale}</scale>')
-        xml_parts.append('    <type>Currency</type>')
-        xml_parts.append(f'    <required>{str(not field.get("nillable", True)).lower()}</required>')
-
-    elif metadata_type == 'Percent':
-        precision = field.get('precision', 18)
-        scale = field.get('scale', 2)
-        xml_parts.append(f'    <precision>{precision}</precision>')
-        xml_parts.append(f'    <scale>{scale}</scale>')
-        xml_parts.append('    <type>Percent</type>')
-        xml_parts.append(f'    <required>{str(not field.get("nillable", True)).lower()}</required>')
-
-    elif metadata_type in ['Phone', 'Email', 'Url']:
-        xml_parts.append(f'    <type>{metadata_type}</type>')
-        xml_parts.append(f'    <required>{str(not field.get("nillable", True)).lower()}</required>')
-
-    elif metadata_type in ['Date', 'DateTime', 'Time']:
-        xml_parts.append(f'    <type>{metadata_type}</type>')
-        xml_parts.append(f'    <required>{str(not field.get("nillable", True)).lower()}</required>')
-
-    elif metadata_type == 'Picklist':
-        xml_parts.append('    <type>Picklist</type>')
-        xml_parts.append(f'    <required>{str(not field.get("nillable", True)).lower()}</required>')
-        picklist_values = field.get('picklistValues', [])
-        if picklist_values:
-            xml_parts.append('    <valueSet>')
-            xml_parts.append('        <restricted>true</restricted>')
-            xml_parts.append('        <valueSetDefinition>')
-            xml_parts.append('            <sorted>false</sorted>')
-            for pv in picklist_values:
-                if pv.get('active', True):
-                    xml_parts.append('            <value>')
-                    xml_parts.append(f'                <fullName>{escape_xml(pv.get("value", ""))}</fullName>')
-                    xml_parts.append(f'                <default>{str(pv.get("defaultValue", False)).lower()}</default>')
-                    xml_parts.append(f'                <label>{escape_xml(pv.get("label", pv.get("value", "")))}</label>')
-                    xml_parts.append('            </value>')
-            xml_parts.append('        </valueSetDefinition>')
-            xml_parts.append('    </valueSet>')
-
-    elif metadata_type == 'MultiselectPicklist':
-        xml_parts.append('    <type>MultiselectPicklist</type>')
-        xml_parts.append(f'    <required>{str(not field.get("nillable", True)).lower()}</required>')
-        xml_parts.append('    <visibleLines>4</visibleLines>')
-        picklist_values = field.get('picklistValues', [])
-        if picklist_values:
-            xml_parts.append('    <valueSet>')
-            xml_parts.append('        <restricted>true</restricted>')
-            xml_parts.append('        <valueSetDefinition>')
-            xml_parts.append('            <sorted>false</sorted>')
-            for pv in picklist_values:
-                if pv.get('active', True):
-                    xml_parts.append('            <value>')
-                    xml_parts.append(f'                <fullName>{escape_xml(pv.get("value", ""))}</fullName>')
-                    xml_parts.append(f'                <default>{str(pv.get("defaultValue", False)).lower()}</default>')
-                    xml_parts.append(f'                <label>{escape_xml(pv.get("label", pv.get("value", "")))}</label>')
-                    xml_parts.append('            </value>')
-            xml_parts.append('        </valueSetDefinition>')
-            xml_parts.append('    </valueSet>')
-
-    elif metadata_type == 'Lookup':
-        reference_to = field.get('referenceTo', [])
-        if not reference_to:
-            return None
-        ref_object = reference_to[0]
-
-        # Get base relationship name from field name (remove __c)
-        base_rel_name = field_name.replace('__c', '')
-        parent_obj_name = object_name.replace('__c', '')
-
-        # For lookups to standard objects OR custom objects we're creating,
-        # make relationship name unique by including the parent object name
-        # This avoids conflicts like "Booking__r" already existing on Booking
-        standard_objects = ['User', 'Contact', 'Account', 'Lead', 'Opportunity', 'Case']
-        custom_objects_being_created = ['Booking__c', 'BookingEvent__c', 'EventItem__c']
-
-        if ref_object in standard_objects or ref_object in custom_objects_being_created:
-            # Use format: FieldName_ParentObject (e.g., Booking_EventItem)
-            relationship_name = f'{base_rel_name}_{parent_obj_name}'
-            relationship_label = f'{base_rel_name} ({parent_obj_name})'
-        else:
-            relationship_name = field.get('relationshipName', base_rel_name)
-            relationship_label = field.get('relationshipName', base_rel_name)
-
-        xml_parts.append(f'    <referenceTo>{ref_object}</referenceTo>')
-        xml_parts.append(f'    <relationshipName>{relationship_name}</relationshipName>')
-        xml_parts.append(f'    <relationshipLabel>{escape_xml(relationship_label)}</relationshipLabel>')
-        xml_parts.append('    <type>Lookup</type>')
-
-        # Required lookups need Restrict or Cascade delete, optional can use SetNull
-        is_required = not field.get('nillable', True)
-        if is_required:
-            xml_parts.append('    <deleteConstraint>Restrict</deleteConstraint>')
-        else:
-            xml_parts.append('    <deleteConstraint>SetNull</deleteConstraint>')
-        xml_parts.append(f'    <required>{str(is_required).lower()}</required>')
+    description = f'    <description>{escape_xml(inline_help)}</description>\n' if inline_help else ''
+
+    return (f'{FIELD_XML_DECLARATION}'
+            f'    <fullName>{field_name}</fullName>\n'
+            f'    <label>{escape_xml(label)}</label>\n'
+            f'{description}{body}{FIELD_FOOTER}')
+
+
+# Metadata types whose values can come from a GlobalValueSet
+PICKLIST_TYPES = {'Picklist', 'MultiselectPicklist'}
+
+
+def value_set_key(field: dict) -> tuple:
+    """The active values of a picklist as (value, label, default) tuples, as they are rendered."""
+    return tuple(
+        (pv.get('value', ''), pv.get('label', pv.get('value', '')), bool(pv.get('defaultValue', False)))
+        for pv in field.get('picklistValues', []) if pv.get('active', True)
+    )
+
+
+def _shared_name(base_names: List[str]) -> str:
+    """Longest common prefix or suffix of the field names, e.g. StartTime24Hour/EndTime24Hour -> Time24Hour."""
+    prefix = os.path.commonprefix(base_names)
+    suffix = os.path.commonprefix([name[::-1] for name in base_names])[::-1]
+    name = max(prefix, suffix, key=len).strip('_0123456789')
+    return name if len(name) >= 3 else base_names[0]
+
+
+def find_global_value_sets(json_paths: List[str], min_fields: int = GLOBAL_VALUE_SET_MIN_FIELDS,
+                           min_values: int = GLOBAL_VALUE_SET_MIN_VALUES):
+    """Find picklist value lists shared by several generated fields across all describe dumps.
+
+    Returns ({object: {field: value set name}}, {value set name: values}), where
+    values are the (value, label, default) tuples of value_set_key.
+    """
+    members: Dict[tuple, List[tuple]] = {}
+    for json_path in json_paths:
+        for object_name, field in iter_fields(json_path):
+            field_name = field.get('name', '')
+            if (FIELD_TYPE_MAP.get(field.get('type', '').lower()) not in PICKLIST_TYPES
+                    or field_name in STANDARD_FIELDS or not field_name.endswith('__c')
+                    or field_name in EXCLUDED_FIELDS.get(object_name, [])):
+                continue
+            key = value_set_key(field)
+            if len(key) >= min_values:
+                members.setdefault(key, []).append((object_name, field_name))
+
+    assignments: Dict[str, Dict[str, str]] = {}
+    value_sets: Dict[str, tuple] = {}
+    shared = [(sorted(fields), key) for key, fields in members.items() if len(fields) >= min_fields]
+    for fields, key in sorted(shared):
+        name = _shared_name([field_name[:-len('__c')] for _, field_name in fields])
+        # Developer names cannot end in "_" or hold "__", so no cut may leave a trailing underscore
+        name = name[:GLOBAL_VALUE_SET_NAME_LENGTH].rstrip('_')
+        if name in value_sets:
+            digest = hashlib.sha256(repr(key).encode('utf-8')).hexdigest()[:6]
+            name = f"{name[:GLOBAL_VALUE_SET_NAME_LENGTH - 7].rstrip('_')}_{digest}"
+        value_sets[name] = key
+        for object_name, field_name in fields:
+            assignments.setdefault(object_name, {})[field_name] = name
+    return assignments, value_sets
+
+
+def get_global_value_set_xml(name: str, values: tuple) -> str:
+    """Generate the GlobalValueSet XML for (value, label, default) tuples."""
+    custom_values = ''.join([
+        '    <customValue>\n'
+        f'        <fullName>{escape_xml(value)}</fullName>\n'
+        f'        <default>{str(default).lower()}</default>\n'
+        f'        <label>{escape_xml(label)}</label>\n'
+        '    </customValue>\n'
+        for value, label, default in values
+    ])
+    return ('<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<GlobalValueSet xmlns="http://soap.sforce.com/2006/04/metadata">\n'
+            f'{custom_values}'
+            f'    <masterLabel>{escape_xml(name)}</masterLabel>\n'
+            '    <sorted>false</sorted>\n'
+            '</GlobalValueSet>')
 
-    xml_parts.append('</CustomField>')
 
-    return '\n'.join(xml_parts)
+def write_global_value_sets(value_sets: Dict[str, tuple], output_base: str) -> int:
+    """Write one globalValueSets/<Name>.globalValueSet-meta.xml per value set; returns files written."""
+    value_set_dir = Path(output_base) / 'globalValueSets'
+    value_set_dir.mkdir(parents=True, exist_ok=True)
+    written = 0
+    for name, values in value_sets.items():
+        written += write_if_changed(value_set_dir / f'{name}.globalValueSet-meta.xml',
+                                    get_global_value_set_xml(name, values))
+    return written
 
 
 def get_object_xml(describe: dict) -> str:
@@ -281,39 +429,146 @@ def get_object_xml(describe: dict) -> str:
     return '\n'.join(xml_parts)
 
 
+# Characters escape_xml replaces, and the translation table that replaces them
+XML_SPECIAL_CHARS = re.compile('[&<>"\']')
+XML_ESCAPE_TABLE = str.maketrans({
+    '&': '&amp;',
+    '<': '&lt;',
+    '>': '&gt;',
+    '"': '&quot;',
+    "'": '&apos;',
+})
+
+
 def escape_xml(text: str) -> str:
-    """Escape special XML characters."""
+    """Escape special XML characters.
+
+    A single regex scan lets the common case (nothing to escape) return the
+    input as-is; only strings that need it go through the translate table.
+    """
     if not text:
         return ''
-    return (text
-            .replace('&', '&amp;')
-            .replace('<', '&lt;')
-            .replace('>', '&gt;')
-            .replace('"', '&quot;')
-            .replace("'", '&apos;'))
-
-
-def process_object(json_path: str, output_base: str) -> dict:
-    """Process a single object JSON and generate metadata files."""
+    if XML_SPECIAL_CHARS.search(text) is None:
+        return text
+    return text.translate(XML_ESCAPE_TABLE)
+
+
+def field_hash(field: dict, object_name: str, value_set_name: Optional[str] = None) -> str:
+    """Stable content hash of a field's describe entry and the config that shapes its XML."""
+    config = {
+        'version': GENERATOR_VERSION,
+        'object': object_name,
+        'excluded': EXCLUDED_FIELDS.get(object_name, []),
+        'objects_being_created': OBJECTS_BEING_CREATED,
+        'field': field,
+    }
+    if value_set_name:
+        config['value_set'] = value_set_name
+    payload = json.dumps(config, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def load_hash_manifest(manifest_path: Optional[Path]) -> Dict[str, str]:
+    """Load the field name -> hash manifest from a previous incremental run."""
+    if manifest_path is None or not manifest_path.exists():
+        return {}
+    try:
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if manifest.get('version') != GENERATOR_VERSION:
+        return {}
+    return manifest.get('fields', {})
+
+
+def save_hash_manifest(manifest_path: Path, hashes: Dict[str, str]):
+    """Persist the field hash manifest for the next incremental run."""
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    content = json.dumps({'version': GENERATOR_VERSION, 'fields': hashes}, indent=2, sort_keys=True)
+    write_if_changed(manifest_path, content)
+
+
+def write_if_changed(path: Path, content: str, known_hash: Optional[str] = None) -> bool:
+    """Write content to path unless the file already holds identical bytes.
+
+    known_hash is the sha256 of the current file from the metadata catalog; when
+    given, the comparison is made against it instead of reading the file back.
+    Leaving unchanged files untouched keeps their mtime stable, so
+    `sf project deploy` does not treat them as modified.
+    """
+    data = content.encode('utf-8')
+    if known_hash is not None:
+        if hashlib.sha256(data).hexdigest() == known_hash:
+            return False
+    else:
+        try:
+            if path.stat().st_size == len(data) and path.read_bytes() == data:
+                return False
+        except FileNotFoundError:
+            pass
+    path.write_bytes(data)
+    return True
+
+
+def process_file(json_path: str, output_base: str, hash_cache_dir: Optional[str] = None,
+                 known_hashes: Optional[Dict[str, Dict[str, str]]] = None,
+                 value_sets: Optional[Dict[str, Dict[str, str]]] = None, archive=None,
+                 drift: Optional[Dict[str, Optional[Set[str]]]] = None) -> List[dict]:
+    """Process every object describe in a JSON dump and generate metadata files.
+
+    The dump is streamed (see describe_stream), so raw Workbench responses with
+    HTTP headers and files holding several describes are both handled.
+    known_hashes (object -> field -> sha256, see MetadataCatalog.content_hashes)
+    lets unchanged field files be detected without reading them back.
+    value_sets (object -> field -> GlobalValueSet name, see find_global_value_sets)
+    makes those picklists reference a global value set. With archive (a
+    deploy_zip.DeployArchive) the metadata goes into that zip instead.
+    drift (object -> drifted field names, or None for all; see
+    describe_diff.drifted_fields) limits each object to the fields that drifted.
+    """
     print(f"\nProcessing: {json_path}")
 
-    with open(json_path, 'r') as f:
-        content = f.read()
-
-    # Handle files that include HTTP headers (from Workbench raw response)
-    # Find the start of JSON (first { character)
-    json_start = content.find('{')
-    if json_start > 0:
-        content = content[json_start:]
+    results = []
+    with DescribeDump(json_path) as dump:
+        for describe in dump:
+            object_name = describe.get('name')
+            only_fields = None if drift is None else drift.get(object_name, set())
+            results.append(process_describe(describe, output_base, hash_cache_dir,
+                                            (known_hashes or {}).get(object_name),
+                                            (value_sets or {}).get(object_name), archive, only_fields))
 
-    # Find the last closing brace (end of JSON object)
-    json_end = content.rfind('}')
-    if json_end > 0:
-        content = content[:json_end + 1]
+    if not results:
+        print(f"Warning: no object describe found in {json_path}")
+    return results
 
-    describe = json.loads(content)
 
+def process_object(json_path: str, output_base: str, hash_cache_dir: Optional[str] = None) -> dict:
+    """Process a single object JSON and generate metadata files."""
+    results = process_file(json_path, output_base, hash_cache_dir)
+    if not results:
+        raise ValueError(f"No object describe found in {json_path}")
+    return results[0]
+
+
+def process_describe(describe, output_base: str, hash_cache_dir: Optional[str] = None,
+                     known_hashes: Optional[Dict[str, str]] = None,
+                     value_sets: Optional[Dict[str, str]] = None, archive=None,
+                     only_fields: Optional[Set[str]] = None) -> dict:
+    """Generate metadata files for one describe (a dict or a StreamedDescribe).
+
+    When hash_cache_dir is given, fields whose describe entry hashes the same
+    as on the previous run (and whose file still exists) are not re-rendered.
+    value_sets maps picklist field names to the GlobalValueSet they reference.
+    With archive (a deploy_zip.DeployArchive), the object and its fields are
+    streamed into the zip as one .object entry and nothing is written under
+    output_base; hash_cache_dir must then be None. With only_fields, the other
+    fields are left as they are. With instrumentation on (see instrumentation.py),
+    the result also holds this object's phase timings and skip counters under 'profile'.
+    """
+    rec = recorder()
     object_name = describe.get('name', 'Unknown')
+    value_sets = value_sets or {}
     print(f"Object: {object_name}")
     print(f"Label: {describe.get('label')}")
     print(f"Fields count: {len(describe.get('fields', []))}")
@@ -321,119 +576,329 @@ def process_object(json_path: str, output_base: str) -> dict:
     # Create output directories
     object_dir = Path(output_base) / 'objects' / object_name
     fields_dir = object_dir / 'fields'
-    fields_dir.mkdir(parents=True, exist_ok=True)
+    if archive is None:
+        fields_dir.mkdir(parents=True, exist_ok=True)
 
     # Generate main object XML
-    object_xml = get_object_xml(describe)
+    with rec.phase('render'):
+        object_xml = get_object_xml(describe)
     object_file = object_dir / f'{object_name}.object-meta.xml'
-    with open(object_file, 'w') as f:
-        f.write(object_xml)
-    print(f"Created: {object_file}")
+    with rec.phase('write'):
+        if archive is not None:
+            object_written = True
+            object_file = archive.begin_object(object_name, object_xml)
+        else:
+            object_written = write_if_changed(object_file, object_xml)
+    if object_written:
+        print(f"Created: {object_file}")
+    else:
+        print(f"Unchanged: {object_file}")
+
+    manifest_path = Path(hash_cache_dir) / f'{object_name}.json' if hash_cache_dir else None
+    with rec.phase('read'):
+        previous_hashes = load_hash_manifest(manifest_path)
+    hashes = {}
 
     # Generate field XMLs
     fields_created = 0
     fields_skipped = 0
+    fields_written = 0
+    fields_unchanged = 0
+    fields_not_drifted = 0
 
-    for field in describe.get('fields', []):
+    # Fields are decoded lazily as they are iterated, so that is the parse phase
+    for field in rec.iterate('parse', describe.get('fields', [])):
         field_name = field.get('name', '')
-        field_xml = get_field_xml(field, object_name)
+        field_file = fields_dir / f'{field_name}.field-meta.xml'
+
+        if only_fields is not None and field_name not in only_fields:
+            # Keep the field in the incremental manifest so the next run still knows it
+            if field_name in previous_hashes:
+                hashes[field_name] = previous_hashes[field_name]
+            fields_not_drifted += 1
+            rec.count('skipped.not_drifted')
+            continue
+
+        digest = None
+        if manifest_path is not None:
+            with rec.phase('hash'):
+                digest = field_hash(field, object_name, value_sets.get(field_name))
+            previous = previous_hashes.get(field_name)
+            if previous == f'skip:{digest}':
+                hashes[field_name] = previous
+                fields_skipped += 1
+                rec.count('skipped.cached')
+                continue
+            if previous == digest and field_file.exists():
+                hashes[field_name] = digest
+                fields_created += 1
+                fields_unchanged += 1
+                rec.count('fields.cached')
+                continue
+
+        with rec.phase('render'):
+            field_xml = get_field_xml(field, object_name, value_sets.get(field_name))
 
         if field_xml:
-            field_file = fields_dir / f'{field_name}.field-meta.xml'
-            with open(field_file, 'w') as f:
-                f.write(field_xml)
+            with rec.phase('write'):
+                if archive is not None:
+                    archive.add_field(field_xml)
+                    written = True
+                else:
+                    written = write_if_changed(field_file, field_xml, (known_hashes or {}).get(field_name))
+            if written:
+                fields_written += 1
+            else:
+                fields_unchanged += 1
             fields_created += 1
+            if digest:
+                hashes[field_name] = digest
         else:
             fields_skipped += 1
+            if digest:
+                hashes[field_name] = f'skip:{digest}'
+
+    if archive is not None:
+        with rec.phase('write'):
+            archive.end_object()
+    if manifest_path is not None:
+        with rec.phase('write'):
+            save_hash_manifest(manifest_path, hashes)
 
     print(f"Fields created: {fields_created}")
+    print(f"Fields written: {fields_written}")
+    print(f"Fields unchanged: {fields_unchanged}")
     print(f"Fields skipped: {fields_skipped}")
+    if only_fields is not None:
+        print(f"Fields not drifted: {fields_not_drifted}")
 
-    return {
+    result = {
         'object_name': object_name,
         'fields_created': fields_created,
-        'fields_skipped': fields_skipped
+        'fields_skipped': fields_skipped,
+        'fields_written': fields_written,
+        'fields_unchanged': fields_unchanged,
     }
+    if rec.enabled:
+        rec.count('fields.written', fields_written)
+        rec.count('fields.unchanged', fields_unchanged)
+        result['profile'] = rec.take()
+    return result
 
 
-def generate_package_xml(objects: list, output_base: str):
-    """Generate package.xml for deployment."""
+def render_package_xml(types: Dict[str, List[str]]) -> str:
+    """Render a package.xml (or destructiveChanges.xml) for metadata type -> members."""
     xml_parts = [
         '<?xml version="1.0" encoding="UTF-8"?>',
         '<Package xmlns="http://soap.sforce.com/2006/04/metadata">',
-        '    <types>',
     ]
-
-    for obj in objects:
-        xml_parts.append(f'        <members>{obj}</members>')
-
+    for type_name, members in types.items():
+        xml_parts.append('    <types>')
+        for member in members:
+            xml_parts.append(f'        <members>{member}</members>')
+        xml_parts.append(f'        <name>{type_name}</name>')
+        xml_parts.append('    </types>')
     xml_parts.extend([
-        '        <name>CustomObject</name>',
-        '    </types>',
-        '    <types>',
+        f'    <version>{PACKAGE_API_VERSION}</version>',
+        '</Package>'
     ])
+    return '\n'.join(xml_parts)
 
-    for obj in objects:
-        xml_parts.append(f'        <members>{obj}.*</members>')
 
-    xml_parts.extend([
-        '        <name>CustomField</name>',
-        '    </types>',
-        '    <version>62.0</version>',
-        '</Package>'
-    ])
+def package_types(objects: list, value_sets: Optional[List[str]] = None) -> Dict[str, List[str]]:
+    """package.xml members (metadata type -> members) for generated objects and global value sets."""
+    types = {}
+    if value_sets:
+        types['GlobalValueSet'] = sorted(value_sets)
+    types['CustomObject'] = list(objects)
+    types['CustomField'] = [f'{obj}.*' for obj in objects]
+    return types
 
-    package_file = Path(output_base) / 'package.xml'
-    with open(package_file, 'w') as f:
-        f.write('\n'.join(xml_parts))
-    print(f"\nCreated: {package_file}")
 
+def generate_package_xml(objects: list, output_base: str, value_sets: Optional[List[str]] = None):
+    """Generate package.xml for deployment."""
+    package_xml = render_package_xml(package_types(objects, value_sets))
+
+    package_file = Path(output_base) / 'package.xml'
+    if write_if_changed(package_file, package_xml):
+        print(f"\nCreated: {package_file}")
+    else:
+        print(f"\nUnchanged: {package_file}")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--downloads-dir', default=str(Path.home() / 'Downloads'),
+                        help='Directory holding the Workbench describe JSON files')
+    parser.add_argument('--project-dir',
+                        default='/Users/rreboucas/Documents/SFDX Projects/fdesdo/Fdesdo',
+                        help='SFDX project root to write metadata into')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Only re-render fields whose describe entry changed since the last run')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='Number of objects to process in parallel (1 disables the process pool)')
+    parser.add_argument('--global-value-sets', action='store_true',
+                        help='Move picklist value lists shared by several fields into GlobalValueSets. '
+                             'Only for fields not yet deployed: Salesforce cannot switch an existing '
+                             'picklist to a global value set')
+    parser.add_argument('--delta', action='store_true',
+                        help='Also stage only the changed objects/fields since the saved deploy manifest '
+                             '(see delta_manifest.py)')
+    parser.add_argument('--delta-from', metavar='GIT_REF',
+                        help='Like --delta, but compare against a git ref')
+    parser.add_argument('--validate', action='store_true',
+                        help='Check the generated objects for deploy errors (see validate_metadata.py) '
+                             'and exit 1 before the deploy step if any are found')
+    parser.add_argument('--drift-from', metavar='SNAPSHOT',
+                        help='Only rebuild fields that were added or changed since this describe snapshot '
+                             '(a dump or a directory of them; see describe_diff.py)')
+    parser.add_argument('--zip', metavar='PATH',
+                        help='Write the metadata and package.xml into a Metadata API deploy zip at PATH '
+                             'instead of files under the project (see deploy_zip.py)')
+    parser.add_argument('--compress-level', type=int, default=6, choices=range(10), metavar='0-9',
+                        help='Deflate level for --zip: 0 stores, 1 is fastest, 9 smallest (default: 6)')
+    add_profile_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def run_jobs(jobs: List[tuple], workers: int) -> List[dict]:
+    """Run process_file for each (json_path, output_base, hash_cache_dir, known_hashes, value_sets, archive,
+    drift) job, in input order."""
+    if workers <= 1 or len(jobs) <= 1:
+        batches = [process_file(*job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs)), initializer=configure_worker,
+                                 initargs=(settings(),)) as executor:
+            batches = list(executor.map(process_file, *zip(*jobs)))
+    return [result for batch in batches for result in batch]
+
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    if args.zip and (args.incremental or args.delta or args.delta_from or args.validate):
+        raise SystemExit("Error: --zip cannot be combined with --incremental, --delta, --delta-from or --validate, "
+                         "which work on the files under the project")
+    with profiling(args, 'generate_object_metadata'):
+        if not args.zip:
+            generate(args)
+            return
+        # Imported here: deploy_zip builds on this module's rendering and package.xml constants
+        from deploy_zip import DeployArchive
+        with open(args.zip, 'wb') as f:
+            archive = DeployArchive(f, args.compress_level)
+            try:
+                generate(args, archive)
+            finally:
+                archive.close()
+        print(f"\n{args.zip}: {len(archive.entries)} entries, {archive.bytes_written} bytes "
+              f"compressed to {os.path.getsize(args.zip)}")
+
+
+def generate(args: argparse.Namespace, archive=None):
+    """Generate the metadata into the project, or into archive (a deploy_zip.DeployArchive) when given."""
+    rec = recorder()
 
-def main():
     # Default paths
-    downloads_dir = Path.home() / 'Downloads'
-    project_dir = Path('/Users/rreboucas/Documents/SFDX Projects/fdesdo/Fdesdo')
+    downloads_dir = Path(args.downloads_dir)
+    project_dir = Path(args.project_dir)
     output_base = project_dir / 'force-app' / 'main' / 'default'
+    hash_cache_dir = str(project_dir / HASH_CACHE_DIR) if args.incremental else None
 
-    # JSON files to process (in deployment order: child to parent)
-    json_files = [
-        ('EventItem__c.json', 'EventItem__c'),
-        ('BookigEvent__c.json', 'BookingEvent__c'),  # Note: typo in filename
-        ('Booking__c.json', 'Booking__c'),
-    ]
-
-    results = []
-    objects_processed = []
+    # Content hashes of the field files already on disk, from the metadata catalog cache
+    with rec.phase('read'):
+        known_hashes = load_catalog(output_base).content_hashes() if archive is None else {}
 
-    for filename, expected_name in json_files:
+    json_paths = []
+    for filename, expected_name in DESCRIBE_FILES:
         json_path = downloads_dir / filename
         if json_path.exists():
-            result = process_object(str(json_path), str(output_base))
-            results.append(result)
-            objects_processed.append(result['object_name'])
+            json_paths.append(str(json_path))
         else:
             print(f"\nWarning: {json_path} not found")
 
+    # Picklist value lists shared across all the dumps become GlobalValueSets
+    value_sets, value_set_values = {}, {}
+    if args.global_value_sets and json_paths:
+        value_sets, value_set_values = find_global_value_sets(json_paths)
+        if archive is not None:
+            for name, values in value_set_values.items():
+                archive.add(f'globalValueSets/{name}.globalValueSet', get_global_value_set_xml(name, values))
+            written = len(value_set_values)
+        else:
+            written = write_global_value_sets(value_set_values, str(output_base))
+        shared = sum(len(fields) for fields in value_sets.values())
+        print(f"Global value sets: {len(value_set_values)} shared by {shared} fields ({written} written)")
+
+    # Fields that drifted since the old snapshot; objects without drift render no fields
+    drift = None
+    if args.drift_from:
+        with rec.phase('diff'):
+            try:
+                drift = drifted_fields(diff_snapshots(Path(args.drift_from), downloads_dir,
+                                                      [name for _, name in DESCRIBE_FILES]))
+            except (OSError, ValueError) as e:
+                raise SystemExit(f"Error: {e}")
+        drifted = sum(len(fields) for fields in drift.values() if fields is not None)
+        print(f"Drift since {args.drift_from}: {drifted} fields in {len(drift)} objects")
+
+    jobs = [(json_path, str(output_base), hash_cache_dir, known_hashes, value_sets, archive, drift)
+            for json_path in json_paths]
+
+    # Per-object profiles are taken separately (possibly in workers) and merged back;
+    # a zip is written by one process, so objects are then generated in this one
+    setup_profile = rec.take()
+    results = run_jobs(jobs, 1 if archive is not None else args.workers)
+    rec.merge(setup_profile)
+    for result in results:
+        profile = result.pop('profile', None)
+        if profile:
+            rec.emit('object', object=result['object_name'], **profile)
+            rec.merge(profile)
+    objects_processed = [result['object_name'] for result in results]
+
     # Generate package.xml
-    if objects_processed:
+    if objects_processed and archive is not None:
+        archive.add('package.xml', render_package_xml(package_types(objects_processed, list(value_set_values))))
+    elif objects_processed:
         manifest_dir = project_dir / 'manifest'
         manifest_dir.mkdir(exist_ok=True)
-        generate_package_xml(objects_processed, str(manifest_dir))
+        generate_package_xml(objects_processed, str(manifest_dir), list(value_set_values))
+
+    if objects_processed and (args.delta or args.delta_from):
+        # Imported here: delta_manifest builds on this module's package.xml rendering
+        from delta_manifest import DELTA_DIR, build_delta, print_summary
+        delta = build_delta(project_dir, objects_processed, from_ref=args.delta_from)
+        print()
+        print_summary(delta, project_dir / DELTA_DIR)
 
     # Summary
     print("\n" + "="*50)
     print("SUMMARY")
     print("="*50)
     for result in results:
-        print(f"{result['object_name']}: {result['fields_created']} fields created")
+        print(f"{result['object_name']}: {result['fields_created']} fields created, "
+              f"{result['fields_written']} written, {result['fields_unchanged']} unchanged")
 
     print("\nDeployment order:")
     print("1. EventItem__c (child)")
     print("2. BookingEvent__c (middle)")
     print("3. Booking__c (parent)")
 
+    if objects_processed and args.validate:
+        with rec.phase('validate'):
+            issues = validate(load_catalog(output_base), objects_processed)
+        print(f"\nValidation: {len(issues)} errors in {len(objects_processed)} objects")
+        for issue in issues:
+            print(f"  {issue}")
+        if issues:
+            raise SystemExit(1)
+
     print("\nTo deploy, run:")
-    print("sf project deploy start --manifest manifest/package.xml")
+    if archive is not None:
+        print(f"sf project deploy start --metadata-dir {args.zip} --single-package")
+    else:
+        print("sf project deploy start --manifest manifest/package.xml")
 
 
 if __name__ == '__main__':
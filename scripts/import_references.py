@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Resolve parent references in dataimport files before they are uploaded.
+
+Child exports reference their parents through "Location__r.UniqueExternalId__c"
+style columns, which often arrive empty, holding a "[Location__c]" placeholder
+in the bare "Location__r" column, or holding the parent's Name instead of its
+external ID. The Bulk API rejects those rows (REQUIRED_FIELD_MISSING, see
+750Ka00000ciB9iIAE-failed-records.csv) only after a full job round trip.
+
+ParentIndex loads the parent exports (location.csv, RevenueClassification__c-Parent.csv,
+...) into per-object hash maps keyed by external ID and by Name.
+reference_resolver is a normalize_import_csv stage that rewrites every
+"<Relationship>.<Field>" column of a child file to the parent's <Field> value,
+resolving each distinct cell value once. A placeholder resolves to the parent
+named with --set Object=<name or external ID>. References that cannot be
+resolved fail the run locally, with the reason, instead of failing the job.
+
+The raw exports in dataimport/ leave UniqueExternalId__c empty, so resolving
+against them needs the IDs that external_ids derives: pass --synthesize-ids
+(bulk_load: --upsert) and the index derives each parent's key the way the
+parent's own load does, with the same --key-columns.
+
+Usage:
+    python3 scripts/normalize_import_csv.py dataimport/guestroomtype.csv -o guestroomtype_import.csv \\
+        --parent dataimport/location.csv --set "Location__c=Delphi Default Property" --synthesize-ids
+"""
+
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from pathlib import Path
+
+from normalize_import_csv import PLACEHOLDER, TYPE_COLUMN, Row, Stage, read_rows
+
+KEY_FIELD = 'UniqueExternalId__c'
+
+# Parent columns a reference may be written against, in lookup priority order
+EXTERNAL_ID_FIELDS = ('UniqueExternalId__c', 'ExternalId__c', 'SourceSystemExternalId__c')
+
+# Marks a Name shared by parent records with different keys
+AMBIGUOUS = -1
+
+
+class UnresolvedReference(ValueError):
+    """A child row references a parent that the index cannot resolve."""
+
+    def __init__(self, line: int, column: str, value: str, reason: str):
+        super().__init__(f"line {line}, {column} = '{value}': {reason}")
+        self.line = line
+        self.column = column
+        self.value = value
+        self.reason = reason
+
+
+def relationship_object(relationship: str) -> str:
+    """Object a relationship column points at: Location__r -> Location__c, Account -> Account."""
+    if relationship.endswith('__r'):
+        return relationship[:-len('__r')] + '__c'
+    return relationship
+
+
+class ParentIndex:
+    """Parent records per object, looked up by any external ID or by Name."""
+
+    def __init__(self):
+        self._records: Dict[str, List[Dict[str, str]]] = {}
+        self._by_key: Dict[str, Dict[str, int]] = {}
+        self._by_name: Dict[str, Dict[str, int]] = {}
+        # (object, position) -> callable deriving the IDs of a record exported without them
+        self._pending: Dict[Tuple[str, int], Callable[[], Dict[str, str]]] = {}
+
+    def add(self, object_name: str, record: Dict[str, str],
+            derive_ids: Optional[Callable[[], Dict[str, str]]] = None):
+        """Index a record. derive_ids, when given and the record has no UniqueExternalId__c,
+        is called for its ID columns the first time the record is needed (see derive_pending).
+        """
+        records = self._records.setdefault(object_name, [])
+        by_key = self._by_key.setdefault(object_name, {})
+        by_name = self._by_name.setdefault(object_name, {})
+        position = len(records)
+        records.append({field: record.get(field, '') for field in ('Name',) + EXTERNAL_ID_FIELDS})
+
+        for field in EXTERNAL_ID_FIELDS:
+            value = record.get(field)
+            if value:
+                by_key[value] = position
+        name = record.get('Name')
+        if name:
+            by_name[name] = position if by_name.get(name, position) == position else AMBIGUOUS
+        if derive_ids is not None and not record.get(KEY_FIELD):
+            self._pending[(object_name, position)] = derive_ids
+
+    def _record(self, object_name: str, position: int) -> Dict[str, str]:
+        """The record at position, its IDs derived first when they are pending."""
+        record = self._records[object_name][position]
+        # Popped before deriving: a record whose key depends on itself resolves as keyless
+        derive_ids = self._pending.pop((object_name, position), None)
+        if derive_ids is not None:
+            for field, value in derive_ids().items():
+                if field in EXTERNAL_ID_FIELDS and value and not record.get(field):
+                    record[field] = value
+                    self._by_key[object_name][value] = position
+        return record
+
+    def derive_pending(self):
+        """Derive the IDs of every record still pending, so they can be looked up by them."""
+        for object_name, position in list(self._pending):
+            self._record(object_name, position)
+
+    def add_file(self, path, object_name: Optional[str] = None,
+                 placeholders: Optional[Dict[str, str]] = None, synthesize_ids: bool = False,
+                 key_columns: Optional[Dict[str, Sequence[str]]] = None) -> int:
+        """Index a parent export; the object comes from its "_" column unless given. Returns rows added.
+
+        With synthesize_ids, records without a UniqueExternalId__c get the one
+        the keying stage derives for them (see external_ids), so references
+        resolve to the IDs the parent is loaded with; key_columns must be the
+        object -> key columns map the parent is keyed with. Those IDs depend on the
+        record's own parents, so they are derived once every file is indexed:
+        call derive_pending after the last add_file (load_parent_index does).
+        """
+        header, rows = read_rows(path)
+        type_index = header.index(TYPE_COLUMN) if TYPE_COLUMN in header else None
+        keyer = None
+        if synthesize_ids:
+            # Imported here: external_ids builds on this module's KEY_FIELD
+            from external_ids import Keyer
+            keyer = Keyer(header, object_name, placeholders, key_columns, parents=self)
+        count = 0
+        for row in rows:
+            row_object = object_name
+            if row_object is None and type_index is not None:
+                match = PLACEHOLDER.fullmatch(row[type_index])
+                row_object = match.group(1) if match else None
+            if row_object is None:
+                raise ValueError(f"{path}: no \"_\" type column; give the parent object explicitly")
+            record = dict(zip(header, row))
+            derive_ids = (lambda row=row: keyer.ids(row)) if keyer is not None else None
+            self.add(row_object, record, derive_ids)
+            count += 1
+        return count
+
+    def objects(self) -> List[str]:
+        return sorted(self._records)
+
+    def count(self, object_name: str) -> int:
+        return len(self._records.get(object_name, []))
+
+    def resolve(self, object_name: str, value: str, field: str = KEY_FIELD) -> str:
+        """Return field of the parent identified by value (an external ID or a Name).
+
+        Raises LookupError with the reason when there is no such parent, the Name
+        is ambiguous, or the parent has no value for field.
+        """
+        if object_name not in self._records:
+            raise LookupError(f"no parent file indexed for {object_name}")
+        position = self._by_key[object_name].get(value)
+        if position is None:
+            position = self._by_name[object_name].get(value)
+        if position is None:
+            raise LookupError(f"no {object_name} with that external ID or Name")
+        if position == AMBIGUOUS:
+            raise LookupError(f"several {object_name} records are named '{value}'")
+        record = self._record(object_name, position)
+        key = record.get(field)
+        if not key:
+            hint = ("; pass --synthesize-ids (bulk_load: --upsert) to derive the IDs of parents "
+                    "exported without them") if field in EXTERNAL_ID_FIELDS else ''
+            raise LookupError(f"{object_name} '{record['Name']}' has no {field}{hint}")
+        return key
+
+
+def reference_columns(header: Row) -> List[Tuple[int, Optional[int], str, str]]:
+    """(column index, bare relationship column index, parent object, parent field) per reference column."""
+    references = []
+    for i, name in enumerate(header):
+        relationship, sep, field = name.partition('.')
+        if not sep or '.' in field:
+            continue
+        bare = header.index(relationship) if relationship in header else None
+        references.append((i, bare, relationship_object(relationship), field))
+    return references
+
+
+def reference_resolver(index: ParentIndex, placeholders: Optional[Dict[str, str]] = None,
+                       unresolved: Optional[List[UnresolvedReference]] = None) -> Stage:
+    """Stage filling "<Relationship>.<Field>" columns from the parent index.
+
+    The reference is taken from the column itself, or from the bare relationship
+    column when empty. A "[Object]" placeholder stands for placeholders[Object].
+    When unresolved is a list, failures are appended to it and the cell is left
+    empty; otherwise the first failure raises UnresolvedReference.
+    """
+    placeholders = placeholders or {}
+
+    def resolve_references(header: Row, rows: Iterator[Row]) -> Tuple[Row, Iterator[Row]]:
+        references = [ref for ref in reference_columns(header) if ref[2] in index.objects()]
+
+        def resolved() -> Iterator[Row]:
+            # (object, field, value) -> parent key or LookupError; each distinct value is resolved once
+            cache: Dict[Tuple[str, str, str], object] = {}
+            for line, row in enumerate(rows, start=2):
+                for column, bare, object_name, field in references:
+                    value = row[column] if column < len(row) else ''
+                    if not value and bare is not None and bare < len(row):
+                        value = row[bare]
+                        row[bare] = ''
+                    if not value:
+                        continue
+
+                    cache_key = (object_name, field, value)
+                    result = cache.get(cache_key)
+                    if result is None:
+                        target = value
+                        match = PLACEHOLDER.fullmatch(value)
+                        if match:
+                            target = placeholders.get(match.group(1), '')
+                        try:
+                            if not target:
+                                raise LookupError(f"no value for the placeholder; "
+                                                  f"pass --set {match.group(1)}=<name or external ID>")
+                            result = index.resolve(object_name, target, field)
+                        except LookupError as e:
+                            result = e
+                        cache[cache_key] = result
+
+                    if isinstance(result, LookupError):
+                        failure = UnresolvedReference(line, header[column], value, str(result))
+                        if unresolved is None:
+                            raise failure
+                        unresolved.append(failure)
+                        result = ''
+                    while len(row) <= column:
+                        row.append('')
+                    row[column] = result
+                yield row
+
+        return header, resolved()
+    return resolve_references
+
+
+def load_parent_index(specs: List[str], placeholders: Optional[Dict[str, str]] = None,
+                      synthesize_ids: bool = False,
+                      key_columns: Optional[Dict[str, Sequence[str]]] = None) -> ParentIndex:
+    """Build a ParentIndex from "[Object=]path" specs, as given to --parent.
+
+    key_columns (object -> key columns) is used when synthesize_ids derives the
+    parents' IDs; pass the map the keying stage gets.
+    """
+    index = ParentIndex()
+    for spec in specs:
+        object_name, sep, path = spec.rpartition('=')
+        if not Path(spec).exists() and sep:
+            index.add_file(path, object_name, placeholders, synthesize_ids, key_columns)
+        else:
+            index.add_file(spec, None, placeholders, synthesize_ids, key_columns)
+    index.derive_pending()
+    return index
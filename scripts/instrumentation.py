@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Opt-in timing, counter and memory instrumentation for the metadata scripts.
+
+Scripts ask for the current recorder and wrap their phases:
+
+    rec = recorder()
+    with rec.phase('render'):
+        ...
+    rec.count('skipped.excluded')
+
+By default the recorder is a NullRecorder whose methods do nothing, so the
+instrumentation costs a method call. --profile PATH (see add_profile_arguments
+and profiling) installs a Recorder that accumulates per-phase wall time and
+call counts, named counters and the tracemalloc peak, and writes them as JSON
+Lines records to PATH:
+
+    {"event": "start", "script": ..., "argv": [...], ...}
+    {"event": "object", "object": "Booking__c", "phases": {...}, "counters": {...}, ...}
+    {"event": "summary", "wall_seconds": ..., "phases": {...}, "counters": {...}, ...}
+
+Each record has "time", "pid" and "script". Records are appended, so several
+runs can share one file. --cprofile PATH additionally writes a cProfile dump
+(PATH.<pid> for pool workers), readable with `python3 -m pstats PATH`.
+"""
+
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Iterable, Iterator, Optional
+import cProfile
+import json
+import os
+import sys
+import time
+import tracemalloc
+from multiprocessing import util as multiprocessing_util
+
+_NULL_CONTEXT = nullcontext()
+
+
+class NullRecorder:
+    """Recorder used when instrumentation is off; every method is a no-op."""
+
+    enabled = False
+
+    def phase(self, name: str):
+        return _NULL_CONTEXT
+
+    def iterate(self, name: str, iterable: Iterable) -> Iterable:
+        return iterable
+
+    def count(self, name: str, n: int = 1):
+        pass
+
+    def take(self) -> Optional[dict]:
+        return None
+
+    def merge(self, snapshot: Optional[dict]):
+        pass
+
+    def emit(self, event: str, **data):
+        pass
+
+
+class Recorder(NullRecorder):
+    """Accumulates phase timings and counters, and writes JSON Lines records to path (if any)."""
+
+    enabled = True
+
+    def __init__(self, path: Optional[str] = None, script: str = '', trace_memory: bool = True):
+        self.path = path
+        self.script = script
+        self.trace_memory = trace_memory
+        self.phases: Dict[str, list] = {}     # name -> [seconds, calls]
+        self.counters: Dict[str, int] = {}
+        self.merged_peak = 0                  # highest tracemalloc peak among merged snapshots
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            totals = self.phases.setdefault(name, [0.0, 0])
+            totals[0] += time.perf_counter() - start
+            totals[1] += 1
+
+    def iterate(self, name: str, iterable: Iterable) -> Iterator:
+        """Yield from iterable, timing each step under phase name (for lazily decoded input)."""
+        iterator = iter(iterable)
+        totals = self.phases.setdefault(name, [0.0, 0])
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                totals[0] += time.perf_counter() - start
+                return
+            totals[0] += time.perf_counter() - start
+            totals[1] += 1
+            yield item
+
+    def count(self, name: str, n: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def snapshot(self) -> dict:
+        snapshot = {
+            'phases': {name: {'seconds': round(seconds, 6), 'calls': calls}
+                       for name, (seconds, calls) in sorted(self.phases.items())},
+            'counters': dict(sorted(self.counters.items())),
+        }
+        if self.trace_memory and tracemalloc.is_tracing():
+            snapshot['tracemalloc_peak_bytes'] = max(tracemalloc.get_traced_memory()[1], self.merged_peak)
+        return snapshot
+
+    def take(self) -> dict:
+        """Snapshot and reset, e.g. to report one object at a time."""
+        snapshot = self.snapshot()
+        self.phases = {}
+        self.counters = {}
+        self.merged_peak = 0
+        if self.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        return snapshot
+
+    def merge(self, snapshot: Optional[dict]):
+        """Add a snapshot taken elsewhere (e.g. in a pool worker) into this recorder's totals."""
+        if not snapshot:
+            return
+        for name, phase in snapshot.get('phases', {}).items():
+            totals = self.phases.setdefault(name, [0.0, 0])
+            totals[0] += phase['seconds']
+            totals[1] += phase['calls']
+        for name, value in snapshot.get('counters', {}).items():
+            self.count(name, value)
+        self.merged_peak = max(self.merged_peak, snapshot.get('tracemalloc_peak_bytes', 0))
+
+    def emit(self, event: str, **data):
+        if not self.path:
+            return
+        record = {'event': event, 'time': round(time.time(), 3), 'pid': os.getpid(), 'script': self.script}
+        record.update(data)
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(record, sort_keys=True) + '\n')
+
+
+_recorder: NullRecorder = NullRecorder()
+# (path, script, trace_memory, cprofile_path) of the active configuration, passed to pool workers
+_settings: Optional[tuple] = None
+
+
+def recorder() -> NullRecorder:
+    return _recorder
+
+
+def settings() -> Optional[tuple]:
+    """The active configuration, for configure_worker in process pools (None when off)."""
+    return _settings
+
+
+def configure(path: Optional[str], script: str, trace_memory: bool = True,
+              cprofile_path: Optional[str] = None) -> Recorder:
+    """Install a Recorder for this process."""
+    global _recorder, _settings
+    _recorder = Recorder(path, script, trace_memory)
+    _settings = (path, script, trace_memory, cprofile_path)
+    return _recorder
+
+
+def configure_worker(worker_settings: Optional[tuple]):
+    """Pool initializer: instrument a worker like its parent.
+
+    Workers do not write records themselves; callers return recorder().take()
+    with their results and the parent merges it. Their cProfile dump goes to
+    <cprofile_path>.<pid>, written when the worker exits.
+    """
+    if worker_settings is None:
+        return
+    _, script, trace_memory, cprofile_path = worker_settings
+    configure(None, script, trace_memory)
+    if cprofile_path:
+        profiler = cProfile.Profile()
+        profiler.enable()
+        multiprocessing_util.Finalize(profiler, _dump_profile, args=(profiler, f'{cprofile_path}.{os.getpid()}'),
+                                      exitpriority=10)
+
+
+def _dump_profile(profiler: cProfile.Profile, path: str):
+    profiler.disable()
+    profiler.dump_stats(path)
+
+
+def add_profile_arguments(parser):
+    parser.add_argument('--profile', metavar='PATH',
+                        help='Append per-phase timings, counters and memory peaks as JSON Lines to PATH')
+    parser.add_argument('--cprofile', metavar='PATH',
+                        help='Also write a cProfile dump to PATH (pool workers write PATH.<pid>)')
+    parser.add_argument('--no-tracemalloc', action='store_true',
+                        help='With --profile, skip tracemalloc (it slows allocation-heavy phases)')
+
+
+@contextmanager
+def profiling(args, script: str):
+    """Instrument the enclosed run when --profile or --cprofile was given."""
+    if not (getattr(args, 'profile', None) or getattr(args, 'cprofile', None)):
+        yield _recorder
+        return
+
+    rec = configure(args.profile, script, not args.no_tracemalloc, args.cprofile)
+    rec.emit('start', argv=sys.argv[1:])
+    profiler = cProfile.Profile() if args.cprofile else None
+    start = time.perf_counter()
+    if profiler:
+        profiler.enable()
+    try:
+        yield rec
+    finally:
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(args.cprofile)
+        rec.emit('summary', wall_seconds=round(time.perf_counter() - start, 6), **rec.snapshot())
+        if args.profile:
+            print(f"Profile written to {args.profile}", file=sys.stderr)
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Catalog of the objects, fields and tabs in an SFDX source tree.
+
+build_catalog walks force-app/main/default/objects once and parses every
+*.field-meta.xml into a FieldInfo, so scripts that need field lists (permission
+sync, validation, ...) share one scan instead of globbing per object.
+
+load_catalog does the same through a persistent SQLite cache (by default
+.sfdx/metadata-catalog.sqlite in the project). Each field file is re-parsed only
+when its mtime or size changed, so warm runs just stat the tree.
+"""
+
+from typing import Dict, List, NamedTuple, Optional, Tuple
+import hashlib
+import os
+import sqlite3
+import sys
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+METADATA_NS = '{http://soap.sforce.com/2006/04/metadata}'
+
+# Field types that cannot carry field-level security
+NO_FLS_TYPES = {'MasterDetail'}
+
+# Field types whose values are computed by Salesforce, so they can only be granted read access
+READ_ONLY_TYPES = {'AutoNumber', 'Summary'}
+
+
+class FieldInfo(NamedTuple):
+    name: str
+    type: str
+    required: bool = False
+    formula: bool = False
+    external_id: bool = False
+    unique: bool = False
+    length: Optional[int] = None
+    precision: Optional[int] = None
+    scale: Optional[int] = None
+    reference_to: Optional[str] = None
+    relationship_name: Optional[str] = None
+    delete_constraint: Optional[str] = None
+    picklist_values: int = 0
+    value_set_name: Optional[str] = None
+    content_hash: Optional[str] = None
+
+    @property
+    def supports_fls(self) -> bool:
+        """Whether fieldPermissions may be deployed for this field (required fields are always visible)."""
+        return not self.required and self.type not in NO_FLS_TYPES
+
+    @property
+    def editable(self) -> bool:
+        return not self.formula and self.type not in READ_ONLY_TYPES
+
+
+def _text(root: ET.Element, tag: str) -> Optional[str]:
+    return root.findtext(METADATA_NS + tag)
+
+
+def parse_field(path, data: Optional[bytes] = None) -> FieldInfo:
+    """Parse one *.field-meta.xml file (or its already-read bytes) into a FieldInfo."""
+    if data is None:
+        with open(path, 'rb') as f:
+            data = f.read()
+    root = ET.fromstring(data)
+    name = _text(root, 'fullName') or Path(path).name.split('.', 1)[0]
+    length, precision, scale = _text(root, 'length'), _text(root, 'precision'), _text(root, 'scale')
+    values = root.findall(f'{METADATA_NS}valueSet/{METADATA_NS}valueSetDefinition/{METADATA_NS}value')
+    return FieldInfo(
+        name=name,
+        type=_text(root, 'type') or '',
+        required=_text(root, 'required') == 'true',
+        formula=root.find(METADATA_NS + 'formula') is not None,
+        external_id=_text(root, 'externalId') == 'true',
+        unique=_text(root, 'unique') == 'true',
+        length=int(length) if length and length.isdigit() else None,
+        precision=int(precision) if precision and precision.isdigit() else None,
+        scale=int(scale) if scale and scale.isdigit() else None,
+        reference_to=_text(root, 'referenceTo'),
+        relationship_name=_text(root, 'relationshipName'),
+        delete_constraint=_text(root, 'deleteConstraint'),
+        picklist_values=len(values),
+        value_set_name=root.findtext(f'{METADATA_NS}valueSet/{METADATA_NS}valueSetName'),
+        content_hash=hashlib.sha256(data).hexdigest(),
+    )
+
+
+class MetadataCatalog:
+    """Objects (name -> {field name -> FieldInfo}) and tabs found in a source tree."""
+
+    def __init__(self, objects: Dict[str, Dict[str, FieldInfo]], tabs: List[str]):
+        self.objects = objects
+        self.tabs = set(tabs)
+
+    def object_names(self, custom_only: bool = True) -> List[str]:
+        """Object names, by default only custom objects (custom metadata types are excluded)."""
+        return sorted(name for name in self.objects if not custom_only or name.endswith('__c'))
+
+    def fields(self, object_name: str) -> List[FieldInfo]:
+        return [info for _, info in sorted(self.objects.get(object_name, {}).items())]
+
+    def custom_fields(self, object_name: str) -> List[str]:
+        """Sorted custom field names of an object, like get_custom_fields in the permission scripts."""
+        return sorted(name for name in self.objects.get(object_name, {}) if name.endswith('__c'))
+
+    def field_count(self) -> int:
+        return sum(len(fields) for fields in self.objects.values())
+
+    def content_hashes(self) -> Dict[str, Dict[str, str]]:
+        """Object name -> {field name -> sha256 of the field file}."""
+        return {object_name: {name: info.content_hash for name, info in fields.items()}
+                for object_name, fields in self.objects.items()}
+
+
+def _scan_objects(source_dir: Path) -> Dict[str, List[os.DirEntry]]:
+    """Object name -> DirEntry of each *.field-meta.xml file under <source_dir>/objects."""
+    objects: Dict[str, List[os.DirEntry]] = {}
+    objects_dir = source_dir / 'objects'
+    if not objects_dir.is_dir():
+        return objects
+    for object_entry in os.scandir(objects_dir):
+        if not object_entry.is_dir():
+            continue
+        fields_dir = Path(object_entry.path) / 'fields'
+        objects[object_entry.name] = [
+            entry for entry in os.scandir(fields_dir) if entry.name.endswith('.field-meta.xml')
+        ] if fields_dir.is_dir() else []
+    return objects
+
+
+def _scan_tabs(source_dir: Path) -> List[str]:
+    tabs_dir = source_dir / 'tabs'
+    if not tabs_dir.is_dir():
+        return []
+    return [entry.name[:-len('.tab-meta.xml')] for entry in os.scandir(tabs_dir)
+            if entry.name.endswith('.tab-meta.xml')]
+
+
+def _parse_or_warn(path) -> Optional[FieldInfo]:
+    """parse_field, but report and skip files that are not well-formed XML."""
+    try:
+        return parse_field(path)
+    except ET.ParseError as e:
+        print(f"Warning: skipping unparseable field file {path}: {e}", file=sys.stderr)
+        return None
+
+
+def build_catalog(source_dir) -> MetadataCatalog:
+    """Walk <source_dir>/objects and <source_dir>/tabs once and build the catalog."""
+    source_dir = Path(source_dir)
+    objects: Dict[str, Dict[str, FieldInfo]] = {}
+    for object_name, entries in _scan_objects(source_dir).items():
+        fields = {}
+        for entry in entries:
+            info = _parse_or_warn(entry.path)
+            if info:
+                fields[info.name] = info
+        objects[object_name] = fields
+    return MetadataCatalog(objects, _scan_tabs(source_dir))
+
+
+def default_cache_path(source_dir) -> Path:
+    """.sfdx/metadata-catalog.sqlite in the SFDX project that contains source_dir."""
+    source_dir = Path(source_dir).resolve()
+    for directory in (source_dir, *source_dir.parents):
+        if (directory / 'sfdx-project.json').exists():
+            return directory / '.sfdx' / 'metadata-catalog.sqlite'
+    return source_dir / '.sfdx' / 'metadata-catalog.sqlite'
+
+
+# Columns stored per field file; a change to FieldInfo invalidates the whole cache
+CACHE_COLUMNS = ('path', 'object', 'mtime_ns', 'size') + FieldInfo._fields
+
+
+def _columns(names) -> str:
+    # Quoted, since FieldInfo has members such as "unique" that are SQL keywords
+    return ', '.join(f'"{name}"' for name in names)
+
+
+def _open_cache(cache_path: Path, source_dir: Path) -> sqlite3.Connection:
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(cache_path), timeout=30)
+    conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+    expected = {'columns': ','.join(CACHE_COLUMNS), 'source_dir': str(source_dir.resolve())}
+    stored = dict(conn.execute('SELECT key, value FROM meta'))
+    if any(stored.get(key) != value for key, value in expected.items()):
+        with conn:
+            conn.execute('DROP TABLE IF EXISTS fields')
+            conn.execute(f'CREATE TABLE fields ({_columns(CACHE_COLUMNS)}, PRIMARY KEY (path))')
+            conn.executemany('INSERT OR REPLACE INTO meta VALUES (?, ?)', expected.items())
+    return conn
+
+
+def load_catalog(source_dir, cache_path=None) -> MetadataCatalog:
+    """Build the catalog through the on-disk cache, re-parsing only files whose mtime or size changed."""
+    source_dir = Path(source_dir)
+    if not source_dir.is_dir():
+        return MetadataCatalog({}, [])
+    cache_path = Path(cache_path) if cache_path else default_cache_path(source_dir)
+    conn = _open_cache(cache_path, source_dir)
+    try:
+        cached: Dict[str, Tuple[int, int]] = {
+            path: (mtime_ns, size)
+            for path, mtime_ns, size in conn.execute('SELECT path, mtime_ns, size FROM fields')
+        }
+        scanned = _scan_objects(source_dir)
+        stale = set(cached)
+        updates = []
+        for object_name, entries in scanned.items():
+            for entry in entries:
+                path = f'{object_name}/{entry.name}'
+                stale.discard(path)
+                stat = entry.stat()
+                if cached.get(path) == (stat.st_mtime_ns, stat.st_size):
+                    continue
+                info = _parse_or_warn(entry.path)
+                if info is None:
+                    # Drop any row cached for an earlier, valid version of the file
+                    stale.add(path)
+                    continue
+                updates.append((path, object_name, stat.st_mtime_ns, stat.st_size) + tuple(info))
+
+        if updates or stale:
+            with conn:
+                conn.executemany('DELETE FROM fields WHERE path = ?', [(path,) for path in stale])
+                placeholders = ', '.join('?' * len(CACHE_COLUMNS))
+                conn.executemany(f'INSERT OR REPLACE INTO fields VALUES ({placeholders})', updates)
+
+        objects: Dict[str, Dict[str, FieldInfo]] = {name: {} for name in scanned}
+        for row in conn.execute(f'SELECT object, {_columns(FieldInfo._fields)} FROM fields'):
+            info = FieldInfo(*row[1:])
+            objects[row[0]][info.name] = info._replace(
+                required=bool(info.required), formula=bool(info.formula),
+                external_id=bool(info.external_id), unique=bool(info.unique))
+    finally:
+        conn.close()
+    return MetadataCatalog(objects, _scan_tabs(source_dir))
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Find and remove redundant grants in permission sets and profiles.
+
+Every file under permissionsets/ and profiles/ is loaded into a grant matrix:
+each field named by any fieldPermissions entry gets one bit position (fields of
+an object are contiguous), and a file's field-level security becomes two int
+bitsets, read and edit, plus a mask of the fields its objectPermissions cover
+with View All Fields. Redundancy checks are then a few bitwise operations per
+file, whatever the number of entries.
+
+A fieldPermissions entry is redundant when:
+  view-all-fields  it grants read only and the same file (or a baseline) has
+                   viewAllFields on the object, which already grants read on
+                   every field. Edit still needs field-level security, and
+                   modifyAllRecords / Modify All Data are record access, not
+                   field access, so read/edit entries are always kept.
+  no-fls           the field is required or master-detail, so it cannot carry
+                   field-level security and the deploy rejects the entry
+  baseline         a --baseline file assigned to the same users grants the
+                   same or more (read for read-only entries, edit for
+                   read/edit entries)
+An objectPermissions entry is redundant (baseline) when a baseline file grants
+every permission it does. Baseline files are themselves only minimized by the
+first two rules.
+
+Also reported, but never removed: entries for fields missing from an object
+that is in the source tree (deleted or renamed fields fail the deploy), and the
+grants each pair of files has in common, to pick baselines from.
+
+Removing an entry from the source does not revoke it in an org that already
+has it; a minimized file simply stops re-deploying grants that change nothing.
+
+Usage:
+    python3 scripts/minimize_permissions.py                           # report only
+    python3 scripts/minimize_permissions.py --baseline Admin          # Admin's grants cover the others
+    python3 scripts/minimize_permissions.py --output-dir .sfdx/minimized-permissions
+    python3 scripts/minimize_permissions.py --in-place
+"""
+
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+import argparse
+import time
+from pathlib import Path
+
+from metadata_catalog import MetadataCatalog, load_catalog
+from permission_metadata import PermissionDocument
+from sync_permissions import PERMISSION_FILES, find_permission_files
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+SOURCE_DIR = PROJECT_DIR / 'force-app' / 'main' / 'default'
+
+# objectPermissions flags, in the order Salesforce retrieves them
+OBJECT_FLAGS = ('allowCreate', 'allowDelete', 'allowEdit', 'allowRead',
+                'modifyAllRecords', 'viewAllFields', 'viewAllRecords')
+
+REMOVAL_RULES = ('view-all-fields', 'no-fls', 'baseline')
+
+
+def permission_name(path: str) -> str:
+    """File name without its metadata suffix: 'Admin' for Admin.profile-meta.xml."""
+    name = Path(path).name
+    for _, suffix in PERMISSION_FILES:
+        if name.endswith(suffix):
+            return name[:-len(suffix)]
+    return name
+
+
+class FieldIndex:
+    """Bit position per 'Object.Field' key; an object's fields occupy one contiguous run."""
+
+    def __init__(self, keys: Iterable[str]):
+        self.bits: Dict[str, int] = {}
+        # object -> mask with a bit set for each of its fields
+        self.object_masks: Dict[str, int] = {}
+        start = 0
+        current = None
+        for position, key in enumerate(sorted(set(keys))):
+            object_name = key.split('.', 1)[0]
+            if object_name != current:
+                if current is not None:
+                    self.object_masks[current] = ((1 << (position - start)) - 1) << start
+                current, start = object_name, position
+            self.bits[key] = position
+        if current is not None:
+            self.object_masks[current] = ((1 << (len(self.bits) - start)) - 1) << start
+
+    def mask(self, keys: Iterable[str]) -> int:
+        mask = 0
+        for key in keys:
+            mask |= 1 << self.bits[key]
+        return mask
+
+    def objects_mask(self, objects: Iterable[str]) -> int:
+        mask = 0
+        for object_name in objects:
+            mask |= self.object_masks.get(object_name, 0)
+        return mask
+
+
+class Grants:
+    """One permission file as bitsets over a shared FieldIndex."""
+
+    def __init__(self, path: str, document: PermissionDocument, index: FieldIndex):
+        self.path = path
+        self.name = permission_name(path)
+        self.document = document
+        read_keys = []
+        edit_keys = []
+        for entry in document.entries('fieldPermissions'):
+            if entry.get('editable') == 'true':
+                edit_keys.append(entry['field'])
+            if entry.get('readable') == 'true' or entry.get('editable') == 'true':
+                read_keys.append(entry['field'])
+        self.read = index.mask(read_keys)
+        self.edit = index.mask(edit_keys)
+        # object -> flags granted
+        self.objects: Dict[str, FrozenSet[str]] = {
+            entry['object']: frozenset(flag for flag in OBJECT_FLAGS if entry.get(flag) == 'true')
+            for entry in document.entries('objectPermissions')
+        }
+        self.view_all = index.objects_mask(name for name, flags in self.objects.items()
+                                           if 'viewAllFields' in flags)
+
+    @property
+    def read_only(self) -> int:
+        return self.read & ~self.edit
+
+    def shared(self, other: 'Grants') -> int:
+        """Field grants this file has that other grants too."""
+        return (self.edit & other.edit).bit_count() + (self.read_only & other.read).bit_count()
+
+
+def load_grants(files: List[str]) -> Tuple[FieldIndex, List[Grants]]:
+    """Parse every file and index the fields any of them grants."""
+    documents = [(path, PermissionDocument.load(path)) for path in files]
+    index = FieldIndex(entry['field'] for _, document in documents
+                       for entry in document.entries('fieldPermissions'))
+    return index, [Grants(path, document, index) for path, document in documents]
+
+
+def no_fls_fields(catalog: MetadataCatalog) -> Set[str]:
+    return {f'{object_name}.{name}' for object_name, fields in catalog.objects.items()
+            for name, info in fields.items() if not info.supports_fls}
+
+
+def find_redundant(grants: Grants, index: FieldIndex, no_fls: int,
+                   baselines: List[Grants]) -> Dict[str, List[tuple]]:
+    """Entry keys to remove from one file, by rule; the first matching rule wins."""
+    base_read = base_edit = base_view_all = 0
+    base_objects: Dict[str, Set[str]] = {}
+    if not any(baseline is grants for baseline in baselines):
+        for baseline in baselines:
+            base_read |= baseline.read
+            base_edit |= baseline.edit
+            base_view_all |= baseline.view_all
+            for object_name, flags in baseline.objects.items():
+                base_objects.setdefault(object_name, set()).update(flags)
+
+    granted = grants.read | grants.edit
+    masks = {
+        'no-fls': granted & no_fls,
+        'view-all-fields': grants.read_only & (grants.view_all | base_view_all),
+        'baseline': (grants.read_only & base_read) | (grants.edit & base_edit),
+    }
+    redundant: Dict[str, List[tuple]] = {rule: [] for rule in REMOVAL_RULES}
+    for entry in grants.document.entries('fieldPermissions'):
+        bit = 1 << index.bits[entry['field']]
+        for rule in REMOVAL_RULES:
+            if masks[rule] & bit:
+                redundant[rule].append(('fieldPermissions', entry['field']))
+                break
+    for object_name, flags in grants.objects.items():
+        if object_name in base_objects and flags <= base_objects[object_name]:
+            redundant['baseline'].append(('objectPermissions', object_name))
+    return redundant
+
+
+def missing_fields(grants: Grants, catalog: MetadataCatalog) -> List[str]:
+    """Granted fields on objects in the source tree that the tree does not define."""
+    missing = []
+    for entry in grants.document.entries('fieldPermissions'):
+        object_name, field_name = entry['field'].split('.', 1)
+        if object_name in catalog.objects and field_name not in catalog.objects[object_name]:
+            missing.append(entry['field'])
+    return sorted(missing)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--source-dir', default=str(SOURCE_DIR),
+                        help='SFDX source directory holding objects/, permissionsets/ and profiles/')
+    parser.add_argument('--baseline', nargs='+', default=[], metavar='NAME',
+                        help='Permission sets or profiles (file name without suffix) assigned to the same '
+                             'users as every other file; grants they cover are removed from the others')
+    output = parser.add_mutually_exclusive_group()
+    output.add_argument('--output-dir', help='Write minimized copies of changed files here')
+    output.add_argument('--in-place', action='store_true', help='Rewrite the source files')
+    parser.add_argument('--verbose', action='store_true', help='List every redundant entry')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    source_dir = Path(args.source_dir)
+    files = find_permission_files(source_dir)
+    if not files:
+        raise SystemExit(f"Error: no permission sets or profiles under {source_dir}")
+    catalog = load_catalog(source_dir)
+    index, all_grants = load_grants(files)
+    by_name = {grants.name: grants for grants in all_grants}
+    unknown = [name for name in args.baseline if name not in by_name]
+    if unknown:
+        raise SystemExit(f"Error: no permission set or profile named {', '.join(unknown)}; "
+                         f"choose from {', '.join(sorted(by_name))}")
+    baselines = [by_name[name] for name in args.baseline]
+    no_fls = index.mask(key for key in no_fls_fields(catalog) if key in index.bits)
+    print(f"{len(all_grants)} permission files, {len(index.bits)} fields granted")
+
+    output_dir = Path(args.output_dir) if args.output_dir else None
+    if output_dir:
+        output_dir.mkdir(parents=True, exist_ok=True)
+    total_removed = 0
+    for grants in all_grants:
+        redundant = find_redundant(grants, index, no_fls, baselines)
+        removed = sum(len(keys) for keys in redundant.values())
+        total_removed += removed
+        field_count = grants.document.count('fieldPermissions')
+        before = len(grants.document.render().encode('utf-8'))
+        for keys in redundant.values():
+            for section, key in keys:
+                grants.document.remove(section, key)
+        after = len(grants.document.render().encode('utf-8'))
+
+        role = ' (baseline)' if grants in baselines else ''
+        print(f"\n{Path(grants.path).name}{role}: {field_count} "
+              f"fieldPermissions, {len(grants.objects)} objectPermissions")
+        for rule in REMOVAL_RULES:
+            if redundant[rule]:
+                print(f"  {rule}: {len(redundant[rule])} redundant")
+                if args.verbose:
+                    for section, key in redundant[rule]:
+                        print(f"    {section} {key}")
+        missing = missing_fields(grants, catalog)
+        if missing:
+            print(f"  missing-field: {len(missing)} not in the source tree (kept): {', '.join(missing)}")
+        if removed:
+            print(f"  {before} -> {after} bytes")
+            if args.in_place:
+                grants.document.save(grants.path)
+            elif output_dir:
+                grants.document.save(output_dir / Path(grants.path).name)
+        else:
+            print("  nothing redundant")
+
+    overlaps = [(first, second, first.shared(second))
+                for i, first in enumerate(all_grants) for second in all_grants[i + 1:]]
+    overlaps = [overlap for overlap in overlaps if overlap[2]]
+    if overlaps:
+        print("\nShared field grants (candidates for --baseline):")
+        for first, second, count in sorted(overlaps, key=lambda overlap: -overlap[2]):
+            print(f"  {first.name} / {second.name}: {count}")
+
+    action = 'removed' if args.in_place or output_dir else 'redundant'
+    print(f"\n{total_removed} entries {action} in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Turn a raw dataimport export into a Bulk API ready CSV in one streaming pass.
+
+Raw exports (dataimport/setup_value.csv, location.csv, ...) carry a "_" column
+holding the sObject type as a bracketed placeholder ("[SetupValue__c]") and
+bracketed placeholders such as "[Location__c]" in relationship columns. They
+used to go through *_clean.csv, *_import.csv and sometimes *_crlf.csv by hand.
+This script chains the same steps as generator stages, so rows flow from the
+reader to the writer one at a time and no intermediate file is written:
+
+  1. drop the "_" type column
+  2. resolve placeholders: "[Location__c]" becomes the value given with
+     --set Location__c=VALUE, or an empty cell when none was given. A value
+     resolved in "Location__r" also fills an empty "Location__r.UniqueExternalId__c"
+  3. project columns: the ones given with --columns, in that order, or by
+     default every column except bare relationship columns ("Location__r"),
+     which the Bulk API rejects
+  4. write with LF or CRLF line endings (--line-ending)
+
+With --parent, reference columns are first resolved against the parent
+exports (see import_references). With --synthesize-ids, empty external ID
+columns are derived from each row's content and duplicate rows dropped before
+anything else (see external_ids).
+
+Output is written to a temporary file next to the target and renamed into
+place, so an interrupted run never leaves a half-written import file. Output
+to stdout is spooled (in memory, then in a temporary file once it grows) and
+copied out after the last row, so a run that fails prints nothing.
+
+Usage:
+    python3 scripts/normalize_import_csv.py dataimport/setup_value.csv -o dataimport/setupvalue_import.csv
+    python3 scripts/normalize_import_csv.py dataimport/location.csv --columns Name --line-ending crlf
+"""
+
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+import argparse
+import csv
+import os
+import re
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+TYPE_COLUMN = '_'
+
+# A whole cell holding "[ObjectName]"
+PLACEHOLDER = re.compile(r'\[([A-Za-z][A-Za-z0-9_]*)\]')
+
+LINE_ENDINGS = {'lf': '\n', 'crlf': '\r\n'}
+
+# Characters of stdout output kept in memory before spooling to a temporary file
+SPOOL_SIZE = 8 * 1024 * 1024
+
+Row = List[str]
+# A stage takes the header and a lazy row iterator and returns the new header and rows
+Stage = Callable[[Row, Iterator[Row]], Tuple[Row, Iterator[Row]]]
+
+
+def read_rows(path) -> Tuple[Row, Iterator[Row]]:
+    """Open a CSV export and return its header and a lazy iterator over the data rows.
+
+    The file is closed once the rows have been consumed. Blank lines are skipped.
+    """
+    f = open(path, 'r', encoding='utf-8-sig', newline='')
+    reader = csv.reader(f)
+    try:
+        header = next(reader)
+    except StopIteration:
+        f.close()
+        return [], iter(())
+
+    def rows() -> Iterator[Row]:
+        with f:
+            for row in reader:
+                if row:
+                    yield row
+
+    return header, rows()
+
+
+def export_object(path) -> Optional[str]:
+    """The object a raw export loads, named in the "_" column of its first row (None without one)."""
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        first = next((row for row in reader if row), [])
+    index = header.index(TYPE_COLUMN) if TYPE_COLUMN in header else len(first)
+    match = PLACEHOLDER.fullmatch(first[index]) if index < len(first) else None
+    return match.group(1) if match else None
+
+
+def drop_type_column(header: Row, rows: Iterator[Row]) -> Tuple[Row, Iterator[Row]]:
+    """Remove the "_" sObject type column, if present."""
+    if TYPE_COLUMN not in header:
+        return header, rows
+    index = header.index(TYPE_COLUMN)
+    return header[:index] + header[index + 1:], (row[:index] + row[index + 1:] for row in rows)
+
+
+def reference_targets(header: Row) -> Dict[int, int]:
+    """Index of each bare relationship column -> index of its "Rel__r.<key>" sibling."""
+    targets = {}
+    for i, name in enumerate(header):
+        if name.endswith('__r'):
+            for j, other in enumerate(header):
+                if other.startswith(name + '.'):
+                    targets[i] = j
+                    break
+    return targets
+
+
+def placeholder_resolver(values: Dict[str, str]) -> Stage:
+    """Stage replacing "[Object]" cells with values[Object], or '' when no value was given.
+
+    A value resolved in a bare relationship column ("Location__r") is moved into
+    its "Location__r.UniqueExternalId__c" sibling when that cell is empty, since
+    the bare column itself is not importable.
+    """
+    def resolve_placeholders(header: Row, rows: Iterator[Row]) -> Tuple[Row, Iterator[Row]]:
+        targets = reference_targets(header)
+
+        def resolved() -> Iterator[Row]:
+            for row in rows:
+                for i, cell in enumerate(row):
+                    if cell.startswith('['):
+                        match = PLACEHOLDER.fullmatch(cell)
+                        if match:
+                            value = values.get(match.group(1), '')
+                            row[i] = value
+                            target = targets.get(i)
+                            if value and target is not None and target < len(row) and not row[target]:
+                                row[target] = value
+                yield row
+        return header, resolved()
+    return resolve_placeholders
+
+
+def default_columns(header: Row) -> Row:
+    """Every column except bare relationship columns such as "Location__r"."""
+    return [name for name in header if not name.endswith('__r')]
+
+
+def column_projector(columns: Optional[Sequence[str]] = None) -> Stage:
+    """Stage keeping only the given columns, in the given order (default_columns when None)."""
+    def project_columns(header: Row, rows: Iterator[Row]) -> Tuple[Row, Iterator[Row]]:
+        wanted = list(columns) if columns else default_columns(header)
+        missing = [name for name in wanted if name not in header]
+        if missing:
+            raise ValueError(f"Columns not in the export: {', '.join(missing)}")
+        indexes = [header.index(name) for name in wanted]
+        width = len(header)
+
+        def projected() -> Iterator[Row]:
+            for row in rows:
+                if len(row) < width:
+                    row = row + [''] * (width - len(row))
+                yield [row[i] for i in indexes]
+
+        return wanted, projected()
+    return project_columns
+
+
+def run_pipeline(header: Row, rows: Iterator[Row], stages: Iterable[Stage]) -> Tuple[Row, Iterator[Row]]:
+    for stage in stages:
+        header, rows = stage(header, rows)
+    return header, rows
+
+
+def write_rows(header: Row, rows: Iterable[Row], output, line_ending: str = 'lf') -> int:
+    """Write header and rows to a path (atomically) or an open text stream; return the row count."""
+    terminator = LINE_ENDINGS[line_ending]
+    if hasattr(output, 'write'):
+        return _write(header, rows, output, terminator)
+
+    output = Path(output)
+    tmp_path = output.with_name(output.name + '.tmp')
+    try:
+        with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+            count = _write(header, rows, f, terminator)
+        os.replace(tmp_path, output)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+    return count
+
+
+def _write(header: Row, rows: Iterable[Row], f, terminator: str) -> int:
+    writer = csv.writer(f, lineterminator=terminator)
+    writer.writerow(header)
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+    return count
+
+
+def build_stages(columns: Optional[Sequence[str]] = None,
+                 placeholders: Optional[Dict[str, str]] = None,
+                 references: Optional[Stage] = None,
+                 keys: Optional[Stage] = None) -> List[Stage]:
+    """The normalization stages in order: drop "_", resolve references and placeholders, project columns.
+
+    references is an optional parent-reference stage (see import_references); it
+    runs before placeholder resolution so it sees the "[Object]" placeholders.
+    keys is an optional keying stage (see external_ids); it runs first, on the
+    raw rows, so it sees their object and their parents as exported.
+    """
+    stages = [keys] if keys else []
+    stages.append(drop_type_column)
+    if references:
+        stages.append(references)
+    stages.append(placeholder_resolver(placeholders or {}))
+    stages.append(column_projector(columns))
+    return stages
+
+
+def normalize(input_path, output, columns: Optional[Sequence[str]] = None,
+              placeholders: Optional[Dict[str, str]] = None, line_ending: str = 'lf',
+              references: Optional[Stage] = None, keys: Optional[Stage] = None) -> int:
+    """Normalize one raw export into output; returns the number of data rows written."""
+    header, rows = read_rows(input_path)
+    if not header:
+        raise ValueError(f"{input_path} is empty")
+    header, rows = run_pipeline(header, rows, build_stages(columns, placeholders, references, keys))
+    return write_rows(header, rows, output, line_ending)
+
+
+def parse_placeholder_values(assignments: Optional[List[str]]) -> Dict[str, str]:
+    values = {}
+    for assignment in assignments or []:
+        name, sep, value = assignment.partition('=')
+        if not sep or not name:
+            raise SystemExit(f"--set expects Object=value, got '{assignment}'")
+        values[name.strip('[]')] = value
+    return values
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('input', help='Raw export CSV (with the "_" type column)')
+    parser.add_argument('-o', '--output', help='Output CSV (default: stdout)')
+    parser.add_argument('--columns', nargs='+',
+                        help='Columns to keep, in order (default: all but bare __r columns)')
+    parser.add_argument('--set', dest='placeholders', action='append', metavar='OBJECT=VALUE',
+                        help='Value for "[OBJECT]" placeholders (repeatable; default: empty)')
+    parser.add_argument('--line-ending', choices=sorted(LINE_ENDINGS), default='lf',
+                        help='Line ending of the output (default: lf)')
+    parser.add_argument('--parent', dest='parents', action='append', metavar='[OBJECT=]FILE',
+                        help='Parent export to resolve "<Relationship>.<Field>" columns against (repeatable)')
+    parser.add_argument('--allow-unresolved', action='store_true',
+                        help='Leave unresolvable references empty instead of failing')
+    parser.add_argument('--synthesize-ids', action='store_true',
+                        help='Derive empty external IDs from row content and drop duplicate rows')
+    parser.add_argument('--key-columns', nargs='+', metavar='[OBJECT=]COL[,COL...]',
+                        help='Columns identifying a row for --synthesize-ids, besides its parents (default: '
+                             'Name, or the object\'s natural key); bare columns apply to the input\'s object, '
+                             'OBJECT=COL,... to that object, e.g. a --parent')
+    parser.add_argument('--keep-first', action='store_true',
+                        help='With --synthesize-ids, keep the first of rows whose keys collide with '
+                             'different values instead of failing')
+    args = parser.parse_args(argv)
+
+    placeholders = parse_placeholder_values(args.placeholders)
+    key_columns = None
+    if args.key_columns:
+        # Imported here: external_ids builds on this module's stages
+        from external_ids import parse_key_columns
+        bare = any('=' not in spec for spec in args.key_columns)
+        input_object = export_object(args.input) if bare else None
+        if bare and input_object is None:
+            raise SystemExit(f"Error: {args.input} names no object in a \"_\" column; "
+                             f"use --key-columns OBJECT=COL[,COL...]")
+        try:
+            key_columns = parse_key_columns(args.key_columns, input_object)
+        except ValueError as e:
+            raise SystemExit(f"Error: {e}")
+    index = references = None
+    unresolved = None
+    if args.parents:
+        # Imported here: import_references builds on this module's stages
+        from import_references import load_parent_index, reference_resolver
+        index = load_parent_index(args.parents, placeholders, args.synthesize_ids, key_columns)
+        unresolved = [] if args.allow_unresolved else None
+        references = reference_resolver(index, placeholders, unresolved)
+    keys = report = None
+    if args.synthesize_ids:
+        # Imported here: external_ids builds on this module's stages
+        from external_ids import KeyingReport, keying_stage, print_report
+        report = KeyingReport()
+        keys = keying_stage(placeholders=placeholders, key_columns=key_columns, report=report,
+                            parents=index, keep_first=args.keep_first)
+
+    # Without -o, rows are spooled so a failure part way leaves stdout empty
+    output = args.output or tempfile.SpooledTemporaryFile(SPOOL_SIZE, mode='w+', encoding='utf-8', newline='')
+    try:
+        count = normalize(args.input, output, args.columns, placeholders,
+                          args.line_ending, references, keys)
+        if not args.output:
+            output.seek(0)
+            shutil.copyfileobj(output, sys.stdout)
+    except ValueError as e:
+        raise SystemExit(f"Error: {e}")
+    finally:
+        if not args.output:
+            output.close()
+    if args.output:
+        print(f"{args.input} -> {args.output}: {count} rows")
+    if report:
+        print_report(args.input, report, file=sys.stderr if not args.output else sys.stdout)
+    if unresolved:
+        print(f"Warning: {len(unresolved)} references left empty", file=sys.stderr)
+        for failure in unresolved[:10]:
+            print(f"  {failure}", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Indexed, idempotent editing of permission set and profile metadata.
+
+PermissionDocument parses a *.permissionset-meta.xml or *.profile-meta.xml file
+once into an index keyed by section and entry key (fieldPermissions by field,
+objectPermissions by object, tabSettings by tab, ...). Entries are upserted in
+place, so re-running a script that grants the same permissions changes nothing,
+and the document is written back in one pass in the order it was read: existing
+sections, entries and entry children keep their place, and new ones go before
+the first existing one that sorts after them. A file in the order Salesforce
+retrieves metadata in (sorted by tag and key) therefore stays sorted, and an
+edit only shows up in a diff as the lines it added or changed.
+"""
+
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple, TypeVar
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+METADATA_NS = 'http://soap.sforce.com/2006/04/metadata'
+XML_DECLARATION = '<?xml version="1.0" encoding="UTF-8"?>'
+INDENT = '    '
+
+# Repeated sections and the child element(s) that identify an entry
+SECTION_KEYS = {
+    'agentAccesses': ('agentName',),
+    'applicationVisibilities': ('application',),
+    'categoryGroupVisibilities': ('dataCategoryGroup',),
+    'classAccesses': ('apexClass',),
+    'customMetadataTypeAccesses': ('name',),
+    'customPermissions': ('name',),
+    'customSettingAccesses': ('name',),
+    'emailRoutingAddressAccesses': ('name',),
+    'externalCredentialPrincipalAccesses': ('externalCredentialPrincipal',),
+    'externalDataSourceAccesses': ('externalDataSource',),
+    'fieldPermissions': ('field',),
+    'flowAccesses': ('flow',),
+    'layoutAssignments': ('layout', 'recordType'),
+    'loginIpRanges': ('startAddress', 'endAddress'),
+    'objectPermissions': ('object',),
+    'pageAccesses': ('apexPage',),
+    'profileActionOverrides': ('actionName', 'pageOrSobjectType', 'recordType'),
+    'recordTypeVisibilities': ('recordType',),
+    'servicePresenceStatusAccesses': ('servicePresenceStatus',),
+    'tabSettings': ('tab',),
+    'tabVisibilities': ('tab',),
+    'userPermissions': ('name',),
+}
+
+# Text escaping used for element content, matching the generators in this folder
+XML_ENTITIES = {'"': '&quot;', "'": '&apos;'}
+
+K = TypeVar('K')
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit('}', 1)[-1]
+
+
+def _merge_order(existing: Iterable[K], added: Iterable[K]) -> List[K]:
+    """existing in its order, with each added item before the first existing item that sorts after it."""
+    added = sorted(added)
+    order: List[K] = []
+    i = 0
+    for item in existing:
+        while i < len(added) and added[i] < item:
+            order.append(added[i])
+            i += 1
+        order.append(item)
+    order.extend(added[i:])
+    return order
+
+
+def _new_child(element: ET.Element, tag: str) -> ET.Element:
+    """Add an empty child tag to element, before the first child whose tag sorts after it."""
+    child = ET.Element(f'{{{METADATA_NS}}}{tag}')
+    position = next((i for i, other in enumerate(element) if _local_name(other.tag) > tag), len(element))
+    element.insert(position, child)
+    return child
+
+
+def _render_element(element: ET.Element, depth: int, lines: List[str], sort_children: bool = False):
+    """Append the XML lines for element, children in document order (or sorted by tag)."""
+    tag = _local_name(element.tag)
+    pad = INDENT * depth
+    children = list(element)
+    if not children:
+        lines.append(f'{pad}<{tag}>{escape(element.text or "", XML_ENTITIES)}</{tag}>')
+        return
+    lines.append(f'{pad}<{tag}>')
+    if sort_children:
+        children.sort(key=lambda c: _local_name(c.tag))
+    for child in children:
+        _render_element(child, depth + 1, lines, sort_children)
+    lines.append(f'{pad}</{tag}>')
+
+
+class PermissionDocument:
+    """A permission set or profile indexed by (section, entry key)."""
+
+    def __init__(self, root_tag: str):
+        self.root_tag = root_tag
+        # section tag -> {entry key: element}, in document order
+        self._sections: Dict[str, Dict[Tuple[str, ...], ET.Element]] = {}
+        # Sections and entries created since parsing; render places them among the parsed ones
+        self._added_sections: Set[str] = set()
+        self._added: Dict[str, Set[Tuple[str, ...]]] = {}
+
+    @classmethod
+    def parse(cls, text: str) -> 'PermissionDocument':
+        root = ET.fromstring(text)
+        document = cls(_local_name(root.tag))
+        for element in root:
+            document._add(element)
+        return document
+
+    @classmethod
+    def load(cls, path) -> 'PermissionDocument':
+        with open(path, 'rb') as f:
+            return cls.parse(f.read())
+
+    def _entry_key(self, section: str, element: ET.Element) -> Tuple[str, ...]:
+        key_tags = SECTION_KEYS.get(section)
+        if key_tags:
+            return tuple((element.findtext(f'{{{METADATA_NS}}}{tag}') or '') for tag in key_tags)
+        if len(element):
+            # Unknown repeated section: identify entries by their full content
+            lines: List[str] = []
+            _render_element(element, 0, lines, sort_children=True)
+            return tuple(lines)
+        # Single-valued elements (label, description, userLicense, ...)
+        return ()
+
+    def _add(self, element: ET.Element):
+        section = _local_name(element.tag)
+        self._sections.setdefault(section, {})[self._entry_key(section, element)] = element
+
+    def _entries_for_update(self, section: str) -> Dict[Tuple[str, ...], ET.Element]:
+        if section not in self._sections:
+            self._added_sections.add(section)
+        return self._sections.setdefault(section, {})
+
+    def _insert(self, section: str, key: Tuple[str, ...], element: ET.Element):
+        self._entries_for_update(section)[key] = element
+        self._added.setdefault(section, set()).add(key)
+
+    def sections(self) -> List[str]:
+        return sorted(self._sections)
+
+    def entries(self, section: str) -> Iterator[Dict[str, str]]:
+        """Yield each entry of a section as a {child tag: text} dict."""
+        for element in self._sections.get(section, {}).values():
+            yield {_local_name(child.tag): child.text or '' for child in element}
+
+    def get(self, section: str, *key: str) -> Optional[Dict[str, str]]:
+        element = self._sections.get(section, {}).get(tuple(key))
+        if element is None:
+            return None
+        return {_local_name(child.tag): child.text or '' for child in element}
+
+    def count(self, section: str) -> int:
+        return len(self._sections.get(section, {}))
+
+    def upsert(self, section: str, **values: str) -> bool:
+        """Insert an entry, or update the children of the existing entry with the same key.
+
+        Returns True when the document changed.
+        """
+        key_tags = SECTION_KEYS.get(section)
+        if not key_tags:
+            raise ValueError(f"Section '{section}' has no entry key; use set_value for single values")
+        key = tuple(values.get(tag, '') for tag in key_tags)
+        element = self._sections.get(section, {}).get(key)
+        if element is None:
+            element = ET.Element(f'{{{METADATA_NS}}}{section}')
+            self._insert(section, key, element)
+        changed = False
+        for tag, value in values.items():
+            child = element.find(f'{{{METADATA_NS}}}{tag}')
+            if child is None:
+                child = _new_child(element, tag)
+            if child.text != value:
+                child.text = value
+                changed = True
+        return changed
+
+    def remove(self, section: str, *key: str) -> bool:
+        """Remove an entry; returns True when it existed."""
+        entries = self._sections.get(section, {})
+        if tuple(key) not in entries:
+            return False
+        del entries[tuple(key)]
+        self._added.get(section, set()).discard(tuple(key))
+        if not entries:
+            del self._sections[section]
+            self._added_sections.discard(section)
+        return True
+
+    def set_value(self, tag: str, value: str) -> bool:
+        """Set a single-valued element such as label or description."""
+        current = self._sections.get(tag, {}).get(())
+        if current is not None and current.text == value:
+            return False
+        if current is not None:
+            current.text = value
+            return True
+        element = ET.Element(f'{{{METADATA_NS}}}{tag}')
+        element.text = value
+        self._insert(tag, (), element)
+        return True
+
+    def render(self) -> str:
+        """Serialize the document, keeping the parsed order and placing new entries among it."""
+        lines = [XML_DECLARATION, f'<{self.root_tag} xmlns="{METADATA_NS}">']
+        parsed_sections = (name for name in self._sections if name not in self._added_sections)
+        for section in _merge_order(parsed_sections, self._added_sections):
+            entries = self._sections[section]
+            added = self._added.get(section, ())
+            for key in _merge_order((key for key in entries if key not in added), added):
+                _render_element(entries[key], 1, lines)
+        lines.append(f'</{self.root_tag}>')
+        return '\n'.join(lines) + '\n'
+
+    def save(self, path) -> bool:
+        """Write the document if its rendering differs from the file; returns True if written."""
+        path = Path(path)
+        data = self.render().encode('utf-8')
+        try:
+            if path.read_bytes() == data:
+                return False
+        except FileNotFoundError:
+            pass
+        path.write_bytes(data)
+        return True
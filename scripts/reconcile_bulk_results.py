@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Reconcile a Bulk API job's result files and write retry files for fixable failures.
+
+Streams <jobId>-success-records.csv and <jobId>-failed-records.csv (the sf__Id,
+sf__Created / sf__Error files the Bulk API returns), groups the failures by
+error code and reports them. Failures in the retryable classes (by default
+REQUIRED_FIELD_MISSING and DUPLICATE_VALUE) are joined back to the source file
+the job was loaded from and written to <jobId>-retry-<CODE>.csv, one file per
+code, holding only the failed source rows. The retry costs as many rows as
+failed rather than the whole import.
+
+Rows are matched to the source on the columns the result files share with it,
+counting duplicates, so a source with two "Standard" rows of which one failed
+yields one retry row. Without --source the retry rows are the failed records
+themselves, minus the sf__ columns. DUPLICATE_VALUE retries drop rows whose
+UniqueExternalId__c already loaded or repeats within the retry file.
+
+Usage:
+    python3 scripts/reconcile_bulk_results.py 750Ka00000ciB9iIAE --source dataimport/guestroomtype.csv
+    python3 scripts/reconcile_bulk_results.py --failed path/to/failed.csv --success path/to/success.csv
+"""
+
+from collections import Counter
+from typing import Dict, List, NamedTuple, Optional, Tuple
+import argparse
+import csv
+import re
+from pathlib import Path
+
+from normalize_import_csv import read_rows
+
+RESULT_PREFIX = 'sf__'
+ERROR_COLUMN = 'sf__Error'
+KEY_FIELD = 'UniqueExternalId__c'
+
+DEFAULT_RETRY_CODES = ('REQUIRED_FIELD_MISSING', 'DUPLICATE_VALUE')
+
+# "REQUIRED_FIELD_MISSING:Required fields are missing: [Location__c]:Location__c --"
+ERROR_CODE = re.compile(r'([A-Z_]+):')
+ERROR_FIELDS = re.compile(r'\[([^\]]*)\]')
+
+
+class ErrorGroup(NamedTuple):
+    code: str
+    count: int
+    fields: Tuple[str, ...]
+    sample: str
+
+
+def error_code(message: str) -> str:
+    match = ERROR_CODE.match(message)
+    return match.group(1) if match else 'UNKNOWN'
+
+
+def error_fields(message: str) -> Tuple[str, ...]:
+    """Field names listed in brackets in an error message."""
+    fields = []
+    for group in ERROR_FIELDS.findall(message):
+        fields.extend(name.strip() for name in group.split(',') if name.strip())
+    return tuple(fields)
+
+
+def result_paths(job_id: str, directory: Path) -> Tuple[Path, Path]:
+    return (directory / f'{job_id}-failed-records.csv', directory / f'{job_id}-success-records.csv')
+
+
+class Reconciliation:
+    """Error groups of one job and the failed rows of the retryable codes."""
+
+    def __init__(self, retry_codes=DEFAULT_RETRY_CODES):
+        self.retry_codes = tuple(retry_codes)
+        self.succeeded = 0
+        self.groups: Dict[str, ErrorGroup] = {}
+        self.data_columns: List[str] = []
+        # code -> failed rows (data columns only), in file order
+        self.retry_rows: Dict[str, List[List[str]]] = {code: [] for code in self.retry_codes}
+        self.loaded_keys: set = set()
+
+    @property
+    def failed(self) -> int:
+        return sum(group.count for group in self.groups.values())
+
+    def read_success(self, path: Path):
+        """Count successes, remembering their external IDs for DUPLICATE_VALUE retries."""
+        header, rows = read_rows(path)
+        key_index = header.index(KEY_FIELD) if KEY_FIELD in header else None
+        remember = key_index is not None and 'DUPLICATE_VALUE' in self.retry_codes
+        for row in rows:
+            self.succeeded += 1
+            if remember and key_index < len(row) and row[key_index]:
+                self.loaded_keys.add(row[key_index])
+
+    def read_failed(self, path: Path):
+        header, rows = read_rows(path)
+        if ERROR_COLUMN not in header:
+            raise ValueError(f"{path} has no {ERROR_COLUMN} column")
+        error_index = header.index(ERROR_COLUMN)
+        data_indexes = [i for i, name in enumerate(header) if not name.startswith(RESULT_PREFIX)]
+        self.data_columns = [header[i] for i in data_indexes]
+
+        for row in rows:
+            message = row[error_index] if error_index < len(row) else ''
+            code = error_code(message)
+            group = self.groups.get(code)
+            if group is None:
+                self.groups[code] = ErrorGroup(code, 1, error_fields(message), message)
+            else:
+                fields = group.fields + tuple(f for f in error_fields(message) if f not in group.fields)
+                self.groups[code] = group._replace(count=group.count + 1, fields=fields)
+            if code in self.retry_rows:
+                self.retry_rows[code].append([row[i] if i < len(row) else '' for i in data_indexes])
+
+
+def join_source(reconciliation: Reconciliation, source: Path) -> Tuple[List[str], Dict[str, List[List[str]]]]:
+    """Stream the source once and pick the rows matching each code's failed records.
+
+    Returns the source header and the source rows per code.
+    """
+    header, rows = read_rows(source)
+    shared = [name for name in reconciliation.data_columns if name in header]
+    if not shared:
+        raise ValueError(f"{source} shares no columns with the failed records")
+    source_indexes = [header.index(name) for name in shared]
+    result_indexes = [reconciliation.data_columns.index(name) for name in shared]
+
+    wanted: Dict[str, Counter] = {
+        code: Counter(tuple(row[i] for i in result_indexes) for row in failed)
+        for code, failed in reconciliation.retry_rows.items()
+    }
+    matched: Dict[str, List[List[str]]] = {code: [] for code in wanted}
+    for row in rows:
+        key = tuple(row[i] if i < len(row) else '' for i in source_indexes)
+        for code, counts in wanted.items():
+            if counts[key] > 0:
+                counts[key] -= 1
+                matched[code].append(row)
+                break
+
+    for code, counts in wanted.items():
+        unmatched = sum(counts.values())
+        if unmatched:
+            print(f"Warning: {unmatched} {code} failures not found in {source}")
+    return header, matched
+
+
+def drop_loaded_duplicates(header: List[str], rows: List[List[str]], loaded_keys: set) -> List[List[str]]:
+    """Rows whose external ID neither loaded already nor appears earlier in rows."""
+    if KEY_FIELD not in header:
+        return rows
+    index = header.index(KEY_FIELD)
+    seen = set(loaded_keys)
+    kept = []
+    for row in rows:
+        key = row[index] if index < len(row) else ''
+        if key and key in seen:
+            continue
+        seen.add(key)
+        kept.append(row)
+    return kept
+
+
+def write_retry_files(reconciliation: Reconciliation, output_dir: Path, job_id: str,
+                      source: Optional[Path] = None) -> Dict[str, Tuple[Path, int]]:
+    """Write <jobId>-retry-<CODE>.csv per retryable code with failures; returns code -> (path, rows)."""
+    if source:
+        header, rows_by_code = join_source(reconciliation, source)
+    else:
+        header, rows_by_code = reconciliation.data_columns, reconciliation.retry_rows
+
+    written = {}
+    for code, rows in rows_by_code.items():
+        if code == 'DUPLICATE_VALUE':
+            rows = drop_loaded_duplicates(header, rows, reconciliation.loaded_keys)
+        if not rows:
+            continue
+        path = output_dir / f'{job_id}-retry-{code}.csv'
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f, lineterminator='\n')
+            writer.writerow(header)
+            writer.writerows(rows)
+        written[code] = (path, len(rows))
+    return written
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('job_id', nargs='?', help='Bulk job ID; result files are looked up in --results-dir')
+    parser.add_argument('--results-dir', default='.', help='Directory holding the <jobId>-*-records.csv files')
+    parser.add_argument('--failed', help='Failed records file (instead of a job ID)')
+    parser.add_argument('--success', help='Success records file (instead of a job ID)')
+    parser.add_argument('--source', help='CSV the job was loaded from, to take the retry rows from')
+    parser.add_argument('--retry-codes', nargs='+', default=list(DEFAULT_RETRY_CODES),
+                        help='Error codes to write retry files for')
+    parser.add_argument('--output-dir', help='Directory for the retry files (default: next to the failed file)')
+    args = parser.parse_args(argv)
+
+    if args.job_id:
+        failed_path, success_path = result_paths(args.job_id, Path(args.results_dir))
+        job_id = args.job_id
+    elif args.failed:
+        failed_path = Path(args.failed)
+        success_path = Path(args.success) if args.success else None
+        job_id = failed_path.name.split('-failed-records')[0]
+    else:
+        parser.error('give a job ID or --failed')
+
+    reconciliation = Reconciliation(args.retry_codes)
+    try:
+        reconciliation.read_failed(failed_path)
+        if success_path and success_path.exists():
+            reconciliation.read_success(success_path)
+        output_dir = Path(args.output_dir) if args.output_dir else failed_path.parent
+        written = write_retry_files(reconciliation, output_dir, job_id,
+                                    Path(args.source) if args.source else None)
+    except (OSError, ValueError) as e:
+        raise SystemExit(f"Error: {e}")
+
+    print(f"Job {job_id}: {reconciliation.succeeded} succeeded, {reconciliation.failed} failed")
+    for group in sorted(reconciliation.groups.values(), key=lambda g: -g.count):
+        fields = f" [{', '.join(group.fields)}]" if group.fields else ''
+        print(f"  {group.code}{fields}: {group.count}")
+        print(f"    e.g. {group.sample}")
+    for code, (path, count) in written.items():
+        print(f"Retry {code}: {count} rows -> {path}")
+    not_retried = [code for code in reconciliation.groups if code not in reconciliation.retry_codes]
+    if not_retried:
+        print(f"Not retried: {', '.join(not_retried)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,702 @@
+#!/usr/bin/env python3
+"""
+Flag SOQL that cannot use an index, or that selects far more fields than it needs, before deploy.
+
+Queries are read from scripts/soql/*.soql and from the Apex classes: static
+[SELECT ...] queries, and dynamic queries built by concatenating string
+literals ('SELECT ... ' + 'FROM ...'; non-literal parts are treated as
+unknown). Each query is parsed and checked against the local field metadata
+(see metadata_catalog), which tells which fields have an index:
+
+  - Id, Name, OwnerId, CreatedDate, SystemModstamp, RecordTypeId and the
+    audit lookups on every object,
+  - lookup and master-detail fields,
+  - fields marked externalId or unique.
+
+Rules:
+  non-selective-filter  the WHERE clause gives the optimizer no indexed filter to
+                        start from: every AND branch (or some OR branch) filters on
+                        an unindexed field, a parent's field (Booking__r.Property__c),
+                        a negation (!=, NOT IN, NOT LIKE, EXCLUDES), = null, or a
+                        LIKE whose pattern may start with %
+  unfiltered-query      no WHERE and no LIMIT: reads every row of the object
+  unindexed-order-by    ORDER BY on unindexed fields without a selective filter:
+                        every row is sorted to return the first few
+  wide-select           more than WIDE_SELECT_FIELDS fields, more than half the
+                        object's fields, or FIELDS(ALL/CUSTOM)
+  unused-fields         (Apex only) selected custom fields the class never mentions
+                        outside its queries
+
+Filters and ORDER BY are only judged on custom objects in the source tree;
+standard and managed objects (whose fields and indexes are not known here) and
+custom metadata types (served from cache) are left out. Classes annotated
+@isTest only query the few rows their fixtures insert, so their findings are
+reported as info. Exits 1 when any warning is found.
+
+Usage:
+    python3 scripts/soql_advisor.py                       # scripts/soql and force-app classes
+    python3 scripts/soql_advisor.py force-app/main/default/classes/EventItemsController.cls
+    python3 scripts/soql_advisor.py --info                # include info-level findings
+"""
+
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+import argparse
+import re
+from pathlib import Path
+
+from metadata_catalog import FieldInfo, MetadataCatalog, load_catalog
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+SOURCE_DIR = PROJECT_DIR / 'force-app' / 'main' / 'default'
+DEFAULT_PATHS = [PROJECT_DIR / 'scripts' / 'soql', SOURCE_DIR / 'classes']
+
+# Standard fields indexed on every object
+STANDARD_INDEXED = {'Id', 'Name', 'OwnerId', 'CreatedDate', 'CreatedById', 'LastModifiedById',
+                    'SystemModstamp', 'RecordTypeId', 'MasterRecordId', 'ParentId'}
+INDEXED_TYPES = {'Lookup', 'MasterDetail', 'Hierarchy'}
+
+# An @isTest annotation on a class declaration (not on a test method)
+TEST_CLASS = re.compile(r'@isTest\b(?:\s*\([^)]*\))?\s*(?:(?:public|private|global|virtual|abstract|'
+                        r'(?:with|without|inherited)\s+sharing)\s+)*class\b', re.IGNORECASE)
+
+WIDE_SELECT_FIELDS = 50
+# An object needs this many fields before "more than half of them" counts as wide
+WIDE_SELECT_MIN_OBJECT_FIELDS = 100
+
+# Stand-in for the non-literal parts of a dynamic query
+DYNAMIC = '__DYNAMIC__'
+
+
+class Finding(NamedTuple):
+    path: str
+    line: int
+    severity: str
+    rule: str
+    message: str
+
+    def __str__(self) -> str:
+        return f'{self.path}:{self.line}: {self.severity}: [{self.rule}] {self.message}'
+
+
+class SoqlSource(NamedTuple):
+    path: str
+    line: int
+    text: str
+    dynamic: bool = False
+
+
+# --- Extraction --------------------------------------------------------------
+
+def blank_comments(source: str) -> str:
+    """Apex source with // and /* */ comments replaced by spaces (newlines kept, so offsets still match)."""
+    out = list(source)
+    i, n = 0, len(source)
+    while i < n:
+        c = source[i]
+        if c == "'":
+            i = _string_end(source, i)
+        elif source.startswith('//', i):
+            end = source.find('\n', i)
+            end = n if end < 0 else end
+            out[i:end] = ' ' * (end - i)
+            i = end
+        elif source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            end = n if end < 0 else end + 2
+            out[i:end] = [ch if ch == '\n' else ' ' for ch in source[i:end]]
+            i = end
+        else:
+            i += 1
+    return ''.join(out)
+
+
+def _string_end(source: str, start: int) -> int:
+    """Index just past the string literal opening at start."""
+    i = start + 1
+    while i < len(source):
+        if source[i] == '\\':
+            i += 2
+        elif source[i] == "'":
+            return i + 1
+        else:
+            i += 1
+    return i
+
+
+def _unquote(literal: str) -> str:
+    return re.sub(r"\\(.)", r'\1', literal[1:-1])
+
+
+STATIC_QUERY = re.compile(r'\[\s*select\b', re.IGNORECASE)
+DYNAMIC_START = re.compile(r"'\s*select\b", re.IGNORECASE)
+
+
+def _static_queries(text: str) -> Iterator[Tuple[int, int, str]]:
+    """(start, end, query) of each [SELECT ...] in comment-free Apex."""
+    for match in STATIC_QUERY.finditer(text):
+        depth, i = 0, match.start()
+        while i < len(text):
+            c = text[i]
+            if c == "'":
+                i = _string_end(text, i)
+                continue
+            depth += c == '['
+            depth -= c == ']'
+            if depth == 0:
+                break
+            i += 1
+        yield match.start(), i + 1, text[match.start() + 1:i]
+
+
+def _dynamic_queries(text: str, skip: List[Tuple[int, int]]) -> Iterator[Tuple[int, int, str]]:
+    """(start, end, query) of each 'SELECT ...' + ... concatenation; non-literal terms become DYNAMIC."""
+    position = 0
+    for match in DYNAMIC_START.finditer(text):
+        start = match.start()
+        if start < position or any(a <= start < b for a, b in skip):
+            continue
+        parts, i = [], start
+        while True:
+            if text[i] == "'":
+                end = _string_end(text, i)
+                parts.append(_unquote(text[i:end]))
+            else:
+                # A non-literal term: skip the expression up to the next top-level + ; , or closing bracket
+                end = _expression_end(text, i)
+                parts.append(f' {DYNAMIC} ')
+            i = _skip_space(text, end)
+            if i >= len(text) or text[i] != '+':
+                break
+            i = _skip_space(text, i + 1)
+            if i >= len(text):
+                # A dangling + at the end of the source
+                break
+        position = end
+        query = ''.join(parts)
+        # Conditions appended later ('... WHERE ' then String.join(conditions, ' AND ')) are unknown
+        if re.search(r'\b(where|and|or)\s*$', query, re.IGNORECASE):
+            query += f' {DYNAMIC}'
+
+        # Plain strings that merely start with "Select" (UI labels) are not queries
+        if re.search(r'\bfrom\b', query, re.IGNORECASE):
+            yield start, end, query
+
+
+def _skip_space(text: str, i: int) -> int:
+    while i < len(text) and text[i].isspace():
+        i += 1
+    return i
+
+
+def _expression_end(text: str, i: int) -> int:
+    depth = 0
+    while i < len(text):
+        c = text[i]
+        if c == "'":
+            i = _string_end(text, i)
+            continue
+        if c in '([{':
+            depth += 1
+        elif c in ')]}':
+            if depth == 0:
+                return i
+            depth -= 1
+        elif depth == 0 and c in '+;,':
+            return i
+        i += 1
+    return i
+
+
+def extract_apex(path: str, source: str) -> Tuple[List[SoqlSource], str]:
+    """The queries in an Apex class, and the class text outside them (for unused-field checks)."""
+    text = blank_comments(source)
+    static = list(_static_queries(text))
+    spans = [(start, end) for start, end, _ in static]
+    dynamic = list(_dynamic_queries(text, spans))
+    queries = [SoqlSource(path, text.count('\n', 0, start) + 1, query) for start, _, query in static]
+    queries += [SoqlSource(path, text.count('\n', 0, start) + 1, query, True) for start, _, query in dynamic]
+    outside, last = [], 0
+    for start, end in sorted(spans + [(start, end) for start, end, _ in dynamic]):
+        outside.append(text[last:start])
+        last = max(last, end)
+    outside.append(text[last:])
+    return sorted(queries, key=lambda query: query.line), ''.join(outside)
+
+
+def extract_soql_file(path: str, source: str) -> List[SoqlSource]:
+    """Queries in a .soql file: // comments dropped, statements split on ;"""
+    text = re.sub(r'//[^\n]*', lambda m: ' ' * len(m.group()), source)
+    queries, offset = [], 0
+    for statement in text.split(';'):
+        stripped = statement.strip()
+        if stripped:
+            start = offset + statement.index(stripped[0])
+            queries.append(SoqlSource(path, text.count('\n', 0, start) + 1, stripped))
+        offset += len(statement) + 1
+    return queries
+
+
+# --- Parsing -----------------------------------------------------------------
+
+class Token(NamedTuple):
+    kind: str      # word, string, number, bind, op, punct
+    value: str
+
+    @property
+    def keyword(self) -> str:
+        return self.value.upper() if self.kind == 'word' else ''
+
+
+class SoqlSyntaxError(ValueError):
+    pass
+
+
+WORD = re.compile(r'[A-Za-z_][\w.]*(?::-?\d+)?')       # identifiers, paths, date literals like LAST_N_DAYS:30
+NUMBER = re.compile(r'-?\d[\w.:+-]*')                   # numbers and date/datetime literals
+OPERATORS = ('!=', '<>', '<=', '>=', '=', '<', '>')
+
+
+def tokenize(text: str) -> List[Token]:
+    tokens, i, n = [], 0, len(text)
+    while i < n:
+        c = text[i]
+        if c.isspace():
+            i += 1
+        elif c == "'":
+            end = _string_end(text, i)
+            tokens.append(Token('string', _unquote(text[i:end])))
+            i = end
+        elif c == ':':
+            # An Apex bind expression: :name, :obj.field, :UserInfo.getUserId(), :ids[0] ...
+            start = end = _skip_space(text, i + 1)
+            depth = 0
+            while end < n:
+                ch = text[end]
+                if ch in '([{':
+                    depth += 1
+                elif ch in ')]}':
+                    if depth == 0:
+                        break
+                    depth -= 1
+                elif depth == 0 and not (ch.isalnum() or ch in '_.'):
+                    break
+                end += 1
+            tokens.append(Token('bind', text[start:end]))
+            i = end
+        elif c in '(),':
+            tokens.append(Token('punct', c))
+            i += 1
+        elif text.startswith(OPERATORS, i):
+            op = next(op for op in OPERATORS if text.startswith(op, i))
+            tokens.append(Token('op', op))
+            i += len(op)
+        else:
+            match = (NUMBER if c.isdigit() or (c == '-' and text[i + 1:i + 2].isdigit()) else WORD).match(text, i)
+            if not match:
+                tokens.append(Token('punct', c))
+                i += 1
+                continue
+            kind = 'number' if match.re is NUMBER else 'word'
+            tokens.append(Token(kind, match.group()))
+            i = match.end()
+    return tokens
+
+
+class Condition(NamedTuple):
+    kind: str                          # and, or, not, compare, dynamic
+    children: tuple = ()
+    field: str = ''
+    operator: str = ''                 # =, !=, <, IN, NOT IN, LIKE, NOT LIKE, INCLUDES, EXCLUDES, ...
+    value: Optional[Token] = None      # for IN: None (list), the bind, or the subquery's first token
+    function: bool = False             # the field is wrapped in a function (CALENDAR_YEAR(...))
+    subquery: Optional['Query'] = None
+
+
+class Query:
+    def __init__(self):
+        self.object_name = ''
+        self.alias = ''
+        self.fields: List[str] = []
+        self.field_functions: List[str] = []    # FIELDS(ALL) etc.
+        self.subqueries: List['Query'] = []
+        self.where: Optional[Condition] = None
+        self.order_by: List[str] = []
+        self.limit: Optional[str] = None
+        self.aggregate = False
+
+
+CLAUSE_KEYWORDS = {'WHERE', 'WITH', 'GROUP', 'HAVING', 'ORDER', 'LIMIT', 'OFFSET', 'FOR', 'UPDATE', 'ALL', 'USING'}
+AGGREGATES = {'COUNT', 'COUNT_DISTINCT', 'SUM', 'AVG', 'MIN', 'MAX'}
+
+
+class Parser:
+    def __init__(self, tokens: List[Token]):
+        self.tokens = tokens
+        self.i = 0
+
+    def peek(self, offset: int = 0) -> Optional[Token]:
+        index = self.i + offset
+        return self.tokens[index] if index < len(self.tokens) else None
+
+    def next(self) -> Token:
+        token = self.peek()
+        if token is None:
+            raise SoqlSyntaxError('unexpected end of query')
+        self.i += 1
+        return token
+
+    def accept(self, *keywords: str) -> bool:
+        token = self.peek()
+        if token is not None and (token.keyword in keywords or (token.kind != 'word' and token.value in keywords)):
+            self.i += 1
+            return True
+        return False
+
+    def expect(self, keyword: str):
+        if not self.accept(keyword):
+            token = self.peek()
+            raise SoqlSyntaxError(f"expected {keyword}, found {token.value if token else 'end of query'}")
+
+    def skip_group(self):
+        """Skip a parenthesized group, the opening ( already consumed."""
+        depth = 1
+        while depth:
+            token = self.next()
+            if token.value == '(' and token.kind == 'punct':
+                depth += 1
+            elif token.value == ')' and token.kind == 'punct':
+                depth -= 1
+
+    def query(self) -> Query:
+        query = Query()
+        self.expect('SELECT')
+        self.select_list(query)
+        self.expect('FROM')
+        query.object_name = self.next().value
+        token = self.peek()
+        if token is not None and token.kind == 'word' and token.keyword not in CLAUSE_KEYWORDS:
+            query.alias = self.next().value
+        while True:
+            token = self.peek()
+            if token is None or token.value == ')':
+                return query
+            keyword = self.next().keyword
+            if keyword == 'WHERE':
+                query.where = self.condition()
+            elif keyword in ('GROUP', 'ORDER'):
+                self.expect('BY')
+                items = self.order_items()
+                if keyword == 'ORDER':
+                    query.order_by = items
+            elif keyword == 'HAVING':
+                self.condition()
+            elif keyword in ('LIMIT', 'OFFSET'):
+                value = self.next().value
+                if keyword == 'LIMIT':
+                    query.limit = value
+            elif keyword in ('WITH', 'FOR', 'UPDATE', 'ALL', 'USING'):
+                # WITH SECURITY_ENFORCED, FOR UPDATE, ALL ROWS, USING SCOPE ...: no bearing on selectivity
+                while self.peek() is not None and self.peek().keyword not in CLAUSE_KEYWORDS - {keyword} \
+                        and self.peek().value != ')':
+                    self.next()
+            elif token.value == DYNAMIC:
+                continue
+            else:
+                raise SoqlSyntaxError(f"unexpected {token.value}")
+
+    def select_list(self, query: Query):
+        while True:
+            token = self.next()
+            if token.value == '(' and token.kind == 'punct':
+                query.subqueries.append(self.query())
+                self.expect(')')
+            elif token.keyword == 'TYPEOF':
+                while self.next().keyword != 'END':
+                    pass
+            elif self.peek() is not None and self.peek().value == '(':
+                self.next()
+                name = token.keyword
+                if name == 'FIELDS':
+                    query.field_functions.append(self.next().value.upper())
+                    self.expect(')')
+                else:
+                    query.aggregate = query.aggregate or name in AGGREGATES
+                    self.skip_group()
+                alias = self.peek()
+                if alias is not None and alias.kind == 'word' and alias.keyword != 'FROM':
+                    self.next()
+            elif token.value != DYNAMIC:
+                query.fields.append(token.value)
+            if not self.accept(','):
+                return
+
+    def order_items(self) -> List[str]:
+        items = []
+        while True:
+            token = self.next()
+            if self.peek() is not None and self.peek().value == '(':
+                self.next()
+                self.skip_group()
+            else:
+                items.append(token.value)
+            while self.accept('ASC', 'DESC', 'NULLS', 'FIRST', 'LAST'):
+                pass
+            if not self.accept(','):
+                return items
+
+    def condition(self) -> Condition:
+        terms = [self.conjunction()]
+        while self.accept('OR'):
+            terms.append(self.conjunction())
+        return terms[0] if len(terms) == 1 else Condition('or', tuple(terms))
+
+    def conjunction(self) -> Condition:
+        factors = [self.factor()]
+        while self.accept('AND'):
+            factors.append(self.factor())
+        return factors[0] if len(factors) == 1 else Condition('and', tuple(factors))
+
+    def factor(self) -> Condition:
+        if self.accept('NOT'):
+            return Condition('not', (self.factor(),))
+        token = self.peek()
+        if token is not None and token.kind == 'punct' and token.value == '(':
+            self.next()
+            condition = self.condition()
+            self.expect(')')
+            return condition
+        if token is not None and token.value == DYNAMIC:
+            self.next()
+            return Condition('dynamic')
+        return self.comparison()
+
+    def comparison(self) -> Condition:
+        field = self.next().value
+        function = False
+        if self.peek() is not None and self.peek().value == '(':
+            # CALENDAR_YEAR(CreatedDate), DISTANCE(...), ...: the field is inside the function
+            self.next()
+            inner = self.peek()
+            self.skip_group()
+            field, function = inner.value if inner else field, True
+        token = self.next()
+        operator = token.value if token.kind == 'op' else token.keyword
+        if operator == 'NOT':
+            operator = 'NOT ' + self.next().keyword
+        if operator in ('IN', 'NOT IN', 'INCLUDES', 'EXCLUDES'):
+            value = self.peek()
+            if value is not None and value.kind == 'bind':
+                self.next()
+                return Condition('compare', field=field, operator=operator, value=value, function=function)
+            self.expect('(')
+            if self.peek() is not None and self.peek().keyword == 'SELECT':
+                subquery = self.query()
+                self.expect(')')
+                return Condition('compare', field=field, operator=operator, function=function, subquery=subquery)
+            self.skip_group()
+            return Condition('compare', field=field, operator=operator, function=function)
+        if operator not in OPERATORS and operator not in ('LIKE', 'NOT LIKE'):
+            raise SoqlSyntaxError(f"unexpected {token.value} after {field}")
+        return Condition('compare', field=field, operator=operator, value=self.next(), function=function)
+
+
+def parse(text: str) -> Query:
+    parser = Parser(tokenize(text))
+    query = parser.query()
+    if parser.peek() is not None:
+        raise SoqlSyntaxError(f"unexpected {parser.peek().value}")
+    return query
+
+
+# --- Analysis ----------------------------------------------------------------
+
+NEGATIVE_OPERATORS = {'!=', '<>', 'NOT IN', 'NOT LIKE', 'EXCLUDES'}
+
+
+class Advisor:
+    """Checks parsed queries against the field metadata of a catalog."""
+
+    def __init__(self, catalog: MetadataCatalog):
+        self.catalog = catalog
+
+    def field_info(self, object_name: str, field: str) -> Optional[FieldInfo]:
+        fields = self.catalog.objects.get(object_name)
+        if fields is None:
+            return None
+        return fields.get(field) or next((info for name, info in fields.items() if name.lower() == field.lower()),
+                                         None)
+
+    def indexed(self, object_name: str, field: str) -> Optional[bool]:
+        """Whether field has an index; None when the object's fields are not in the source tree."""
+        if field.lower() in {name.lower() for name in STANDARD_INDEXED}:
+            return True
+        info = self.field_info(object_name, field)
+        if info is None:
+            return False if object_name in self.catalog.objects else None
+        return info.type in INDEXED_TYPES or info.external_id or info.unique
+
+    @staticmethod
+    def _local(query: Query, field: str) -> str:
+        """field without the query's alias or object prefix."""
+        for prefix in (query.alias, query.object_name):
+            if prefix and field.lower().startswith(prefix.lower() + '.'):
+                return field[len(prefix) + 1:]
+        return field
+
+    def selective(self, query: Query, condition: Condition, reasons: List[str]) -> bool:
+        """Whether the optimizer can drive the query from an index through condition; reasons collects why not."""
+        if condition.kind == 'and':
+            # Evaluate every branch, so each one's problems are reported when none is selective
+            results = [self.selective(query, child, reasons) for child in condition.children]
+            return any(results)
+        if condition.kind == 'or':
+            results = [self.selective(query, child, reasons) for child in condition.children]
+            return all(results)
+        if condition.kind == 'not':
+            reasons.append('NOT (...) is a negative filter')
+            return False
+        if condition.kind == 'dynamic':
+            return True
+
+        field = self._local(query, condition.field)
+        described = f'"{field} {condition.operator}"' if condition.operator in NEGATIVE_OPERATORS else \
+            f'{field} {condition.operator}'
+        if '.' in field:
+            reasons.append(f'{field} is a field of a parent object')
+            return False
+        if condition.function:
+            reasons.append(f'{field} is wrapped in a function')
+            return False
+        if condition.operator in NEGATIVE_OPERATORS:
+            reasons.append(f'{described} is a negative filter')
+            return False
+        value = condition.value
+        if value is not None and value.kind == 'word' and value.keyword == 'NULL':
+            reasons.append(f'{described} null: nulls are not indexed')
+            return False
+        if condition.operator == 'INCLUDES':
+            reasons.append(f'{field} INCLUDES filters a multi-select picklist')
+            return False
+        indexed = self.indexed(query.object_name, field)
+        if indexed is None:
+            return True
+        if not indexed:
+            reasons.append(f'{field} is not indexed')
+            return False
+        if condition.operator == 'LIKE':
+            if value is not None and value.kind == 'bind':
+                reasons.append(f'{field} LIKE :{value.value} may start with %')
+                return False
+            if value is not None and value.value.startswith('%'):
+                reasons.append(f"{field} LIKE '{value.value}' starts with %")
+                return False
+        return True
+
+    def check(self, source: SoqlSource, query: Query, outside_text: Optional[str] = None) -> List[Finding]:
+        findings = []
+
+        def add(severity: str, rule: str, message: str):
+            findings.append(Finding(source.path, source.line, severity, rule, f'{query.object_name}: {message}'))
+
+        known = query.object_name in self.catalog.objects
+        # Only custom objects in the tree have known indexes; custom metadata is served from cache
+        judged = known and query.object_name.endswith('__c')
+        selective = False
+        if query.where is not None and judged:
+            reasons: List[str] = []
+            selective = self.selective(query, query.where, reasons)
+            if not selective:
+                add('warning', 'non-selective-filter',
+                    'no indexed filter to drive the query (' + '; '.join(dict.fromkeys(reasons)) + ')')
+        elif query.where is None and query.limit is None and not source.dynamic:
+            add('warning', 'unfiltered-query', 'no WHERE or LIMIT; reads every row')
+
+        unindexed_order = [field for field in query.order_by
+                           if self.indexed(query.object_name, self._local(query, field)) is False]
+        if unindexed_order and judged and not selective:
+            add('warning', 'unindexed-order-by',
+                f"ORDER BY {', '.join(unindexed_order)} is unindexed and the filter is not selective")
+
+        object_fields = len(self.catalog.objects.get(query.object_name, {}))
+        selected = {self._local(query, field) for field in query.fields}
+        if query.field_functions:
+            add('warning', 'wide-select', f"FIELDS({', '.join(query.field_functions)}) selects every field")
+        elif len(selected) > WIDE_SELECT_FIELDS or (
+                known and object_fields >= WIDE_SELECT_MIN_OBJECT_FIELDS and len(selected) > object_fields / 2):
+            add('warning', 'wide-select', f'selects {len(selected)} fields'
+                + (f' of {object_fields}' if known else ''))
+
+        if outside_text is not None:
+            unused = sorted(field for field in selected
+                            if field.split('.')[-1].endswith('__c')
+                            and not re.search(rf'\b{re.escape(field.split(".")[-1])}\b', outside_text))
+            if unused:
+                add('info', 'unused-fields', f"selected but not used outside the query: {', '.join(unused)}")
+
+        for subquery in query.subqueries:
+            findings.extend(self.check(source, subquery, outside_text) if subquery.object_name in self.catalog.objects
+                            else [])
+        return findings
+
+
+def iter_files(paths: List[Path]) -> Iterator[Path]:
+    for path in paths:
+        if path.is_dir():
+            yield from sorted(path.glob('*.soql'))
+            yield from sorted(path.glob('*.cls'))
+        elif path.is_file():
+            yield path
+
+
+def analyze(paths: List[Path], catalog: MetadataCatalog) -> Tuple[List[Finding], int, int]:
+    """Findings for every query in paths; also returns (queries checked, queries that could not be parsed)."""
+    advisor = Advisor(catalog)
+    findings: List[Finding] = []
+    checked = unparsed = 0
+    for path in iter_files(paths):
+        source = path.read_text(encoding='utf-8', errors='replace')
+        display = str(path.relative_to(PROJECT_DIR)) if path.resolve().is_relative_to(PROJECT_DIR) else str(path)
+        test_class = False
+        if path.suffix == '.cls':
+            queries, outside = extract_apex(display, source)
+            test_class = TEST_CLASS.search(blank_comments(source)) is not None
+        else:
+            queries, outside = extract_soql_file(display, source), None
+        for soql in queries:
+            try:
+                query = parse(soql.text)
+            except SoqlSyntaxError as e:
+                unparsed += 1
+                findings.append(Finding(soql.path, soql.line, 'info', 'unparsed', f'query not analyzed: {e}'))
+                continue
+            checked += 1
+            for finding in advisor.check(soql, query, outside):
+                if test_class and finding.severity == 'warning':
+                    finding = finding._replace(severity='info', message=f'{finding.message} (test class)')
+                findings.append(finding)
+    return findings, checked, unparsed
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('paths', nargs='*', type=Path, default=DEFAULT_PATHS,
+                        help='.soql/.cls files or directories (default: scripts/soql and the Apex classes)')
+    parser.add_argument('--source-dir', default=str(SOURCE_DIR), help='SFDX source directory holding objects/')
+    parser.add_argument('--info', action='store_true', help='Also print info-level findings')
+    args = parser.parse_args(argv)
+
+    catalog = load_catalog(Path(args.source_dir))
+    findings, checked, unparsed = analyze([path.resolve() for path in args.paths], catalog)
+    warnings = [finding for finding in findings if finding.severity == 'warning']
+    for finding in findings:
+        if finding.severity == 'warning' or args.info:
+            print(finding)
+    print(f"\n{checked} queries checked: {len(warnings)} warnings, "
+          f"{len(findings) - len(warnings)} info ({unparsed} not parsed)")
+    if warnings:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Sync object, field and tab permissions into every permission set and profile.
+
+Loads the metadata catalog for force-app/main/default/objects once, then
+applies the permission rules below to every file under permissionsets/ and
+profiles/ in a worker pool that shares the catalog. Entries are upserted through
+PermissionDocument, so a sync with nothing new to grant leaves files untouched.
+
+Rules:
+  - objectPermissions with full access for each object
+  - fieldPermissions for each custom field: read/edit, or read-only for formula,
+    auto-number and roll-up summary fields. Required and master-detail fields
+    cannot carry field-level security, so their entries are removed.
+  - tabSettings (permission sets) / tabVisibilities (profiles) for objects with a tab
+
+Usage:
+    python3 scripts/sync_permissions.py [--objects Booking__c ...] [--workers N] [--dry-run]
+    python3 scripts/sync_permissions.py --profile timings.jsonl   # per-file phase timings
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+import argparse
+import os
+import time
+from pathlib import Path
+
+from instrumentation import add_profile_arguments, configure_worker, profiling, recorder, settings
+from metadata_catalog import FieldInfo, MetadataCatalog, build_catalog, load_catalog
+from permission_metadata import PermissionDocument
+from update_permission_set import object_permission
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+SOURCE_DIR = PROJECT_DIR / 'force-app' / 'main' / 'default'
+
+# Permission metadata folders and file suffixes to sync
+PERMISSION_FILES = [
+    ('permissionsets', '.permissionset-meta.xml'),
+    ('profiles', '.profile-meta.xml'),
+]
+
+# Root element -> (tab section, visibility value)
+TAB_RULES = {
+    'PermissionSet': ('tabSettings', 'Visible'),
+    'Profile': ('tabVisibilities', 'DefaultOn'),
+}
+
+# Catalog shared by pool workers (set once per worker by _init_worker)
+_CATALOG: Optional[MetadataCatalog] = None
+
+
+def _init_worker(catalog: MetadataCatalog, worker_settings: Optional[tuple] = None):
+    global _CATALOG
+    _CATALOG = catalog
+    configure_worker(worker_settings)
+
+
+def apply_field_rule(document: PermissionDocument, object_name: str, field: FieldInfo) -> Tuple[int, int]:
+    """Grant one custom field's fieldPermissions, or remove them when it has no FLS; returns (upserted, removed)."""
+    field_key = f'{object_name}.{field.name}'
+    if not field.supports_fls:
+        return 0, int(document.remove('fieldPermissions', field_key))
+    upserted = document.upsert(
+        'fieldPermissions',
+        field=field_key,
+        editable='true' if field.editable else 'false',
+        readable='true',
+    )
+    return int(upserted), 0
+
+
+def apply_rules(document: PermissionDocument, catalog: MetadataCatalog, objects: List[str]) -> dict:
+    """Apply the permission rules for objects to one document; return change counts."""
+    upserted = 0
+    removed = 0
+    for object_name in objects:
+        upserted += document.upsert('objectPermissions', **object_permission(object_name))
+
+        for field in catalog.fields(object_name):
+            if not field.name.endswith('__c'):
+                continue
+            field_upserted, field_removed = apply_field_rule(document, object_name, field)
+            upserted += field_upserted
+            removed += field_removed
+
+        tab_rule = TAB_RULES.get(document.root_tag)
+        if tab_rule and object_name in catalog.tabs:
+            section, visibility = tab_rule
+            upserted += document.upsert(section, tab=object_name, visibility=visibility)
+
+    return {'upserted': upserted, 'removed': removed}
+
+
+def sync_file(path: str, objects: List[str], dry_run: bool = False) -> dict:
+    """Sync one permission set or profile against the shared catalog.
+
+    With instrumentation on, the result holds the file's phase timings under 'profile'.
+    """
+    rec = recorder()
+    with rec.phase('parse'):
+        document = PermissionDocument.load(path)
+    with rec.phase('apply'):
+        result = apply_rules(document, _CATALOG, objects)
+    result['file'] = path
+    with rec.phase('write'):
+        result['written'] = False if dry_run else document.save(path)
+    if rec.enabled:
+        rec.count('entries.upserted', result['upserted'])
+        rec.count('entries.removed', result['removed'])
+        result['profile'] = rec.take()
+    return result
+
+
+def find_permission_files(source_dir: Path) -> List[str]:
+    files = []
+    for folder, suffix in PERMISSION_FILES:
+        directory = source_dir / folder
+        if directory.is_dir():
+            files.extend(str(path) for path in sorted(directory.glob(f'*{suffix}')))
+    return files
+
+
+def sync_all(source_dir: Path, objects: Optional[List[str]] = None, workers: int = 1,
+             dry_run: bool = False, use_cache: bool = True) -> List[dict]:
+    """Build the catalog once and sync every permission file under source_dir."""
+    with recorder().phase('read'):
+        catalog = load_catalog(source_dir) if use_cache else build_catalog(source_dir)
+    objects = objects or catalog.object_names()
+    missing = [name for name in objects if name not in catalog.objects]
+    if missing:
+        raise SystemExit(f"Objects not found under {source_dir / 'objects'}: {', '.join(missing)}")
+
+    files = find_permission_files(source_dir)
+    print(f"Catalog: {len(catalog.objects)} objects, {catalog.field_count()} fields")
+    print(f"Syncing {len(objects)} objects into {len(files)} permission files")
+
+    if workers <= 1 or len(files) <= 1:
+        _init_worker(catalog)
+        # sync_file takes the recorder's totals per file; keep the catalog load out of the first one
+        setup_profile = recorder().take()
+        results = [sync_file(path, objects, dry_run) for path in files]
+        recorder().merge(setup_profile)
+        return results
+    with ProcessPoolExecutor(max_workers=min(workers, len(files)),
+                             initializer=_init_worker, initargs=(catalog, settings())) as executor:
+        return list(executor.map(sync_file, files, [objects] * len(files), [dry_run] * len(files)))
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--source-dir', default=str(SOURCE_DIR),
+                        help='SFDX source directory holding objects/, permissionsets/ and profiles/')
+    parser.add_argument('--objects', nargs='+',
+                        help='Objects to grant (default: every custom object in the source tree)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='Number of permission files to process in parallel')
+    parser.add_argument('--dry-run', action='store_true', help='Report changes without writing files')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Parse every field file instead of using the .sfdx metadata catalog cache')
+    add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+
+    with profiling(args, 'sync_permissions') as rec:
+        start = time.perf_counter()
+        # Per-file profiles are taken separately (possibly in workers) and merged back
+        results = sync_all(Path(args.source_dir), args.objects, args.workers, args.dry_run,
+                           use_cache=not args.no_cache)
+        for result in results:
+            profile = result.pop('profile', None)
+            if profile:
+                rec.emit('file', file=result['file'], **profile)
+                rec.merge(profile)
+
+    for result in results:
+        changed = result['upserted'] or result['removed']
+        if args.dry_run:
+            status = 'would update' if changed else 'up to date'
+        elif result['written']:
+            # A write without changes only normalized the file's formatting
+            status = 'updated' if changed else 'reformatted'
+        else:
+            status = 'up to date'
+        print(f"{Path(result['file']).name}: {status} "
+              f"({result['upserted']} upserted, {result['removed']} removed)")
+    print(f"\nDone in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+"""Shared fixtures for the script tests; the scripts import each other by bare module name."""
+
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent
+PROJECT_DIR = SCRIPTS_DIR.parent
+DATAIMPORT_DIR = PROJECT_DIR / 'dataimport'
+SOURCE_DIR = PROJECT_DIR / 'force-app' / 'main' / 'default'
+
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+
+@pytest.fixture(scope='session')
+def catalog(tmp_path_factory):
+    from metadata_catalog import load_catalog
+    return load_catalog(SOURCE_DIR, tmp_path_factory.mktemp('catalog') / 'metadata-catalog.sqlite')
+
+
+@pytest.fixture
+def serve():
+    """Start a stub HTTP server in a thread; it is shut down after the test."""
+    servers = []
+
+    def start(server):
+        thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+        thread.start()
+        servers.append((server, thread))
+        return server
+
+    yield start
+    for server, thread in servers:
+        server.shutdown()
+        server.server_close()
+        thread.join()
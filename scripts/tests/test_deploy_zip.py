@@ -0,0 +1,132 @@
+import io
+import json
+import zipfile
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from benchmark_suite import synthetic_describe
+from deploy_zip import METADATA_NS, DeployArchive, StubDeployServer, check_package, deploy, main
+from generate_object_metadata import DESCRIBE_FILES
+from generate_object_metadata import main as generate_main
+
+
+@pytest.fixture(scope='module')
+def generated_zip(tmp_path_factory):
+    """A deploy zip from generate_object_metadata --zip over synthetic describes."""
+    tmp_path = tmp_path_factory.mktemp('generate')
+    downloads = tmp_path / 'downloads'
+    downloads.mkdir()
+    for filename, object_name in DESCRIBE_FILES:
+        describe = synthetic_describe(0, fields=10, picklist_fields=2, picklist_values=4)
+        describe['name'] = object_name
+        (downloads / filename).write_text(json.dumps(describe))
+    path = tmp_path / 'deploy.zip'
+    generate_main(['--downloads-dir', str(downloads), '--project-dir', str(tmp_path / 'project'),
+                   '--zip', str(path), '--compress-level', '1', '--workers', '1'])
+    return path.read_bytes()
+
+
+@pytest.fixture
+def org(serve):
+    return serve(StubDeployServer())
+
+
+def rewrite(zip_data, drop=(), add=None):
+    """zip_data without the entries in drop and with the entries in add."""
+    output = io.BytesIO()
+    with zipfile.ZipFile(io.BytesIO(zip_data)) as source, zipfile.ZipFile(output, 'w') as target:
+        for name in source.namelist():
+            if name not in drop:
+                target.writestr(name, source.read(name))
+        for name, data in (add or {}).items():
+            target.writestr(name, data)
+    return output.getvalue()
+
+
+def test_generated_zip_holds_one_entry_per_object(generated_zip):
+    with zipfile.ZipFile(io.BytesIO(generated_zip)) as archive:
+        names = archive.namelist()
+        assert sorted(names) == sorted(['package.xml'] + [f'objects/{name}.object' for _, name in DESCRIBE_FILES])
+        root = ET.fromstring(archive.read('objects/Booking__c.object'))
+    assert root.tag == f'{METADATA_NS}CustomObject'
+    fields = [field.findtext(f'{METADATA_NS}fullName') for field in root.iter(f'{METADATA_NS}fields')]
+    assert len(fields) == 10 and len(set(fields)) == 10
+
+
+def test_archive_streams_fields_into_the_object_entry():
+    output = io.BytesIO()
+    archive = DeployArchive(output, compress_level=0)
+    archive.begin_object('Thing__c', '<?xml version="1.0" encoding="UTF-8"?>\n'
+                                     '<CustomObject xmlns="http://soap.sforce.com/2006/04/metadata">\n'
+                                     '    <label>Thing</label>\n</CustomObject>\n')
+    archive.add_field('<?xml version="1.0" encoding="UTF-8"?>\n'
+                      '<CustomField xmlns="http://soap.sforce.com/2006/04/metadata">\n'
+                      '    <fullName>Size__c</fullName>\n    <type>Number</type>\n</CustomField>\n')
+    with pytest.raises(ValueError):
+        archive.begin_object('Other__c', '<CustomObject></CustomObject>')
+    archive.close()
+
+    with zipfile.ZipFile(output) as result:
+        assert result.getinfo('objects/Thing__c.object').compress_type == zipfile.ZIP_STORED
+        root = ET.fromstring(result.read('objects/Thing__c.object'))
+    assert root.findtext(f'{METADATA_NS}label') == 'Thing'
+    assert root.findtext(f'{METADATA_NS}fields/{METADATA_NS}fullName') == 'Size__c'
+    assert archive.entries == ['objects/Thing__c.object']
+
+
+def test_check_package_accepts_the_generated_zip(generated_zip):
+    result = check_package(generated_zip)
+    assert result['success'], result['details']
+    assert result['numberComponentsDeployed'] == len(DESCRIBE_FILES) * 11
+
+
+@pytest.mark.parametrize('change, problem', [
+    ({'drop': ['objects/Booking__c.object']}, 'was named in package.xml, but was not found'),
+    ({'add': {'objects/Broken__c.object': b'<CustomObject>'}}, 'Error parsing file'),
+    ({'drop': ['package.xml']}, 'No package.xml found'),
+])
+def test_check_package_reports_failures(generated_zip, change, problem):
+    result = check_package(rewrite(generated_zip, **change))
+    assert not result['success']
+    assert result['numberComponentsDeployed'] == 0
+    assert any(problem in failure['problem'] for failure in result['details']['componentFailures'])
+
+
+def test_check_package_rejects_a_non_zip():
+    result = check_package(b'not a zip')
+    assert result['details']['componentFailures'][0]['problem'].startswith('Invalid zip')
+
+
+def test_deploy_uploads_and_polls_until_done(generated_zip, serve):
+    org = serve(StubDeployServer(latency=0.2))
+    result = deploy(org.url, 'token', generated_zip, check_only=True, poll_interval=0.05)
+    assert result['done'] and result['success']
+    assert result['checkOnly'] is True
+    [uploaded] = org.deploys.values()
+    assert uploaded['zip'] == generated_zip
+    assert uploaded['options'] == {'singlePackage': True, 'checkOnly': True, 'rollbackOnError': True}
+
+
+def test_deploy_times_out(generated_zip, serve):
+    org = serve(StubDeployServer(latency=5))
+    with pytest.raises(ValueError, match='not done after'):
+        deploy(org.url, 'token', generated_zip, poll_interval=0.05, timeout=0.1)
+
+
+def test_main_exits_1_on_component_failures(generated_zip, org, tmp_path, capsys):
+    path = tmp_path / 'broken.zip'
+    path.write_bytes(rewrite(generated_zip, drop=['objects/Booking__c.object']))
+    with pytest.raises(SystemExit) as exit_info:
+        main([str(path), '--instance-url', org.url, '--access-token', 'token'])
+    assert exit_info.value.code == 1
+    out = capsys.readouterr().out
+    assert ': Failed (0 components, 2 errors)' in out
+    assert 'objects/Booking__c.object: An object Booking__c of type CustomObject' in out
+
+
+def test_main_deploys_a_good_zip(generated_zip, org, tmp_path, capsys):
+    path = tmp_path / 'deploy.zip'
+    path.write_bytes(generated_zip)
+    main([str(path), '--instance-url', org.url, '--access-token', 'token'])
+    assert ': Succeeded (' in capsys.readouterr().out
@@ -0,0 +1,100 @@
+import copy
+import json
+
+import pytest
+
+from benchmark_suite import synthetic_describe
+from describe_diff import (
+    ADDED, CHANGED, REMOVED, DescribeReader, diff_snapshots, drifted_fields, index_snapshot, main,
+)
+
+
+def describes(count=3):
+    return [synthetic_describe(i, fields=12, picklist_fields=2, picklist_values=5) for i in range(count)]
+
+
+def write_snapshot(directory, objects):
+    """The first object as a dump with HTTP headers, the others in one JSON array."""
+    directory.mkdir()
+    (directory / 'first.json').write_text('HTTP/1.1 200 OK\nContent-Type: application/json\n\n'
+                                          + json.dumps(objects[0]))
+    (directory / 'rest.json').write_text(json.dumps(objects[1:], indent=1))
+    return directory
+
+
+def field(describe, name):
+    return next(entry for entry in describe['fields'] if entry['name'] == name)
+
+
+@pytest.fixture
+def drifted(tmp_path):
+    old = describes()
+    new = copy.deepcopy(old)
+    bench1 = new[1]
+    field(bench1, 'Field0005__c')['length'] = 80
+    field(bench1, 'Field0005__c')['nillable'] = False
+    field(bench1, 'Field0000__c')['picklistValues'].append({'value': 'Value 9', 'label': 'Value <9>'})
+    field(bench1, 'Field0001__c')['picklistValues'][2]['active'] = False
+    bench1['fields'].append({'name': 'Field0099__c', 'type': 'string'})
+    bench1['fields'] = [entry for entry in bench1['fields'] if entry['name'] != 'Field0003__c']
+    new[2] = synthetic_describe(7, fields=3, picklist_fields=0, picklist_values=0)
+    return write_snapshot(tmp_path / 'old', old), write_snapshot(tmp_path / 'new', new)
+
+
+def test_index_snapshot_finds_every_describe(drifted):
+    old, _ = drifted
+    index = index_snapshot(old)
+    assert sorted(index) == ['Bench000__c', 'Bench001__c', 'Bench002__c']
+    with DescribeReader() as reader:
+        for name, location in index.items():
+            assert reader.describe(location).name == name
+
+
+def test_identical_snapshots_have_no_drift(drifted):
+    old, _ = drifted
+    assert list(diff_snapshots(old, old)) == []
+
+
+def test_drifted_pair(drifted):
+    drifts = {(drift.object_name, drift.field_name, drift.status): drift for drift in diff_snapshots(*drifted)}
+    assert sorted(drifts) == [
+        ('Bench001__c', 'Field0000__c', CHANGED),
+        ('Bench001__c', 'Field0001__c', CHANGED),
+        ('Bench001__c', 'Field0003__c', REMOVED),
+        ('Bench001__c', 'Field0005__c', CHANGED),
+        ('Bench001__c', 'Field0099__c', ADDED),
+        ('Bench002__c', '', REMOVED),
+        ('Bench007__c', '', ADDED),
+    ]
+    length = drifts['Bench001__c', 'Field0005__c', CHANGED]
+    assert length.attributes == {'length': (0, 80), 'nillable': (True, False)}
+    assert length.picklist is None
+    assert drifts['Bench001__c', 'Field0000__c', CHANGED].picklist.added == ['Value 9']
+    changed = drifts['Bench001__c', 'Field0001__c', CHANGED].picklist.changed
+    assert changed == {'Value 2': {'active': (True, False)}}
+
+
+def test_drifted_fields(drifted):
+    assert drifted_fields(diff_snapshots(*drifted)) == {
+        'Bench001__c': {'Field0000__c', 'Field0001__c', 'Field0005__c', 'Field0099__c'},
+        'Bench007__c': None,
+    }
+
+
+def test_objects_filter(drifted):
+    assert {drift.object_name for drift in diff_snapshots(*drifted, objects=['Bench002__c'])} == {'Bench002__c'}
+
+
+def test_main_prints_json_and_exits_1_on_drift(drifted, capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        main([str(path) for path in drifted] + ['--json'])
+    assert exit_info.value.code == 1
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert {'object': 'Bench002__c', 'field': None, 'status': REMOVED} in lines
+    assert len(lines) == 7
+
+
+def test_main_exits_0_without_drift(drifted, capsys):
+    old, _ = drifted
+    main([str(old), str(old)])
+    assert capsys.readouterr().out.startswith('\n0 added, 0 removed, 0 changed')
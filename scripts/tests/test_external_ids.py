@@ -0,0 +1,118 @@
+import csv
+
+import pytest
+
+from external_ids import (
+    KEY_FIELD, KeyCollisionError, Keyer, KeyingReport, keying_stage, parse_key_columns, synthesize_id,
+)
+from import_references import load_parent_index
+from normalize_import_csv import read_rows, run_pipeline
+
+LOCATIONS = [
+    ['_', 'Name', 'UniqueExternalId__c', 'ExternalId__c', 'SourceSystemExternalId__c', 'City__c'],
+    ['[Location__c]', 'Harbour', '', '', '', 'Oslo'],
+    ['[Location__c]', 'Harbour', '', '', '', 'Bergen'],
+]
+ROOM_HEADER = ['_', 'Name', 'UniqueExternalId__c', 'ExternalId__c', 'SourceSystemExternalId__c',
+               'Location__r', 'Location__r.UniqueExternalId__c', 'SortOrder__c']
+
+
+def write_csv(path, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        csv.writer(f, quoting=csv.QUOTE_ALL).writerows(rows)
+    return path
+
+
+def keyed(rows, **options):
+    header, data = run_pipeline(rows[0], iter([list(row) for row in rows[1:]]), [keying_stage(**options)])
+    return header, list(data)
+
+
+def room(name, location='[Location__c]', reference='', sort_order='1'):
+    return ['[GuestroomType__c]', name, '', '', '', location, reference, sort_order]
+
+
+def test_ids_are_stable_and_keep_existing_values():
+    keyer = Keyer(ROOM_HEADER)
+    ids = keyer.ids(room('Suite'))
+    assert ids == Keyer(ROOM_HEADER).ids(room('Suite'))
+    assert ids[KEY_FIELD] == f"dataimport-{ids['ExternalId__c']}"
+    # Without --set the placeholder stands for no parent
+    assert ids['ExternalId__c'] == synthesize_id('GuestroomType__c', ['Suite', ''])
+
+    exported = ['[GuestroomType__c]', 'Suite', 'crm-42', '42', 'crm', '', '', '1']
+    assert keyer.ids(exported)[KEY_FIELD] == 'crm-42'
+
+
+def test_placeholders_take_part_in_the_key():
+    rows = [room('Suite')]
+    harbour = Keyer(ROOM_HEADER, placeholders={'Location__c': 'Harbour'}).ids(rows[0])
+    airport = Keyer(ROOM_HEADER, placeholders={'Location__c': 'Airport'}).ids(rows[0])
+    assert harbour[KEY_FIELD] != airport[KEY_FIELD]
+
+
+def test_exact_repeats_are_dropped():
+    report = KeyingReport()
+    _, rows = keyed([ROOM_HEADER, room('Suite'), room('Suite'), room('Standard')], report=report)
+    assert [row[1] for row in rows] == ['Suite', 'Standard']
+    assert report.duplicates == 1
+    assert report.synthesized == 3
+
+
+def test_key_collision_fails_and_names_a_fix():
+    with pytest.raises(KeyCollisionError) as failure:
+        keyed([ROOM_HEADER, room('Suite', sort_order='3'), room('Suite', sort_order='6')])
+    assert failure.value.collision.line == 3
+    assert failure.value.collision.first_line == 2
+    assert '--key-columns GuestroomType__c=Name,COLUMN' in str(failure.value)
+
+
+def test_keep_first_reports_the_collision():
+    report = KeyingReport()
+    _, rows = keyed([ROOM_HEADER, room('Suite', sort_order='3'), room('Suite', sort_order='6')],
+                    report=report, keep_first=True)
+    assert [row[-1] for row in rows] == ['3']
+    assert [(c.line, c.first_line) for c in report.collisions] == [(3, 2)]
+
+
+def test_key_columns_tell_rows_apart():
+    key_columns = parse_key_columns(['GuestroomType__c=Name,SortOrder__c'])
+    _, rows = keyed([ROOM_HEADER, room('Suite', sort_order='3'), room('Suite', sort_order='6')],
+                    key_columns=key_columns)
+    assert len({row[2] for row in rows}) == 2
+
+
+def test_parse_key_columns():
+    assert parse_key_columns(['A__c=Name,B__c', 'C__c=Name']) == {'A__c': ('Name', 'B__c'), 'C__c': ('Name',)}
+    assert parse_key_columns(['Name', 'B__c'], 'A__c') == {'A__c': ('Name', 'B__c')}
+    with pytest.raises(ValueError):
+        parse_key_columns(['Name'])
+
+
+def test_parent_named_by_name_or_external_id_gives_the_same_key(tmp_path):
+    locations = write_csv(tmp_path / 'location.csv', LOCATIONS[:2])
+    index = load_parent_index([str(locations)], synthesize_ids=True)
+    location_key = index.resolve('Location__c', 'Harbour')
+
+    by_name = Keyer(ROOM_HEADER, parents=index).ids(room('Suite', location='Harbour'))
+    by_key = Keyer(ROOM_HEADER, parents=index).ids(room('Suite', location='', reference=location_key))
+    by_placeholder = Keyer(ROOM_HEADER, placeholders={'Location__c': 'Harbour'}, parents=index).ids(room('Suite'))
+    assert by_name[KEY_FIELD] == by_key[KEY_FIELD] == by_placeholder[KEY_FIELD]
+
+
+def test_parent_index_keys_parents_with_their_key_columns(tmp_path):
+    locations = write_csv(tmp_path / 'location.csv', LOCATIONS)
+    key_columns = parse_key_columns(['Location__c=Name,City__c'])
+    index = load_parent_index([str(locations)], synthesize_ids=True, key_columns=key_columns)
+
+    # The parent's own load, keyed with the same map, assigns the IDs the index derived
+    header, rows = read_rows(locations)
+    _, loaded = run_pipeline(header, rows, [keying_stage(key_columns=key_columns)])
+    own_keys = [row[header.index(KEY_FIELD)] for row in loaded]
+    assert len(set(own_keys)) == 2
+    assert index.resolve('Location__c', own_keys[0]) == own_keys[0]
+    assert index.resolve('Location__c', own_keys[1]) == own_keys[1]
+
+    keyer = Keyer(ROOM_HEADER, parents=index)
+    oslo, bergen = (keyer.ids(room('Suite', location='', reference=key))[KEY_FIELD] for key in own_keys)
+    assert oslo != bergen
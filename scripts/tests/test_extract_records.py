@@ -0,0 +1,90 @@
+import csv
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from conftest import DATAIMPORT_DIR
+from extract_records import (
+    CLUSTER_GAP, Extractor, StubQueryServer, export_columns, extract_object, id_ranges, id_to_int, int_to_id,
+    plan_ranges,
+)
+from fetch_describes import ConnectionPool
+
+OBJECT = 'EventClassification__c'
+
+
+@pytest.fixture
+def exports(tmp_path):
+    root = tmp_path / 'exports'
+    root.mkdir()
+    shutil.copy(DATAIMPORT_DIR / 'eventclassification.csv', root)
+    return root
+
+
+@pytest.fixture
+def extractor(exports, catalog, serve):
+    def connect(**options):
+        server = serve(StubQueryServer(exports, catalog, **options))
+        pool = ConnectionPool(server.url)
+        pools.append(pool)
+        return server, Extractor(pool, 'token')
+
+    pools = []
+    yield connect
+    for pool in pools:
+        pool.close()
+
+
+def test_id_round_trip():
+    assert int_to_id(id_to_int('a0B000000000123')) == 'a0B000000000123'
+    assert id_to_int('a0B000000000124') - id_to_int('a0B000000000123') == 1
+
+
+def test_id_ranges_cover_the_span_with_open_ends():
+    ranges = id_ranges('a0B000000000001', 'a0B0000000000zz', 4)
+    assert len(ranges) == 4
+    assert ranges[0][0] is None and ranges[-1][1] is None
+    assert all(high == low for (_, high), (low, _) in zip(ranges, ranges[1:]))
+
+
+def test_plan_ranges_splits_clustered_ids_into_full_chunks(extractor):
+    server, client = extractor(copies=20, id_clusters=3)
+    total = len(server.records[OBJECT])
+    first, last = server.records[OBJECT][0]['Id'], server.records[OBJECT][-1]['Id']
+    assert id_to_int(last) - id_to_int(first) > 2 * CLUSTER_GAP
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        ranges = plan_ranges(client, executor, OBJECT, total, chunk_size=250)
+        counts = list(executor.map(lambda id_range: client.count(OBJECT, id_range), ranges))
+
+    assert sum(counts) == total
+    assert max(counts) <= 250
+    # Equal slices of the Id span would leave all but three chunks empty
+    assert min(counts) > 0
+    assert len(ranges) <= 2 * -(-total // 250)
+
+
+def test_plan_ranges_of_an_empty_object(extractor):
+    _, client = extractor()
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        assert plan_ranges(client, executor, OBJECT, 0) == []
+
+
+def test_extract_object_writes_every_record_in_id_order(extractor, catalog, tmp_path):
+    server, client = extractor(copies=5, id_clusters=3, page_size=50)
+    total = len(server.records[OBJECT])
+    output = tmp_path / 'out' / f'{OBJECT}.csv'
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        result = extract_object(client, executor, OBJECT, export_columns(catalog, OBJECT), output, chunk_size=100)
+
+    assert result.records == total
+    assert result.chunks > 1
+    with open(output, newline='', encoding='utf-8') as f:
+        header, *rows = list(csv.reader(f))
+    assert header[:2] == ['_', 'Name']
+    assert len(rows) == total
+    names = [record['Name'] for record in server.records[OBJECT]]
+    assert [row[1] for row in rows] == names
+    assert not list(output.parent.glob('.*.tmp'))
@@ -0,0 +1,102 @@
+import json
+import os
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from benchmark_suite import synthetic_describe
+from fetch_describes import ConnectionPool, DescribeCache, StubRestServer, fetch_all, fetch_describe
+
+OBJECTS = ['Bench000__c', 'Bench001__c', 'Bench002__c', 'Bench003__c']
+
+
+@pytest.fixture
+def org(tmp_path, serve):
+    root = tmp_path / 'org'
+    root.mkdir()
+    for i, name in enumerate(OBJECTS):
+        (root / f'{name}.json').write_text(json.dumps(synthetic_describe(i, 10, 2, 4)))
+    return serve(StubRestServer(root))
+
+
+def fetch(server, tmp_path, objects=OBJECTS, workers=4):
+    return fetch_all(objects, server.url, 'token', tmp_path / 'out', tmp_path / 'cache', workers)
+
+
+def test_fetch_writes_every_describe(org, tmp_path):
+    results = fetch(org, tmp_path)
+    assert [result.object_name for result in results] == OBJECTS
+    assert {result.status for result in results} == {200}
+    for result in results:
+        assert result.path.read_bytes() == (org.root / f'{result.object_name}.json').read_bytes()
+
+
+def test_connections_are_reused(org, tmp_path):
+    fetch(org, tmp_path, OBJECTS * 5, workers=2)
+    assert org.requests == 20
+    assert org.connections <= 2
+
+
+def test_refetch_is_conditional_and_leaves_output_untouched(org, tmp_path):
+    fetch(org, tmp_path)
+    mtimes = {path.name: path.stat().st_mtime_ns for path in (tmp_path / 'out').iterdir()}
+
+    results = fetch(org, tmp_path)
+    assert {result.status for result in results} == {304}
+    assert sum(result.size for result in results) == 0
+    assert {path.name: path.stat().st_mtime_ns for path in (tmp_path / 'out').iterdir()} == mtimes
+
+
+def test_changed_describe_is_fetched_again(org, tmp_path):
+    fetch(org, tmp_path)
+    changed = org.root / 'Bench001__c.json'
+    describe = json.loads(changed.read_text())
+    describe['label'] = 'Renamed'
+    changed.write_text(json.dumps(describe))
+    # An older mtime: the ETag, not Last-Modified, must catch the change
+    os.utime(changed, (1, 1))
+
+    statuses = {result.object_name: result.status for result in fetch(org, tmp_path)}
+    assert statuses == {'Bench000__c': 304, 'Bench001__c': 200, 'Bench002__c': 304, 'Bench003__c': 304}
+    assert json.loads((tmp_path / 'out' / 'Bench001__c.json').read_text())['label'] == 'Renamed'
+
+
+def test_cache_body_missing_falls_back_to_a_full_fetch(org, tmp_path):
+    fetch(org, tmp_path)
+    (tmp_path / 'cache' / 'Bench002__c.json').unlink()
+    assert DescribeCache(tmp_path / 'cache').validators('Bench002__c') == {}
+    statuses = [result.status for result in fetch(org, tmp_path)]
+    assert statuses == [304, 304, 200, 304]
+
+
+def test_unknown_object_fails_alone(org, tmp_path):
+    results = fetch(org, tmp_path, ['Bench000__c', 'Missing__c'])
+    assert results[0].status == 200
+    assert results[1].status == 0 and results[1].error.startswith('HTTP 404')
+    assert results[1].path is None
+
+
+class _TruncatingHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Length', '1000')
+        self.end_headers()
+        self.wfile.write(b'{"name": ')
+        self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+
+def test_truncated_response_is_a_failed_result(tmp_path, serve):
+    server = serve(ThreadingHTTPServer(('127.0.0.1', 0), _TruncatingHandler))
+    pool = ConnectionPool(f'http://127.0.0.1:{server.server_address[1]}')
+    try:
+        result = fetch_describe(pool, DescribeCache(tmp_path / 'cache'), 'Bench000__c', 'token', tmp_path)
+    finally:
+        pool.close()
+    assert result.status == 0
+    assert result.error
+    assert not (tmp_path / 'Bench000__c.json').exists()
@@ -0,0 +1,84 @@
+import json
+
+import pytest
+
+from benchmark_suite import synthetic_describe
+from generate_object_metadata import DESCRIBE_FILES, HASH_CACHE_DIR, main, process_file
+
+
+def write_describe(path, object_name, fields=20):
+    describe = synthetic_describe(0, fields=fields, picklist_fields=4, picklist_values=6)
+    describe['name'] = object_name
+    path.write_text(json.dumps(describe))
+    return describe
+
+
+@pytest.fixture
+def dump(tmp_path):
+    path = tmp_path / 'EventItem__c.json'
+    describe = write_describe(path, 'EventItem__c')
+    return path, describe
+
+
+def run(dump_path, output, cache):
+    [result] = process_file(str(dump_path), str(output), str(cache))
+    return result
+
+
+def field_files(output, object_name='EventItem__c'):
+    return {path.name: path.stat().st_mtime_ns for path in (output / 'objects' / object_name / 'fields').iterdir()}
+
+
+def test_incremental_rerun_writes_nothing(dump, tmp_path):
+    path, _ = dump
+    output, cache = tmp_path / 'out', tmp_path / 'cache'
+    first = run(path, output, cache)
+    assert first['fields_written'] == first['fields_created'] > 0
+    before = field_files(output)
+
+    second = run(path, output, cache)
+    assert second['fields_written'] == 0
+    assert second['fields_unchanged'] == first['fields_created']
+    assert second['fields_skipped'] == first['fields_skipped']
+    assert field_files(output) == before
+
+
+def test_incremental_rerun_rewrites_only_changed_fields(dump, tmp_path):
+    path, describe = dump
+    output, cache = tmp_path / 'out', tmp_path / 'cache'
+    run(path, output, cache)
+    before = field_files(output)
+
+    describe['fields'][5]['label'] = 'Renamed'
+    path.write_text(json.dumps(describe))
+    result = run(path, output, cache)
+    assert result['fields_written'] == 1
+    changed = {name for name, mtime in field_files(output).items() if before[name] != mtime}
+    assert changed == {f"{describe['fields'][5]['name']}.field-meta.xml"}
+
+
+def test_deleted_field_file_is_rendered_again(dump, tmp_path):
+    path, describe = dump
+    output, cache = tmp_path / 'out', tmp_path / 'cache'
+    run(path, output, cache)
+    name = f"{describe['fields'][3]['name']}.field-meta.xml"
+    (output / 'objects' / 'EventItem__c' / 'fields' / name).unlink()
+    assert run(path, output, cache)['fields_written'] == 1
+
+
+def test_cli_incremental_rerun(tmp_path, capsys):
+    downloads, project = tmp_path / 'downloads', tmp_path / 'project'
+    downloads.mkdir()
+    (project / 'force-app' / 'main' / 'default').mkdir(parents=True)
+    for filename, object_name in DESCRIBE_FILES:
+        write_describe(downloads / filename, object_name, fields=8)
+    argv = ['--downloads-dir', str(downloads), '--project-dir', str(project), '--incremental', '--workers', '1']
+
+    main(argv)
+    assert (project / HASH_CACHE_DIR / 'EventItem__c.json').exists()
+    capsys.readouterr()
+    main(argv)
+    summary = capsys.readouterr().out.split('SUMMARY', 1)[1]
+    for _, object_name in DESCRIBE_FILES:
+        assert f'{object_name}: ' in summary
+    assert summary.count(' 0 written') == len(DESCRIBE_FILES)
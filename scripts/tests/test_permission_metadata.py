@@ -0,0 +1,114 @@
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from conftest import SOURCE_DIR
+from permission_metadata import METADATA_NS, PermissionDocument, _local_name
+
+PERMISSION_SET = SOURCE_DIR / 'permissionsets' / 'Delphi_Admin.permissionset-meta.xml'
+
+UNSORTED = """<?xml version="1.0" encoding="UTF-8"?>
+<PermissionSet xmlns="http://soap.sforce.com/2006/04/metadata">
+    <label>Ops</label>
+    <fieldPermissions>
+        <field>Location__c.Zone__c</field>
+        <editable>true</editable>
+        <readable>true</readable>
+    </fieldPermissions>
+    <fieldPermissions>
+        <field>Location__c.City__c</field>
+        <editable>false</editable>
+        <readable>true</readable>
+    </fieldPermissions>
+    <fieldPermissions>
+        <field>Location__c.Region__c</field>
+        <editable>false</editable>
+        <readable>true</readable>
+    </fieldPermissions>
+    <hasActivationRequired>false</hasActivationRequired>
+</PermissionSet>
+"""
+
+
+def fields(document):
+    return [entry['field'] for entry in document.entries('fieldPermissions')]
+
+
+def sections(text):
+    return [_local_name(element.tag) for element in ET.fromstring(text)]
+
+
+def rendered_fields(text):
+    return [element.findtext(f'{{{METADATA_NS}}}field') for element in ET.fromstring(text)
+            if _local_name(element.tag) == 'fieldPermissions']
+
+
+@pytest.mark.parametrize('path', [PERMISSION_SET, *sorted((SOURCE_DIR / 'profiles').glob('*.profile-meta.xml'))],
+                         ids=lambda path: path.name)
+def test_round_trip_is_byte_identical(path):
+    data = path.read_bytes()
+    # Rendering always ends the file with a newline
+    assert PermissionDocument.load(path).render().encode('utf-8') == data.rstrip(b'\n') + b'\n'
+
+
+def test_round_trip_keeps_the_order_read():
+    assert PermissionDocument.parse(UNSORTED).render() == UNSORTED
+
+
+def test_upsert_is_idempotent():
+    document = PermissionDocument.parse(UNSORTED)
+    assert not document.upsert('fieldPermissions', field='Location__c.City__c', editable='false', readable='true')
+    assert document.render() == UNSORTED
+
+
+def test_upsert_updates_in_place_and_inserts_before_the_next_key():
+    document = PermissionDocument.parse(UNSORTED)
+    assert document.upsert('fieldPermissions', field='Location__c.City__c', editable='true', readable='true')
+    assert document.upsert('fieldPermissions', field='Location__c.Name__c', editable='false', readable='true')
+    assert document.get('fieldPermissions', 'Location__c.City__c')['editable'] == 'true'
+    # Existing entries keep their place; the new one goes before the first that sorts after it
+    assert rendered_fields(document.render()) == ['Location__c.Name__c', 'Location__c.Zone__c',
+                                                  'Location__c.City__c', 'Location__c.Region__c']
+
+
+def test_upsert_into_a_sorted_section_keeps_it_sorted():
+    document = PermissionDocument.parse(UNSORTED)
+    document.remove('fieldPermissions', 'Location__c.Zone__c')
+    document = PermissionDocument.parse(document.render())
+    for field in ('Location__c.Zone__c', 'Location__c.Name__c', 'Account.Name'):
+        document.upsert('fieldPermissions', field=field, editable='false', readable='true')
+    assert rendered_fields(document.render()) == ['Account.Name', 'Location__c.City__c', 'Location__c.Name__c',
+                                                  'Location__c.Region__c', 'Location__c.Zone__c']
+
+
+def test_new_sections_go_before_the_first_that_sorts_after_them():
+    document = PermissionDocument.parse(UNSORTED)
+    document.upsert('objectPermissions', object='Location__c', allowRead='true')
+    document.upsert('customPermissions', name='Ops_Console', enabled='true')
+    assert sections(document.render()) == ['customPermissions', 'label', 'fieldPermissions', 'fieldPermissions',
+                                           'fieldPermissions', 'hasActivationRequired', 'objectPermissions']
+
+
+def test_new_children_are_sorted():
+    document = PermissionDocument.parse(UNSORTED)
+    document.upsert('fieldPermissions', readable='true', field='Location__c.Name__c', editable='false')
+    entry = ET.fromstring(document.render())[1]
+    assert [_local_name(child.tag) for child in entry] == ['editable', 'field', 'readable']
+
+
+def test_remove():
+    document = PermissionDocument.parse(UNSORTED)
+    assert document.remove('fieldPermissions', 'Location__c.Region__c')
+    assert not document.remove('fieldPermissions', 'Location__c.Region__c')
+    assert fields(document) == ['Location__c.Zone__c', 'Location__c.City__c']
+    assert 'Region__c' not in document.render()
+
+
+def test_save_writes_only_on_change(tmp_path):
+    path = tmp_path / 'Ops.permissionset-meta.xml'
+    path.write_text(UNSORTED)
+    document = PermissionDocument.load(path)
+    assert not document.save(path)
+    document.set_value('label', 'Operations')
+    assert document.save(path)
+    assert '<label>Operations</label>' in path.read_text()
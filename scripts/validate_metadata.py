@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Check generated object metadata for deploy errors before running `sf project deploy`.
+
+Catches locally, in milliseconds, the errors a deploy only reports after a full
+upload: relationship names colliding on the same parent, Text fields longer
+than 255, required lookups that do not Restrict deletes, lookups to objects
+that are not in the source tree, and the like. Fields come from the metadata
+catalog (see metadata_catalog), indexed by object and field name, by reference
+target and by (target, relationship name). Each rule checks one object against
+those indexes, so objects are checked independently and, for large trees, in a
+process pool.
+
+Rules:
+  field-name            custom field API names: letters, digits and single underscores, <= 40 characters
+  duplicate-field       field names differing only in case within an object
+  text-length           Text 1-255, LongTextArea/Html 256-131072
+  number-precision      Number/Currency/Percent precision 1-18 and scale <= precision
+  picklist-values       picklists need values or a global value set
+  lookup-target         lookups and master-details need a referenceTo that is standard or in the tree
+  relationship-name     relationship fields need a valid relationshipName
+  relationship-collision  two relationship fields to one object with the same relationshipName
+  required-lookup       required lookups need deleteConstraint Restrict or Cascade
+  relationship-count    at most 2 master-detail and 40 relationship fields per object
+
+Exits 1 when any error is found, so it can gate a deploy:
+    python3 scripts/validate_metadata.py && sf project deploy start --manifest manifest/package.xml
+
+Usage:
+    python3 scripts/validate_metadata.py [--source-dir force-app/main/default] [--objects Booking__c ...]
+    python3 scripts/validate_metadata.py --known-objects Contract__c   # targets deployed separately
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+import argparse
+import os
+import re
+import time
+from pathlib import Path
+
+from metadata_catalog import FieldInfo, MetadataCatalog, load_catalog
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+SOURCE_DIR = PROJECT_DIR / 'force-app' / 'main' / 'default'
+
+# API name of a custom field without "__c": no leading digit or underscore, no double or trailing underscore
+API_NAME = re.compile(r'[A-Za-z][A-Za-z0-9]*(?:_[A-Za-z0-9]+)*')
+MAX_NAME_LENGTH = 40
+
+TEXT_LENGTH = (1, 255)
+LONG_TEXT_LENGTH = (256, 131072)
+LONG_TEXT_TYPES = {'LongTextArea', 'Html'}
+NUMERIC_TYPES = {'Number', 'Currency', 'Percent'}
+MAX_PRECISION = 18
+PICKLIST_TYPES = {'Picklist', 'MultiselectPicklist'}
+RELATIONSHIP_TYPES = {'Lookup', 'MasterDetail'}
+REQUIRED_LOOKUP_CONSTRAINTS = {'Restrict', 'Cascade'}
+MAX_MASTER_DETAIL = 2
+MAX_RELATIONSHIPS = 40
+
+# Objects below this many fields are checked in-process; a pool only pays off for large trees
+PARALLEL_MIN_FIELDS = 20000
+
+
+class Issue(NamedTuple):
+    rule: str
+    object_name: str
+    field_name: str
+    message: str
+
+    def __str__(self) -> str:
+        where = f'{self.object_name}.{self.field_name}' if self.field_name else self.object_name
+        return f'{where}: [{self.rule}] {self.message}'
+
+
+class Indexes:
+    """Cross-object lookups the rules need, built once per catalog."""
+
+    def __init__(self, catalog: MetadataCatalog, known_objects: Iterable[str] = ()):
+        self.catalog = catalog
+        self.objects: Set[str] = set(catalog.objects) | set(known_objects)
+        # (target object, relationship name) -> [(object, field)], case-insensitive like Salesforce
+        self.by_relationship: Dict[Tuple[str, str], List[Tuple[str, str]]] = {}
+        # target object -> [(object, field)]
+        self.by_target: Dict[str, List[Tuple[str, str]]] = {}
+        # (object, field name) -> names, case-insensitive
+        self.by_field_name: Dict[Tuple[str, str], List[str]] = {}
+        for object_name, fields in catalog.objects.items():
+            for name, info in fields.items():
+                self.by_field_name.setdefault((object_name, name.lower()), []).append(name)
+                if info.type in RELATIONSHIP_TYPES and info.reference_to:
+                    self.by_target.setdefault(info.reference_to, []).append((object_name, name))
+                    if info.relationship_name:
+                        key = (info.reference_to.lower(), info.relationship_name.lower())
+                        self.by_relationship.setdefault(key, []).append((object_name, name))
+
+
+def _check_name(info: FieldInfo) -> Optional[str]:
+    if not info.name.endswith('__c'):
+        return None
+    base = info.name[:-len('__c')]
+    if not API_NAME.fullmatch(base):
+        return f"'{info.name}' is not a valid API name"
+    if len(base) > MAX_NAME_LENGTH:
+        return f"'{base}' is {len(base)} characters (max {MAX_NAME_LENGTH})"
+    return None
+
+
+def check_field(indexes: Indexes, object_name: str, info: FieldInfo) -> Iterable[Issue]:
+    """Every field-level rule for one field."""
+    def issue(rule: str, message: str) -> Issue:
+        return Issue(rule, object_name, info.name, message)
+
+    message = _check_name(info)
+    if message:
+        yield issue('field-name', message)
+    same_name = indexes.by_field_name.get((object_name, info.name.lower()), [])
+    if len(same_name) > 1 and info.name != min(same_name):
+        yield issue('duplicate-field', f"differs only in case from {min(same_name)}")
+
+    if info.type == 'Text':
+        low, high = TEXT_LENGTH
+        if info.length is None or not low <= info.length <= high:
+            yield issue('text-length', f"Text length {info.length} is outside {low}-{high}; use LongTextArea")
+    elif info.type in LONG_TEXT_TYPES:
+        low, high = LONG_TEXT_LENGTH
+        if info.length is None or not low <= info.length <= high:
+            yield issue('text-length', f"{info.type} length {info.length} is outside {low}-{high}")
+    elif info.type in NUMERIC_TYPES and not info.formula:
+        if info.precision is None or not 1 <= info.precision <= MAX_PRECISION:
+            yield issue('number-precision', f"precision {info.precision} is outside 1-{MAX_PRECISION}")
+        elif info.scale is not None and info.scale > info.precision:
+            yield issue('number-precision', f"scale {info.scale} exceeds precision {info.precision}")
+    elif info.type in PICKLIST_TYPES and not info.picklist_values and not info.value_set_name:
+        yield issue('picklist-values', 'picklist has no values and no global value set')
+
+    if info.type not in RELATIONSHIP_TYPES:
+        return
+    target = info.reference_to
+    if not target:
+        yield issue('lookup-target', 'no referenceTo')
+    elif target.endswith('__c') and target not in indexes.objects:
+        yield issue('lookup-target', f"references {target}, which is not in the source tree")
+
+    relationship = info.relationship_name
+    if not relationship:
+        yield issue('relationship-name', 'no relationshipName')
+    elif not API_NAME.fullmatch(relationship) or len(relationship) > MAX_NAME_LENGTH:
+        yield issue('relationship-name', f"'{relationship}' is not a valid relationship name")
+    elif target:
+        others = [f'{obj}.{name}' for obj, name in indexes.by_relationship[(target.lower(), relationship.lower())]
+                  if (obj, name) != (object_name, info.name)]
+        if others:
+            yield issue('relationship-collision',
+                        f"relationshipName {relationship} on {target} is also used by {', '.join(sorted(others))}")
+
+    if info.type == 'Lookup' and info.required and info.delete_constraint not in REQUIRED_LOOKUP_CONSTRAINTS:
+        yield issue('required-lookup', f"required lookup has deleteConstraint {info.delete_constraint or 'SetNull'}; "
+                                       "use Restrict or Cascade")
+
+
+def check_object(indexes: Indexes, object_name: str) -> List[Issue]:
+    """Field-level rules for every field of an object, plus the per-object limits."""
+    fields = indexes.catalog.objects.get(object_name, {})
+    issues = []
+    for name in sorted(fields):
+        issues.extend(check_field(indexes, object_name, fields[name]))
+    master_details = sum(1 for info in fields.values() if info.type == 'MasterDetail')
+    relationships = sum(1 for info in fields.values() if info.type in RELATIONSHIP_TYPES)
+    if master_details > MAX_MASTER_DETAIL:
+        issues.append(Issue('relationship-count', object_name, '',
+                            f"{master_details} master-detail fields (max {MAX_MASTER_DETAIL})"))
+    if relationships > MAX_RELATIONSHIPS:
+        issues.append(Issue('relationship-count', object_name, '',
+                            f"{relationships} relationship fields (max {MAX_RELATIONSHIPS})"))
+    return issues
+
+
+# Indexes shared by pool workers (set once per worker by _init_worker)
+_INDEXES: Optional[Indexes] = None
+
+
+def _init_worker(indexes: Indexes):
+    global _INDEXES
+    _INDEXES = indexes
+
+
+def _check_object_in_worker(object_name: str) -> List[Issue]:
+    return check_object(_INDEXES, object_name)
+
+
+def validate(catalog: MetadataCatalog, objects: Optional[List[str]] = None, known_objects: Iterable[str] = (),
+             workers: int = 1) -> List[Issue]:
+    """Check objects (default: every object in the catalog); issues come back in object order."""
+    indexes = Indexes(catalog, known_objects)
+    objects = sorted(objects or catalog.objects)
+    field_count = sum(len(catalog.objects.get(name, {})) for name in objects)
+    if workers <= 1 or len(objects) <= 1 or field_count < PARALLEL_MIN_FIELDS:
+        batches = [check_object(indexes, name) for name in objects]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(objects)),
+                                 initializer=_init_worker, initargs=(indexes,)) as executor:
+            batches = list(executor.map(_check_object_in_worker, objects))
+    return [issue for batch in batches for issue in batch]
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--source-dir', default=str(SOURCE_DIR), help='SFDX source directory holding objects/')
+    parser.add_argument('--objects', nargs='+', help='Objects to check (default: all; targets are checked against all)')
+    parser.add_argument('--known-objects', nargs='+', default=[],
+                        help='Custom objects that exist in the org but not in the source tree')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help=f'Processes for trees of {PARALLEL_MIN_FIELDS}+ fields')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    source_dir = Path(args.source_dir)
+    catalog = load_catalog(source_dir)
+    if not catalog.objects:
+        raise SystemExit(f"Error: no objects under {source_dir / 'objects'}")
+    missing = [name for name in args.objects or [] if name not in catalog.objects]
+    if missing:
+        raise SystemExit(f"Error: objects not found under {source_dir / 'objects'}: {', '.join(missing)}")
+
+    issues = validate(catalog, args.objects, args.known_objects, args.workers)
+    for issue in issues:
+        print(issue)
+    checked = args.objects or catalog.objects
+    fields = sum(len(catalog.objects[name]) for name in checked)
+    print(f"\n{len(issues)} errors in {len(checked)} objects, {fields} fields "
+          f"({(time.perf_counter() - start) * 1000:.0f} ms)")
+    if issues:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+"""
+Watch describes and field metadata, regenerating fields and permissions as they change.
+
+Replaces rerunning generate_object_metadata.py and update_permission_set.py by
+hand after every edit. The catalog (see metadata_catalog) and every permission
+set and profile are loaded once and kept in memory; each change then touches
+only what it affects:
+
+  - a describe JSON in the downloads dir (see DESCRIBE_FILES) re-runs the
+    generator for that object incrementally, so only fields whose describe
+    entry changed are re-rendered and rewritten;
+  - a field file written by the generator or edited by hand is re-parsed, and
+    its fieldPermissions entry is upserted (or removed, when the field was
+    deleted or can no longer carry field-level security) in each permission
+    file, with the sync_permissions rules. A new object also gets its
+    objectPermissions and tab entries.
+
+Changes are picked up through inotify on Linux, or by polling the watched
+directories every --interval seconds elsewhere (or with --poll). Events are
+batched for --debounce seconds, so a generator run that rewrites hundreds of
+files is handled as one change. Permission files edited outside the watcher
+are re-read before the next update.
+
+Usage:
+    python3 scripts/watch_metadata.py [--downloads-dir ~/Downloads] [--project-dir .]
+    python3 scripts/watch_metadata.py --poll --interval 0.5
+"""
+
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+import argparse
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import time
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+from generate_object_metadata import DESCRIBE_FILES, HASH_CACHE_DIR, process_file
+from metadata_catalog import FieldInfo, load_catalog, parse_field
+from permission_metadata import PermissionDocument
+from sync_permissions import apply_field_rule, apply_rules, find_permission_files
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+FIELD_SUFFIX = '.field-meta.xml'
+
+DEBOUNCE = 0.05
+POLL_INTERVAL = 0.5
+
+# inotify event masks (linux/inotify.h)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+EVENT_HEADER = struct.Struct('iIII')   # wd, mask, cookie, len
+
+
+class InotifyWatcher:
+    """Changed paths in trees (including directories created below them) and flat directories, through inotify."""
+
+    def __init__(self, trees: Iterable[Path], directories: Iterable[Path] = ()):
+        libc_name = ctypes.util.find_library('c')
+        if not libc_name:
+            raise OSError('libc not found')
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self.libc, 'inotify_init1'):
+            raise OSError('inotify is not available')
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()))
+        self.directories: Dict[int, Path] = {}    # watch descriptor -> directory
+        self.flat: Set[int] = set()               # descriptors whose subdirectories are not watched
+        self.rescan = False                       # set when the kernel queue overflowed
+        for root in trees:
+            self._watch_tree(root)
+        for directory in directories:
+            self._watch(directory, recursive=False)
+
+    def _watch(self, directory: Path, recursive: bool = True):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            error = ctypes.get_errno()
+            if error not in (errno.ENOENT, errno.ENOTDIR):
+                raise OSError(error, f'{os.strerror(error)}: {directory}')
+            return
+        self.directories[wd] = directory
+        if not recursive:
+            self.flat.add(wd)
+
+    def _watch_tree(self, root: Path):
+        if not root.is_dir():
+            return
+        self._watch(root)
+        for dirpath, dirnames, _ in os.walk(root):
+            for name in dirnames:
+                self._watch(Path(dirpath) / name)
+
+    def changes(self, timeout: float) -> Set[Path]:
+        """Paths changed within timeout (empty if none); waits for the first event, then drains."""
+        changed: Set[Path] = set()
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return changed
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return changed
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+                name = data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length].rstrip(b'\0')
+                offset += EVENT_HEADER.size + length
+                if mask & IN_Q_OVERFLOW:
+                    self.rescan = True
+                    continue
+                directory = self.directories.get(wd)
+                if directory is None:
+                    continue
+                if mask & IN_DELETE_SELF:
+                    del self.directories[wd]
+                    continue
+                path = directory / os.fsdecode(name)
+                if mask & IN_ISDIR:
+                    if mask & (IN_CREATE | IN_MOVED_TO) and wd not in self.flat:
+                        # Files written before the watch was added are reported by listing the new tree
+                        self._watch_tree(path)
+                        changed.update(p for p in path.rglob('*') if p.is_file())
+                    continue
+                changed.add(path)
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Changed paths in trees and flat directories, found by comparing (mtime, size) of every file each interval."""
+
+    def __init__(self, trees: Iterable[Path], directories: Iterable[Path] = (), interval: float = POLL_INTERVAL):
+        self.trees = list(trees)
+        self.directories = list(directories)
+        self.interval = interval
+        self.rescan = False
+        self.snapshot = self._scan()
+
+    def _scan(self) -> Dict[Path, Tuple[int, int]]:
+        snapshot = {}
+        listings = [(Path(dirpath), filenames) for root in self.trees for dirpath, _, filenames in os.walk(root)]
+        for directory in self.directories:
+            try:
+                listings.append((directory, [entry.name for entry in os.scandir(directory) if entry.is_file()]))
+            except FileNotFoundError:
+                pass
+        for directory, filenames in listings:
+            for name in filenames:
+                path = directory / name
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def changes(self, timeout: float) -> Set[Path]:
+        deadline = time.monotonic() + timeout
+        while True:
+            time.sleep(max(0.0, min(self.interval, deadline - time.monotonic())))
+            snapshot = self._scan()
+            changed = {path for path in snapshot.keys() | self.snapshot.keys()
+                       if snapshot.get(path) != self.snapshot.get(path)}
+            self.snapshot = snapshot
+            if changed or time.monotonic() >= deadline:
+                return changed
+
+    def close(self):
+        pass
+
+
+def make_watcher(trees: List[Path], directories: List[Path] = (), poll: bool = False,
+                 interval: float = POLL_INTERVAL):
+    """An InotifyWatcher, or a PollingWatcher when asked for or when inotify is unavailable."""
+    if not poll:
+        try:
+            return InotifyWatcher(trees, directories)
+        except OSError as e:
+            print(f"inotify unavailable ({e}); polling every {interval}s")
+    return PollingWatcher(trees, directories, interval)
+
+
+class FieldChange(NamedTuple):
+    object_name: str
+    field_name: str
+    info: Optional[FieldInfo]     # None when the field file was deleted
+
+
+class WatchState:
+    """The catalog, field file stats and permission documents, kept in memory between changes."""
+
+    def __init__(self, project_dir: Path, downloads_dir: Path):
+        self.project_dir = project_dir
+        self.downloads_dir = downloads_dir
+        self.source_dir = project_dir / 'force-app' / 'main' / 'default'
+        self.objects_dir = self.source_dir / 'objects'
+        self.hash_cache_dir = project_dir / HASH_CACHE_DIR
+        self.describes = {downloads_dir / filename: object_name for filename, object_name in DESCRIBE_FILES}
+
+        # Stats first: a file changed while the catalog loads then differs from its stat and is re-parsed
+        self.stats: Dict[Path, Tuple[int, int]] = {}
+        if self.objects_dir.is_dir():
+            for object_dir in self.objects_dir.iterdir():
+                fields_dir = object_dir / 'fields'
+                if fields_dir.is_dir():
+                    for path in fields_dir.iterdir():
+                        if path.name.endswith(FIELD_SUFFIX):
+                            self.stats[path] = self._stat(path)
+        self.catalog = load_catalog(self.source_dir)
+        self.documents: Dict[str, Tuple[PermissionDocument, Optional[Tuple[int, int]]]] = {}
+        for path in find_permission_files(self.source_dir):
+            self._load_document(path)
+
+    @staticmethod
+    def _stat(path: Path) -> Optional[Tuple[int, int]]:
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _load_document(self, path: str) -> PermissionDocument:
+        document = PermissionDocument.load(path)
+        self.documents[path] = (document, self._stat(Path(path)))
+        return document
+
+    def document(self, path: str) -> PermissionDocument:
+        """The in-memory document, re-read when the file was changed by something else."""
+        document, stat = self.documents[path]
+        if self._stat(Path(path)) != stat:
+            document = self._load_document(path)
+        return document
+
+    def field_object(self, path: Path) -> Optional[str]:
+        """The object of an objects/<Object>/fields/<Field>.field-meta.xml path."""
+        if not path.name.endswith(FIELD_SUFFIX) or path.parent.name != 'fields':
+            return None
+        object_dir = path.parent.parent
+        return object_dir.name if object_dir.parent == self.objects_dir else None
+
+    def regenerate(self, describe_path: Path) -> Set[Path]:
+        """Re-run the generator on one describe; returns the field files of the objects it wrote."""
+        known_hashes = self.catalog.content_hashes()
+        results = process_file(str(describe_path), str(self.source_dir), str(self.hash_cache_dir), known_hashes)
+        paths: Set[Path] = set()
+        for result in results:
+            fields_dir = self.objects_dir / result['object_name'] / 'fields'
+            paths.update(fields_dir.glob(f'*{FIELD_SUFFIX}'))
+            paths.update(path for path in self.stats if path.parent == fields_dir)
+        return paths
+
+    def refresh_fields(self, paths: Iterable[Path]) -> List[FieldChange]:
+        """Re-parse the field files whose stat changed; returns the fields that changed."""
+        changes = []
+        for path in sorted(paths):
+            object_name = self.field_object(path)
+            if object_name is None:
+                continue
+            stat = self._stat(path)
+            if stat == self.stats.get(path):
+                continue
+            field_name = path.name[:-len(FIELD_SUFFIX)]
+            fields = self.catalog.objects.setdefault(object_name, {})
+            if stat is None:
+                self.stats.pop(path, None)
+                if fields.pop(field_name, None) is not None:
+                    changes.append(FieldChange(object_name, field_name, None))
+                continue
+            self.stats[path] = stat
+            try:
+                info = parse_field(path)
+            except (OSError, ET.ParseError) as e:
+                # A half-written file; its final write arrives as another change
+                print(f"Warning: skipping {path}: {e}")
+                continue
+            if fields.get(info.name) != info:
+                fields[info.name] = info
+                changes.append(FieldChange(object_name, info.name, info))
+        return changes
+
+    def update_permissions(self, changes: List[FieldChange], new_objects: Set[str]) -> Dict[str, Tuple[int, int]]:
+        """Apply the changed fields to every permission file; returns file -> (upserted, removed) for those written."""
+        changes = [change for change in changes
+                   if change.object_name.endswith('__c') and change.field_name.endswith('__c')]
+        written = {}
+        for path in self.documents:
+            document = self.document(path)
+            upserted = removed = 0
+            if new_objects:
+                counts = apply_rules(document, self.catalog, sorted(new_objects))
+                upserted, removed = counts['upserted'], counts['removed']
+            for change in changes:
+                if change.object_name in new_objects:
+                    continue
+                if change.info is None:
+                    removed += document.remove('fieldPermissions', f'{change.object_name}.{change.field_name}')
+                    continue
+                field_upserted, field_removed = apply_field_rule(document, change.object_name, change.info)
+                upserted += field_upserted
+                removed += field_removed
+            if (upserted or removed) and document.save(path):
+                self.documents[path] = (document, self._stat(Path(path)))
+                written[path] = (upserted, removed)
+        return written
+
+    def handle(self, paths: Set[Path]) -> Optional[str]:
+        """Process one batch of changed paths; returns a summary line, or None when nothing changed."""
+        start = time.perf_counter()
+        known_objects = set(self.catalog.objects)
+        field_paths = {path for path in paths if self.field_object(path)}
+        regenerated = []
+        for describe_path in sorted(path for path in paths if path in self.describes):
+            if describe_path.exists():
+                field_paths |= self.regenerate(describe_path)
+                regenerated.append(self.describes[describe_path])
+
+        changes = self.refresh_fields(field_paths)
+        if not changes and not regenerated:
+            return None
+        new_objects = {change.object_name for change in changes if change.info is not None} - known_objects
+        new_objects = {name for name in new_objects if name.endswith('__c')}
+        written = self.update_permissions(changes, new_objects)
+
+        parts = []
+        if regenerated:
+            parts.append(f"regenerated {', '.join(regenerated)}")
+        by_object: Dict[str, int] = {}
+        for change in changes:
+            by_object[change.object_name] = by_object.get(change.object_name, 0) + 1
+        if by_object:
+            parts.append('fields changed: ' + ', '.join(f'{name} {count}' for name, count in sorted(by_object.items())))
+        if written:
+            parts.append('permissions: ' + ', '.join(f'{Path(path).name.split(".", 1)[0]} +{up}/-{down}'
+                                                     for path, (up, down) in sorted(written.items())))
+        return f"{'; '.join(parts)} ({(time.perf_counter() - start) * 1000:.0f} ms)"
+
+    def rescan_paths(self) -> Set[Path]:
+        """Every field file known or on disk, plus the describes, for after a missed-event overflow."""
+        paths = set(self.stats) | set(self.describes)
+        if self.objects_dir.is_dir():
+            paths.update(self.objects_dir.glob(f'*/fields/*{FIELD_SUFFIX}'))
+        return paths
+
+
+def watch(state: WatchState, watcher, debounce: float = DEBOUNCE, stop_after: Optional[float] = None):
+    """Handle batches of changes until interrupted (or until stop_after seconds have passed)."""
+    deadline = time.monotonic() + stop_after if stop_after is not None else None
+    while deadline is None or time.monotonic() < deadline:
+        timeout = 1.0 if deadline is None else max(0.0, min(1.0, deadline - time.monotonic()))
+        paths = watcher.changes(timeout)
+        if not paths and not watcher.rescan:
+            continue
+        # Let the rest of a burst of writes arrive before handling it
+        while True:
+            more = watcher.changes(debounce)
+            if not more:
+                break
+            paths |= more
+        if watcher.rescan:
+            watcher.rescan = False
+            paths |= state.rescan_paths()
+        summary = state.handle(paths)
+        if summary:
+            print(f"{time.strftime('%H:%M:%S')} {summary}", flush=True)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--downloads-dir', default=str(Path.home() / 'Downloads'),
+                        help='Directory holding the Workbench describe JSON files')
+    parser.add_argument('--project-dir', default=str(PROJECT_DIR), help='SFDX project root')
+    parser.add_argument('--poll', action='store_true', help='Poll instead of using inotify')
+    parser.add_argument('--interval', type=float, default=POLL_INTERVAL, help='Seconds between polls')
+    parser.add_argument('--debounce', type=float, default=DEBOUNCE,
+                        help='Seconds to wait for further writes before handling a change')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    state = WatchState(Path(args.project_dir), Path(args.downloads_dir))
+    # The object tree is watched recursively; the downloads dir, which may be large, only at its top level
+    trees = [state.objects_dir] if state.objects_dir.is_dir() else []
+    directories = [state.downloads_dir] if state.downloads_dir.is_dir() else []
+    if not trees and not directories:
+        raise SystemExit(f"Error: neither {state.objects_dir} nor {state.downloads_dir} exists")
+    watcher = make_watcher(trees, directories, args.poll, args.interval)
+    print(f"Watching {', '.join(str(root) for root in trees + directories)} with {type(watcher).__name__}: "
+          f"{state.catalog.field_count()} fields, {len(state.documents)} permission files "
+          f"(loaded in {time.perf_counter() - start:.2f}s)", flush=True)
+    try:
+        watch(state, watcher, args.debounce)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+
+
+if __name__ == '__main__':
+    main()